@@ -47,11 +47,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'Prolean.middleware.StaticFilesMiddleware',  # WhiteNoise, ASGI-capable
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'Prolean.middleware.RequestCacheMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
@@ -104,13 +105,36 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Africa/Casablanca'
 
-# Cache Configuration (Using Django's built-in cache for now)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache Configuration: with REDIS_URL, a two-tier cache
+# (Prolean/cache_backends.py) with a small per-worker LRU in front of the
+# Redis 'shared' cache every worker sees. Without Redis each worker keeps
+# its own in-memory cache: there is no shared cache with atomic add/incr
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'Prolean.cache_backends.TieredCache',
+            'OPTIONS': {
+                'L2': 'shared',
+                'L1_MAX_ENTRIES': 256,
+                'L1_TIMEOUT': 2,  # seconds a worker may serve a value replaced by another
+                'L1_EXCLUDE_PREFIXES': ['rl:'],  # rate limit windows are read right after incr
+                'LOCK_TIMEOUT': 30,  # seconds a single-flight lock outlives a crashed holder
+                'LOCK_WAIT': 5,  # seconds callers wait for the holder before computing themselves
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
 # Session Configuration
 SESSION_ENGINE = os.environ.get(
@@ -132,6 +156,81 @@ RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = 'default'
 RATELIMIT_VIEW = 'Prolean.views.rate_limit_exceeded'
 
+# Prolean rate limiter (Prolean/ratelimit.py): with Redis, counters live in
+# the shared cache; without it, per-worker caches would multiply every limit
+# by the number of workers, so requests are counted in RateLimitLog instead.
+# Violations are flushed to RateLimitLog/ThreatIP by a background thread.
+PROLEAN_RATELIMIT_BACKEND = os.environ.get(
+    'PROLEAN_RATELIMIT_BACKEND',
+    'Prolean.ratelimit.CacheSlidingWindowBackend' if REDIS_URL else 'Prolean.ratelimit.DatabaseRateLimitBackend'
+)
+PROLEAN_RATELIMIT_CACHE = 'default'
+PROLEAN_RATELIMIT_QUEUE_SIZE = 10000
+PROLEAN_RATELIMIT_BATCH_SIZE = 200
+PROLEAN_RATELIMIT_FLUSH_INTERVAL = 2.0  # seconds
+
+# Invalidation bus (Prolean/bus.py): channel versions of the process-local
+# caches live in CacheChannel rows, polled by a thread in every process;
+# with REDIS_URL set they are pushed over Redis pub/sub as well
+BUS_POLL_INTERVAL = 1  # seconds between table reads without Redis
+BUS_REDIS_POLL_INTERVAL = 30  # seconds between table reads with Redis
+BUS_REDIS_CHANNEL = 'prolean:invalidation'
+
+# Blocked IPs (Prolean/blocklist.py): each worker keeps them in memory and
+# reloads when the blocklist bus channel moves; BLOCKLIST_MAX_AGE bounds
+# staleness if a message is lost.
+BLOCKLIST_CHECK_INTERVAL = 5  # seconds between version checks
+BLOCKLIST_MAX_AGE = 60  # seconds before a forced reload
+
+# Analytics ingestion (Prolean/analytics.py): page views and clicks are
+# queued in-process and bulk-written by a background thread.
+ANALYTICS_QUEUE_SIZE = 20000  # events kept before new ones are dropped
+ANALYTICS_BATCH_SIZE = 500
+ANALYTICS_FLUSH_INTERVAL = 1.0  # seconds
+
+# Currency rate table (Prolean/currency.py): loaded once per process and
+# reloaded when a CurrencyRate is saved (invalidation bus).
+CURRENCY_RATES_CHECK_INTERVAL = 30  # seconds between version checks
+CURRENCY_RATES_MAX_AGE = 3600  # seconds before a forced reload
+
+# Write-behind counters (Prolean/counters.py): view/inquiry counts and
+# review votes are buffered per process and flushed in one UPDATE per batch
+COUNTER_FLUSH_INTERVAL = 5  # seconds
+COUNTER_MAX_RETRIES = 12  # failed flushes before buffered counts are dropped
+
+# Review feed (Prolean/review_feed.py): keyset pages of approved reviews;
+# each training's first page is cached until any review is saved or deleted
+REVIEW_FEED_PAGE_SIZE = 10
+REVIEW_FEED_CACHE_TTL = 300  # seconds; bounds how long vote counts may lag
+
+# Cached artifacts (Prolean/invalidation.py) are keyed on the generations of
+# the models they depend on, so they can live long and still never be stale
+CACHE_ARTIFACT_TTL = 6 * 3600  # seconds
+
+# Anonymous page cache (Prolean/page_cache.py): rendered public pages keyed
+# by path, query, currency, language and the content version
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True') == 'True'
+PAGE_CACHE_TTL = 3600  # seconds
+
+# Catalog snapshot (Prolean/catalog.py): rebuilt when a Training is saved
+# or deleted (invalidation bus).
+CATALOG_CHECK_INTERVAL = 5  # seconds between version checks
+CATALOG_MAX_AGE = 900  # seconds before a forced rebuild
+
+# Cache warm-up (Prolean/warmup.py): the warm_caches command runs in the
+# release phase; set WARM_CACHES_ON_BOOT to also warm every gunicorn worker
+# before it takes traffic (gunicorn.conf.py). Keep it well under the worker
+# timeout.
+WARM_CACHES_ON_BOOT = os.environ.get('WARM_CACHES_ON_BOOT', 'False') == 'True'
+WARMUP_TOP_TRAININGS = 10  # most viewed training detail pages rendered
+
+# Catalog search (Prolean/search.py): in-memory BM25 index by default, or
+# 'Prolean.search.PostgresSearchBackend' on PostgreSQL (stored, GIN-indexed
+# tsvectors). Accents are folded in Python before the text reaches this
+# configuration, so the plain 'french' one needs no unaccent extension.
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'Prolean.search.MemorySearchBackend')
+SEARCH_POSTGRES_CONFIG = 'french'
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -219,3 +318,68 @@ SITE_MANAGEMENT_API_BASE = os.environ.get(
     'SITE_MANAGEMENT_API_BASE',
     'https://sitemanagement-production.up.railway.app/api'
 )
+
+# Shared Site Management API client (Prolean/api_client.py).
+# Per-endpoint (connect, read) timeouts can be overridden here, e.g.
+# MANAGEMENT_API_TIMEOUTS = {'student_dashboard': (3, 15)}
+MANAGEMENT_API_TIMEOUTS = {}
+MANAGEMENT_API_POOL_SIZE = 20
+MANAGEMENT_API_BREAKER_FAILURES = 5  # consecutive failures before failing fast
+MANAGEMENT_API_BREAKER_RESET = 30  # seconds before a trial call
+
+# Async proxy views (Prolean/async_views.py) for contact, pre-inscription,
+# register, login and dashboard. Only worth enabling when serving
+# Project.asgi, e.g. gunicorn -k uvicorn.workers.UvicornWorker Project.asgi
+ASYNC_PROXY_VIEWS = os.environ.get('ASYNC_PROXY_VIEWS', 'False') == 'True'
+MANAGEMENT_API_ASYNC_POOL_SIZE = 200  # connections per event loop
+
+# External student dashboard payload, cached per token hash: fresh for the
+# TTL, then served while revalidated in the background (If-None-Match)
+STUDENT_DASHBOARD_CACHE_TTL = 30  # seconds
+STUDENT_DASHBOARD_STALE_TTL = 300  # seconds
+
+# Outbox (Prolean/outbox.py): contact requests and pre-inscriptions are
+# stored locally and delivered in the background. The worker process sweeps
+# due messages (retries, restarts) every SCHEDULER_INTERVALS['deliver_outbox'].
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_CONCURRENCY = 4  # deliveries in flight per batch
+OUTBOX_FLUSH_INTERVAL = 0.2  # seconds before a partial in-process batch is sent
+OUTBOX_MAX_ATTEMPTS = 8  # then dead-lettered
+OUTBOX_RETRY_BASE = 30  # seconds, doubled after every failed attempt
+OUTBOX_RETRY_MAX = 3600
+
+# Registration city choices (Prolean/cities.py): served from memory and
+# refreshed in the background from the API and the City table.
+CITY_CHOICES_TTL = 900  # seconds before a background refresh
+CITY_CHOICES_CHECK_INTERVAL = 10  # seconds between version checks
+
+# Formations and cities are pulled into Training/City by the
+# sync_management_api command (Prolean/sync.py): in the release phase, then
+# every few minutes and with full=True nightly by the scheduler below.
+# Pages call the API live only until a first sync of each resource has
+# succeeded, or always when MANAGEMENT_API_REQUEST_FALLBACK is set.
+MANAGEMENT_API_REQUEST_FALLBACK = os.environ.get('MANAGEMENT_API_REQUEST_FALLBACK', 'False') == 'True'
+
+# Periodic jobs (Prolean/scheduler.py), run by the Procfile worker process
+# (`python manage.py run_scheduler`); seconds between runs, by job name
+SCHEDULER_INTERVALS = {
+    'sync_management_api': 300,
+    'sync_management_api_full': 24 * 3600,
+    'deliver_outbox': 30,
+    'update_analytics_rollups': 300,
+}
+
+# IP geolocation: local range database built with `python manage.py build_geoip_db`
+# (nixpacks build phase) from GEOIP_SOURCE_URL, DB-IP's monthly city lite CSV
+# (CC BY 4.0, https://db-ip.com). Lookups never leave the process unless
+# GEOIP_REMOTE_FALLBACK is enabled.
+GEOIP_SOURCE_URL = os.environ.get(
+    'GEOIP_SOURCE_URL',
+    'https://download.db-ip.com/free/dbip-city-lite-{month}.csv.gz'
+)
+GEOIP_DATABASE_PATH = os.environ.get('GEOIP_DATABASE_PATH', str(BASE_DIR / 'geoip' / 'ip_ranges.bin'))
+GEOIP_CACHE_SIZE = int(os.environ.get('GEOIP_CACHE_SIZE', '10000'))
+GEOIP_CACHE_TTL = 3600  # seconds
+GEOIP_RELOAD_INTERVAL = 60  # seconds between checks for a rebuilt database file
+GEOIP_REMOTE_FALLBACK = os.environ.get('GEOIP_REMOTE_FALLBACK', 'False') == 'True'
+GEOIP_FAILURE_TTL = 60  # seconds a failed remote lookup is remembered
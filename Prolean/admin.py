@@ -5,8 +5,8 @@ from .models import (
     Profile, StudentProfile, ProfessorProfile, AssistantProfile, City,
     Session, RecordedVideo, LiveRecording,
     AttendanceLog, VideoProgress, Question, Live, Training,
-    ContactRequest, DailyStat, CurrencyRate, TrainingWaitlist,
-    TrainingReview, ThreatIP, RateLimitLog, FormSubmission,
+    ContactRequest, DailyStat, AnalyticsRollup, SyncCursor, CacheChannel, OutboxMessage, CurrencyRate, TrainingWaitlist,
+    TrainingReview, TrainingRatingSummary, ThreatIP, RateLimitLog, FormSubmission,
     VisitorSession, PageView, WhatsAppClick, Notification, Seance
 )
 
@@ -97,11 +97,66 @@ class TrainingReviewAdmin(admin.ModelAdmin):
     list_editable = ('is_verified', 'is_approved')
     search_fields = ('full_name', 'email', 'title', 'comment')
 
+@admin.register(TrainingRatingSummary)
+class TrainingRatingSummaryAdmin(admin.ModelAdmin):
+    list_display = ('training', 'review_count', 'average', 'stars_5', 'stars_4', 'stars_3', 'stars_2', 'stars_1', 'last_review_at')
+    readonly_fields = ('training', 'review_count', 'rating_sum', 'stars_1', 'stars_2', 'stars_3',
+                       'stars_4', 'stars_5', 'last_review_at', 'updated_at')
+    actions = ['rebuild_summaries']
+
+    def rebuild_summaries(self, request, queryset):
+        from .ratings import rebuild
+        count = rebuild(list(queryset.values_list('training_id', flat=True)))
+        self.message_user(request, f"{count} résumé(s) recalculé(s).")
+    rebuild_summaries.short_description = "Recalculer les résumés sélectionnés"
+
 @admin.register(DailyStat)
 class DailyStatAdmin(admin.ModelAdmin):
     list_display = ('date', 'total_visitors', 'total_pageviews', 'total_form_submissions')
     date_hierarchy = 'date'
 
+@admin.register(AnalyticsRollup)
+class AnalyticsRollupAdmin(admin.ModelAdmin):
+    list_display = ('period_start', 'granularity', 'dimension', 'key', 'pageviews', 'visitors', 'sessions')
+    list_filter = ('granularity', 'dimension')
+    search_fields = ('key',)
+    date_hierarchy = 'period_start'
+
+@admin.register(SyncCursor)
+class SyncCursorAdmin(admin.ModelAdmin):
+    list_display = ('resource', 'cursor', 'last_success_at', 'last_changed', 'max_item_lag_seconds', 'last_error')
+    readonly_fields = ('last_attempt_at', 'last_success_at', 'last_full_sync_at', 'last_duration_ms',
+                       'last_fetched', 'last_changed', 'max_item_lag_seconds', 'last_error', 'updated_at')
+
+@admin.register(CacheChannel)
+class CacheChannelAdmin(admin.ModelAdmin):
+    list_display = ('name', 'version', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'version', 'updated_at')
+    actions = ['republish']
+
+    def republish(self, request, queryset):
+        from . import bus
+        names = list(queryset.values_list('name', flat=True))
+        for name in names:
+            bus.publish(name)
+        self.message_user(request, f"{len(names)} canal(aux) republié(s) : les caches locaux seront reconstruits.")
+    republish.short_description = "Vider les caches locaux de ces canaux"
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'created_at', 'next_attempt_at', 'delivered_at', 'last_error')
+    list_filter = ('status', 'kind')
+    search_fields = ('idempotency_key', 'remote_id')
+    readonly_fields = ('idempotency_key', 'created_at', 'delivered_at', 'remote_id', 'last_error')
+    actions = ['retry_messages']
+
+    def retry_messages(self, request, queryset):
+        from .outbox import retry_dead
+        count = retry_dead(ids=list(queryset.values_list('id', flat=True)))
+        self.message_user(request, f"{count} message(s) remis en file d'attente.")
+    retry_messages.short_description = "Renvoyer les messages abandonnés"
+
 @admin.register(CurrencyRate)
 class CurrencyRateAdmin(admin.ModelAdmin):
     list_display = ('currency_code', 'currency_name', 'rate_to_mad', 'last_updated')
@@ -454,6 +509,7 @@ def get_app_list(self, request, app_label=None):
         
         # Analytics
         'DailyStat': 30,
+        'AnalyticsRollup': 35,
         'VisitorSession': 31,
         'PageView': 32,
         'ClickEvent': 33,
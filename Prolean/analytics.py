@@ -0,0 +1,224 @@
+# analytics.py - batched analytics ingestion
+"""
+Page views and click events are queued in-process by the views and written
+by a background thread: one ``bulk_create`` per event model and a batched
+``VisitorSession`` upsert per flush, in one transaction, every
+ANALYTICS_BATCH_SIZE events or ANALYTICS_FLUSH_INTERVAL seconds. When the
+queue is full, new events are dropped (and counted) instead of slowing the
+request down.
+
+Events carry the time they were recorded and are normalized when queued
+(a missing or malformed client IP becomes UNKNOWN_IP). If the database
+still rejects a batch, its events are written one by one so only the
+faulty ones are lost.
+"""
+import ipaddress
+import logging
+import uuid
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .middleware import get_request_cache
+from .utils import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+VISITOR_ID_KEY = 'analytics_visitor_id'
+UNKNOWN_IP = '0.0.0.0'
+
+dropped_by_kind = Counter()
+rejected_by_kind = Counter()
+
+
+def get_visitor_id(request, create=True):
+    """
+    Stable analytics id for the visitor, kept in the session.
+    (Signed-cookie sessions have no usable session_key.)
+    """
+    visitor_id = request.session.get(VISITOR_ID_KEY)
+    if not visitor_id and create:
+        visitor_id = uuid.uuid4().hex
+        request.session[VISITOR_ID_KEY] = visitor_id
+    return visitor_id
+
+
+def _clean_ip(value):
+    try:
+        return str(ipaddress.ip_address((value or '').strip()))
+    except ValueError:
+        return UNKNOWN_IP
+
+
+def _enqueue(kind, fields):
+    fields['ip_address'] = _clean_ip(fields['ip_address'])
+    fields['session_id'] = str(fields['session_id'])[:100]
+    fields['timestamp'] = timezone.now()
+    if not event_queue.put((kind, fields)):
+        dropped_by_kind[kind] += 1
+        dropped = event_queue.dropped
+        if dropped == 1 or dropped % 1000 == 0:
+            logger.warning(f"Analytics queue full, {dropped} events dropped so far")
+        return False
+    return True
+
+
+# ========== PRODUCERS (request path) ==========
+
+def record_page_view(request, page_title=''):
+    request_cache = get_request_cache(request)
+    user_location = request_cache.location
+    return _enqueue('page_view', {
+        'url': request.path[:500],
+        'page_title': page_title[:200],
+        'referrer': request.META.get('HTTP_REFERER', '')[:500],
+        'session_id': get_visitor_id(request),
+        'ip_address': request_cache.client_ip,
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+        'city': user_location.get('city', ''),
+        'country': user_location.get('country', ''),
+        'device_type': 'desktop',
+    })
+
+
+def record_click(request, session_id, data):
+    request_cache = get_request_cache(request)
+    return _enqueue('click', {
+        'element_type': str(data.get('element_type', 'button'))[:50],
+        'element_text': str(data.get('element_text', ''))[:200],
+        'element_id': str(data.get('element_id', ''))[:100],
+        'url': str(data.get('url', request.path))[:500],
+        'session_id': session_id,
+        'ip_address': request_cache.client_ip,
+        'city': request_cache.location.get('city', ''),
+    })
+
+
+def record_phone_call(request, session_id, data):
+    request_cache = get_request_cache(request)
+    user_location = request_cache.location
+    return _enqueue('phone_call', {
+        'phone_number': str(data.get('phone_number', ''))[:20],
+        'caller_city': user_location.get('city', ''),
+        'caller_country': user_location.get('country', ''),
+        'url': str(data.get('url', request.path))[:500],
+        'session_id': session_id,
+        'ip_address': request_cache.client_ip,
+    })
+
+
+def record_whatsapp_click(request, session_id, data):
+    request_cache = get_request_cache(request)
+    return _enqueue('whatsapp', {
+        'phone_number': str(data.get('phone_number', '+212779259942'))[:20],
+        'message_prefill': str(data.get('message', '')),
+        'url': str(data.get('url', request.path))[:500],
+        'session_id': session_id,
+        'ip_address': request_cache.client_ip,
+        'city': request_cache.location.get('city', ''),
+    })
+
+
+# ========== CONSUMER (background thread) ==========
+
+def _event_models():
+    from .models import ClickEvent, PageView, PhoneCall, WhatsAppClick
+
+    return {
+        'page_view': PageView,
+        'click': ClickEvent,
+        'phone_call': PhoneCall,
+        'whatsapp': WhatsAppClick,
+    }
+
+
+def _upsert_sessions(page_views):
+    """Create missing VisitorSessions, then add this batch's page views to all of them"""
+    from .models import VisitorSession
+
+    per_session = Counter(event['session_id'] for event in page_views)
+    first_event = {}
+    last_seen = {}
+    for event in page_views:
+        first_event.setdefault(event['session_id'], event)
+        last_seen[event['session_id']] = event['timestamp']
+
+    # Insert with page_views=0 and let the update below count every view, so
+    # sessions created concurrently by another worker are not undercounted.
+    VisitorSession.objects.bulk_create([
+        VisitorSession(
+            session_id=session_id,
+            ip_address=event['ip_address'],
+            user_agent=event['user_agent'],
+            city=event['city'],
+            country=event['country'],
+            device_type=event['device_type'],
+            landing_page=event['url'],
+            referrer=event['referrer'],
+            page_views=0,
+        )
+        for session_id, event in first_event.items()
+    ], ignore_conflicts=True)
+
+    sessions = list(
+        VisitorSession.objects.filter(session_id__in=list(per_session)).only('id', 'session_id')
+    )
+    for visitor_session in sessions:
+        visitor_session.page_views = F('page_views') + per_session[visitor_session.session_id]
+        visitor_session.last_activity = last_seen[visitor_session.session_id]
+    VisitorSession.objects.bulk_update(sessions, ['page_views', 'last_activity'], batch_size=500)
+
+
+def _write_batch(events):
+    models_by_kind = _event_models()
+    grouped = defaultdict(list)
+    for kind, fields in events:
+        grouped[kind].append(fields)
+
+    with transaction.atomic():
+        page_views = grouped.get('page_view', [])
+        if page_views:
+            _upsert_sessions(page_views)
+
+        for kind, rows in grouped.items():
+            model = models_by_kind[kind]
+            model.objects.bulk_create([model(**row) for row in rows], batch_size=500)
+
+
+def _write_events(events):
+    try:
+        _write_batch(events)
+        return
+    except (DataError, IntegrityError) as exc:
+        logger.warning(f"Analytics batch of {len(events)} events rejected ({exc}), writing them one by one")
+
+    for event in events:
+        try:
+            _write_batch([event])
+        except (DataError, IntegrityError) as exc:
+            rejected_by_kind[event[0]] += 1
+            logger.error(f"Dropped invalid analytics {event[0]} event: {exc}")
+
+
+event_queue = BackgroundBatcher(
+    'analytics-events',
+    _write_events,
+    max_size=getattr(settings, 'ANALYTICS_QUEUE_SIZE', 20000),
+    batch_size=getattr(settings, 'ANALYTICS_BATCH_SIZE', 500),
+    interval=getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 1.0),
+)
+
+
+def flush():
+    """Write every queued event now (management commands, tests)"""
+    event_queue.flush()
+
+
+def stats():
+    result = event_queue.stats()
+    result['dropped_by_kind'] = dict(dropped_by_kind)
+    result['rejected_by_kind'] = dict(rejected_by_kind)
+    return result
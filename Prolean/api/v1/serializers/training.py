@@ -3,6 +3,8 @@ Training Serializers for Prolean API
 """
 from rest_framework import serializers
 from Prolean.models import Training, City
+from Prolean.catalog import count_modules
+from Prolean import ratings
 
 
 class CitySerializer(serializers.ModelSerializer):
@@ -23,6 +25,8 @@ class TrainingListSerializer(serializers.ModelSerializer):
     duration_hours = serializers.SerializerMethodField()
     module_count = serializers.SerializerMethodField()
     level = serializers.SerializerMethodField()
+    avg_rating = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Training
@@ -32,7 +36,7 @@ class TrainingListSerializer(serializers.ModelSerializer):
             'duration_days', 'duration_hours',
             'badge', 'is_featured', 'thumbnail', 'thumbnail_url',
             'available_cities', 'next_session', 'success_rate',
-            'module_count', 'level'
+            'module_count', 'level', 'avg_rating', 'review_count'
         ]
     
     def get_available_cities(self, obj):
@@ -43,17 +47,25 @@ class TrainingListSerializer(serializers.ModelSerializer):
         return obj.duration_days * 7  # Approximate 7 hours per day
 
     def get_module_count(self, obj):
-        count = 0
-        structure = obj.programme_structure or {}
-        if 'theorique' in structure and 'modules' in structure['theorique']:
-            count += len(structure['theorique']['modules'])
-        if 'pratique' in structure and 'modules' in structure['pratique']:
-            count += len(structure['pratique']['modules'])
-        return count
+        # Catalog snapshot entries carry the precomputed count
+        if hasattr(obj, 'module_count'):
+            return obj.module_count
+        return count_modules(obj.programme_structure)
 
     def get_level(self, obj):
         return 'intermediaire' # Default/Placeholder
 
+    def get_avg_rating(self, obj):
+        # Catalog snapshot entries carry the rating; models read their summary
+        if hasattr(obj, 'avg_rating'):
+            return obj.avg_rating
+        return ratings.get_summary(obj).average
+
+    def get_review_count(self, obj):
+        if hasattr(obj, 'review_count'):
+            return obj.review_count
+        return ratings.get_summary(obj).review_count
+
 
 class TrainingDetailSerializer(serializers.ModelSerializer):
     """Serializer for Training detail view (full information)"""
@@ -76,6 +88,7 @@ class TrainingDetailSerializer(serializers.ModelSerializer):
     duration_hours = serializers.SerializerMethodField()
     module_count = serializers.SerializerMethodField()
     level = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
     
     class Meta:
         model = Training
@@ -120,6 +133,9 @@ class TrainingDetailSerializer(serializers.ModelSerializer):
             # Metadata
             'created_at', 'view_count', 'inquiry_count', 'enrollment_count',
             
+            # Reviews
+            'rating',
+            
             # Frontend aliases
             'price', 'duration_hours', 'thumbnail_url', 'module_count', 'level'
         ]
@@ -161,13 +177,16 @@ class TrainingDetailSerializer(serializers.ModelSerializer):
         return obj.duration_days * 7
 
     def get_module_count(self, obj):
-        count = 0
-        structure = obj.programme_structure or {}
-        if 'theorique' in structure and 'modules' in structure['theorique']:
-            count += len(structure['theorique']['modules'])
-        if 'pratique' in structure and 'modules' in structure['pratique']:
-            count += len(structure['pratique']['modules'])
-        return count
+        return count_modules(obj.programme_structure)
 
     def get_level(self, obj):
         return 'intermediaire'
+
+    def get_rating(self, obj):
+        summary = ratings.get_summary(obj)
+        return {
+            'average': summary.average,
+            'count': summary.review_count,
+            'histogram': summary.histogram,
+            'last_review_at': summary.last_review_at,
+        }
@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 from Prolean.models import Training, City
+from Prolean import catalog
 from ..serializers.training import (
     TrainingListSerializer,
     TrainingDetailSerializer,
@@ -22,7 +23,7 @@ class TrainingListView(generics.ListAPIView):
     """
     permission_classes = [AllowAny]
     serializer_class = TrainingListSerializer
-    queryset = Training.objects.filter(is_active=True).order_by('-is_featured', '-created_at')
+    queryset = Training.objects.filter(is_active=True).select_related('rating_summary').order_by('-is_featured', '-created_at')
     
     def get_queryset(self):
         """Filter by category if provided"""
@@ -48,6 +49,29 @@ class TrainingListView(generics.ListAPIView):
             queryset = queryset.filter(is_featured=True)
         
         return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """Serve the list from the in-memory catalog snapshot when available"""
+        snapshot = catalog.get_snapshot()
+        if snapshot is None:
+            return super().list(request, *args, **kwargs)
+        
+        featured = self.request.query_params.get('featured', None)
+        category = self.request.query_params.get('category', None)
+        city = self.request.query_params.get('city', None)
+        # Unknown categories/cities are ignored, as in get_queryset
+        entries = snapshot.filter(
+            category=category if category in catalog.CATEGORY_BITS else None,
+            city=city.lower() if city and city.lower() in catalog.CITY_BITS else None,
+            featured=True if featured and featured.lower() == 'true' else None,
+        )
+        # Snapshot order is -created_at; a stable sort keeps it within each group
+        entries.sort(key=lambda entry: not entry.is_featured)
+        
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(entries, many=True).data)
 
 
 class TrainingDetailView(generics.RetrieveAPIView):
@@ -58,7 +82,7 @@ class TrainingDetailView(generics.RetrieveAPIView):
     """
     permission_classes = [AllowAny]
     serializer_class = TrainingDetailSerializer
-    queryset = Training.objects.filter(is_active=True)
+    queryset = Training.objects.filter(is_active=True).select_related('rating_summary')
     lookup_field = 'slug'
     
     def retrieve(self, request, *args, **kwargs):
@@ -0,0 +1,460 @@
+# api_client.py - shared HTTP client for the Site Management API
+"""
+All calls to the Site Management API go through ``public_api`` /
+``management_api``:
+
+* one pooled ``requests.Session`` per process (keep-alive, bounded pool);
+* per-endpoint (connect, read) timeouts instead of a blanket 8-20 s;
+* a circuit breaker per upstream host: after MANAGEMENT_API_BREAKER_FAILURES
+  consecutive failures calls fail immediately with ``CircuitOpenError`` for
+  MANAGEMENT_API_BREAKER_RESET seconds, then one trial call is let through;
+* ``get_json`` caches GET responses and serves them stale while a
+  background thread revalidates them (conditionally, with the ETag),
+  including while the upstream is down;
+* latency / error counters per endpoint (``metrics()``).
+
+``public_api_async`` / ``management_api_async`` are httpx-based
+counterparts for async views (async_views.py), sharing the same timeouts,
+breakers and metrics. Each event loop gets its own pooled
+``httpx.AsyncClient``.
+
+``python manage.py api_stub`` runs a local stand-in for the API whose
+latency and failure rate can be tuned.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (connect timeout, read timeout) in seconds
+DEFAULT_TIMEOUTS = {
+    'formations': (2, 5),
+    'formation_detail': (2, 5),
+    'cities': (2, 4),
+    'contact_request': (3, 10),
+    'pre_inscription': (3, 10),
+    'student_register': (3, 10),
+    'student_login': (3, 8),
+    'student_dashboard': (3, 8),
+}
+FALLBACK_TIMEOUT = (3, 10)
+
+NOT_MODIFIED = object()
+
+
+class APIError(requests.RequestException):
+    """Upstream answered with an error status (raised by get_json)"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised without calling the upstream while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open after a delay"""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a trial call that gave no verdict on the upstream (cancelled, unexpected error)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+
+class EndpointMetrics:
+    """Counters and a sliding window of latencies for one endpoint"""
+
+    def __init__(self, window=1000):
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.stale_served = 0
+        self.not_modified = 0
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        cached = self.cache_hits + self.stale_served
+        lookups = cached + self.cache_misses
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'short_circuited': self.short_circuited,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'stale_served': self.stale_served,
+            'not_modified': self.not_modified,
+            'hit_rate': round(cached / lookups, 3) if lookups else None,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+        }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_metrics = defaultdict(EndpointMetrics)
+
+
+def _breaker_for(base_url):
+    host = urlsplit(base_url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                host,
+                failure_threshold=getattr(settings, 'MANAGEMENT_API_BREAKER_FAILURES', 5),
+                reset_timeout=getattr(settings, 'MANAGEMENT_API_BREAKER_RESET', 30.0),
+            )
+            _breakers[host] = breaker
+        return breaker
+
+
+class APIClient:
+    """Pooled, circuit-broken client for one API base URL"""
+
+    def __init__(self, base_setting, default_base):
+        self.base_setting = base_setting
+        self.default_base = default_base
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    @property
+    def base_url(self):
+        return getattr(settings, self.base_setting, self.default_base).rstrip('/')
+
+    @property
+    def session(self):
+        # Pooled connections must not be shared with forked workers
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=getattr(settings, 'MANAGEMENT_API_POOL_SIZE', 20),
+                        max_retries=0,
+                    )
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+                    self._pid = pid
+        return self._session
+
+    def timeout_for(self, endpoint):
+        timeouts = dict(DEFAULT_TIMEOUTS)
+        timeouts.update(getattr(settings, 'MANAGEMENT_API_TIMEOUTS', {}))
+        return timeouts.get(endpoint, FALLBACK_TIMEOUT)
+
+    def request(self, method, endpoint, path, **kwargs):
+        """
+        Send one request and return the ``requests.Response``.
+        Raises CircuitOpenError without calling out while the upstream is failing.
+        """
+        metrics = _metrics[endpoint]
+        breaker = _breaker_for(self.base_url)
+        if not breaker.allow():
+            metrics.short_circuited += 1
+            raise CircuitOpenError(f"{breaker.name} circuit open, skipping {endpoint}")
+
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        metrics.requests += 1
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.Timeout:
+            metrics.timeouts += 1
+            metrics.errors += 1
+            breaker.record_failure()
+            raise
+        except requests.RequestException:
+            metrics.errors += 1
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Without this the half-open trial would stay in flight forever
+            breaker.release()
+            raise
+        finally:
+            metrics.latencies.append(time.perf_counter() - started)
+
+        # 4xx means the upstream is healthy; only 5xx counts against it
+        if response.status_code >= 500:
+            metrics.errors += 1
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, endpoint, path, **kwargs):
+        return self.request('GET', endpoint, path, **kwargs)
+
+    def post(self, endpoint, path, **kwargs):
+        return self.request('POST', endpoint, path, **kwargs)
+
+    def _fetch_json(self, endpoint, path, headers=None, etag=None):
+        """(data, etag); data is NOT_MODIFIED when ``etag`` is still current"""
+        headers = dict(headers or {})
+        if etag:
+            headers['If-None-Match'] = etag
+        response = self.get(endpoint, path, headers=headers)
+        if response.status_code == 304 and etag:
+            return NOT_MODIFIED, etag
+        if response.status_code != 200:
+            raise APIError(f"{endpoint} returned {response.status_code}", response.status_code)
+        return response.json(), response.headers.get('ETag', '')
+
+    def cache_key(self, path, variant=''):
+        return f'api:{self.base_url}{path}{variant}'
+
+    def _store(self, key, data, etag, ttl, stale_ttl):
+        cache.set(key, {'data': data, 'etag': etag, 'fetched_at': time.time()}, ttl + stale_ttl)
+
+    def _revalidate(self, endpoint, path, key, entry, headers, ttl, stale_ttl):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                data, etag = self._fetch_json(endpoint, path, headers, entry.get('etag'))
+                if data is NOT_MODIFIED:
+                    _metrics[endpoint].not_modified += 1
+                    data = entry['data']
+                self._store(key, data, etag, ttl, stale_ttl)
+            except APIError as exc:
+                if exc.status_code in (401, 403, 404):
+                    # Gone or no longer authorised: stop serving the copy
+                    cache.delete(key)
+                logger.info(f"Background refresh of {endpoint} failed: {exc}")
+            except Exception as exc:
+                logger.info(f"Background refresh of {endpoint} failed, keeping stale copy: {exc}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name=f'api-refresh-{endpoint}', daemon=True).start()
+
+    def get_json(self, endpoint, path, ttl=300, stale_ttl=3600, headers=None, variant=''):
+        """
+        GET ``path`` and return the decoded JSON, cached for ``ttl`` seconds.
+        For ``stale_ttl`` more seconds the cached copy is returned while a
+        background request revalidates it (If-None-Match when the upstream
+        sent an ETag). Raises APIError / requests exceptions when there is
+        nothing cached. Responses that depend on ``headers`` (auth) need a
+        ``variant`` identifying them, e.g. a token hash.
+        """
+        metrics = _metrics[endpoint]
+        key = self.cache_key(path, variant)
+        entry = cache.get(key)
+        if entry is not None:
+            age = time.time() - entry['fetched_at']
+            if age < ttl:
+                metrics.cache_hits += 1
+                return entry['data']
+            metrics.stale_served += 1
+            self._revalidate(endpoint, path, key, entry, headers, ttl, stale_ttl)
+            return entry['data']
+
+        metrics.cache_misses += 1
+        data, etag = self._fetch_json(endpoint, path, headers)
+        self._store(key, data, etag, ttl, stale_ttl)
+        return data
+
+    def invalidate(self, path, variant=''):
+        cache.delete(self.cache_key(path, variant))
+
+
+class AsyncAPIClient:
+    """httpx counterpart of an APIClient for async views"""
+
+    def __init__(self, sync_client):
+        self.sync_client = sync_client
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def base_url(self):
+        return self.sync_client.base_url
+
+    @property
+    def client(self):
+        # httpx.AsyncClient is bound to the loop it was first used on
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            size = getattr(settings, 'MANAGEMENT_API_ASYNC_POOL_SIZE', 200)
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method, endpoint, path, **kwargs):
+        """
+        Send one request and return the ``httpx.Response``.
+        Raises CircuitOpenError without calling out while the upstream is failing.
+        """
+        metrics = _metrics[endpoint]
+        breaker = _breaker_for(self.base_url)
+        if not breaker.allow():
+            metrics.short_circuited += 1
+            raise CircuitOpenError(f"{breaker.name} circuit open, skipping {endpoint}")
+
+        connect, read = self.sync_client.timeout_for(endpoint)
+        kwargs.setdefault('timeout', httpx.Timeout(read, connect=connect))
+        metrics.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, f"{self.base_url}{path}", **kwargs)
+        except httpx.TimeoutException:
+            metrics.timeouts += 1
+            metrics.errors += 1
+            breaker.record_failure()
+            raise
+        except httpx.HTTPError:
+            metrics.errors += 1
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # CancelledError when the client disconnects: let the next trial through
+            breaker.release()
+            raise
+        finally:
+            metrics.latencies.append(time.perf_counter() - started)
+
+        if response.status_code >= 500:
+            metrics.errors += 1
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def get(self, endpoint, path, **kwargs):
+        return await self.request('GET', endpoint, path, **kwargs)
+
+    async def get_json(self, endpoint, path, ttl=300, stale_ttl=3600, headers=None, variant=''):
+        """Async APIClient.get_json sharing its cache entries; revalidation runs in a thread"""
+        sync_client = self.sync_client
+        metrics = _metrics[endpoint]
+        key = sync_client.cache_key(path, variant)
+        entry = await cache.aget(key)
+        if entry is not None:
+            if time.time() - entry['fetched_at'] < ttl:
+                metrics.cache_hits += 1
+                return entry['data']
+            metrics.stale_served += 1
+            sync_client._revalidate(endpoint, path, key, entry, headers, ttl, stale_ttl)
+            return entry['data']
+
+        metrics.cache_misses += 1
+        response = await self.get(endpoint, path, headers=headers or {})
+        if response.status_code != 200:
+            raise APIError(f"{endpoint} returned {response.status_code}", response.status_code)
+        data = response.json()
+        await cache.aset(
+            key, {'data': data, 'etag': response.headers.get('ETag', ''), 'fetched_at': time.time()}, ttl + stale_ttl
+        )
+        return data
+
+    async def post(self, endpoint, path, **kwargs):
+        return await self.request('POST', endpoint, path, **kwargs)
+
+
+public_api = APIClient(
+    'SITE_MANAGEMENT_PUBLIC_API_BASE',
+    'https://sitemanagement-production.up.railway.app/api/public',
+)
+management_api = APIClient(
+    'SITE_MANAGEMENT_API_BASE',
+    'https://sitemanagement-production.up.railway.app/api',
+)
+public_api_async = AsyncAPIClient(public_api)
+management_api_async = AsyncAPIClient(management_api)
+
+
+def metrics():
+    """Per-endpoint counters and latency percentiles, plus breaker states"""
+    return {
+        'endpoints': {endpoint: m.snapshot() for endpoint, m in sorted(_metrics.items())},
+        'breakers': {
+            host: {'state': breaker.state, 'failures': breaker.failures}
+            for host, breaker in _breakers.items()
+        },
+    }
+
+
+def reset():
+    """Forget breaker states and metrics (stub tests, benchmarks)"""
+    with _breakers_lock:
+        _breakers.clear()
+    _metrics.clear()
@@ -10,4 +10,7 @@ class ProleanConfig(AppConfig):
         try:
             import Prolean.signals
         except ImportError:
-            pass
\ No newline at end of file
+            pass
+        # Registers the geoip.W001 and ratelimit.W001 system checks
+        import Prolean.geoip
+        import Prolean.ratelimit
\ No newline at end of file
@@ -0,0 +1,229 @@
+# async_views.py - async variants of the Site Management API proxy views
+"""
+Same behaviour as the views of the same name in views.py, but the upstream
+call is awaited on the shared httpx pool instead of blocking a worker
+thread, so one ASGI process can hold hundreds of proxy calls in flight.
+
+Contact requests and pre-inscriptions only await the local outbox insert
+(outbox.py). Enabled with ASYNC_PROXY_VIEWS when serving Project.asgi (see urls.py);
+under WSGI every async view gets its own event loop and gains nothing.
+Database, cache, form and template work still runs in sync_to_async.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import outbox, views
+from .api_client import APIError, management_api_async
+from .forms import StudentLoginForm, StudentRegistrationForm
+from .middleware import get_request_cache
+
+logger = logging.getLogger(__name__)
+
+arender = sync_to_async(render)
+
+
+def _json(response):
+    return response.json() if response.content else {}
+
+
+@require_POST
+@csrf_exempt
+async def submit_contact_request(request):
+    """Queue a contact request for the Site Management API (single source of truth)."""
+    try:
+        ip_address = get_request_cache(request).client_ip
+        allowed, wait_time = await sync_to_async(views.RateLimiter.check_rate_limit)(
+            ip_address, 'submit_contact', limit=5
+        )
+        if not allowed:
+            return JsonResponse({
+                'success': False,
+                'message': f'Trop de demandes. Réessayez dans {wait_time} secondes.'
+            }, status=429)
+
+        data = json.loads(request.body)
+        payload = {
+            'full_name': data.get('full_name', '').strip(),
+            'email': data.get('email', '').strip().lower() or None,
+            'phone': data.get('phone', '').strip() or None,
+            'city_id': data.get('city_id') or data.get('city') or None,
+            'message': data.get('message', '').strip(),
+            'request_type': data.get('request_type', 'information'),
+            'training_title': data.get('training_title', ''),
+            'source': 'prolean_public_site',
+        }
+
+        # Stored locally and delivered in the background (outbox.py)
+        message = await sync_to_async(outbox.enqueue)('contact_request', payload)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Votre demande a été envoyée avec succès.',
+            'request_id': str(message.idempotency_key)
+        })
+    except Exception as e:
+        logger.error(f"Error queueing contact request: {e}")
+        return JsonResponse({
+            'success': False,
+            'message': 'Service temporairement indisponible.'
+        }, status=503)
+
+
+@csrf_exempt
+@require_POST
+async def create_pre_subscription(request):
+    """Queue a pre-inscription for the Site Management API."""
+    try:
+        data = json.loads(request.body)
+
+        required_fields = ['training_id', 'full_name', 'email', 'phone']
+        for field in required_fields:
+            if not data.get(field):
+                return JsonResponse({
+                    'success': False,
+                    'message': f'Le champ {field} est obligatoire'
+                }, status=400)
+
+        payload = {
+            'formation_id': data.get('training_id'),
+            'full_name': data.get('full_name', '').strip(),
+            'email': data.get('email', '').strip().lower(),
+            'phone': data.get('phone', '').strip(),
+            'city_id': data.get('city_id') or data.get('city') or None,
+            'message': data.get('message') or '',
+            'payment_method': data.get('payment_method'),
+            'currency_used': data.get('currency_used', 'MAD'),
+            'source': 'prolean_public_site',
+        }
+
+        message = await sync_to_async(outbox.enqueue)('pre_inscription', payload)
+
+        return JsonResponse({
+            'success': True,
+            'message': 'Pre-inscription enregistree avec succes.',
+            'subscription': {
+                'id': str(message.idempotency_key),
+                'transaction_id': str(message.idempotency_key),
+                'payment_method': data.get('payment_method'),
+                'payment_status': 'pending'
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error queueing pre-subscription: {str(e)}")
+        return JsonResponse({
+            'success': False,
+            'message': 'Service temporairement indisponible.'
+        }, status=503)
+
+
+def _bound_form(form_class, data=None):
+    form = form_class(data) if data is not None else form_class()
+    if data is not None:
+        form.is_valid()
+    return form
+
+
+async def register(request):
+    """Handle student registration via management API (no local DB dependency)."""
+    if request.method == 'POST':
+        form = await sync_to_async(_bound_form)(StudentRegistrationForm, request.POST)
+        if form.is_valid():
+            try:
+                payload = {
+                    'full_name': form.cleaned_data.get('full_name'),
+                    'email': form.cleaned_data.get('email'),
+                    'password': form.cleaned_data.get('password'),
+                    'cin_or_passport': form.cleaned_data.get('cin_or_passport'),
+                    'phone_number': form.cleaned_data.get('phone_number'),
+                    'city_id': form.cleaned_data.get('city'),
+                }
+                response = await management_api_async.post(
+                    'student_register',
+                    '/public/student-register',
+                    json=payload
+                )
+                if response.status_code in (200, 201):
+                    messages.success(request, "Compte cree avec succes. Vous pouvez maintenant vous connecter.")
+                    return redirect('Prolean:login')
+                try:
+                    data = response.json()
+                    error_message = data.get('error') or data.get('message') or "Erreur lors de l'inscription."
+                except Exception:
+                    error_message = "Erreur lors de l'inscription."
+                form.add_error(None, error_message)
+            except Exception as exc:
+                logger.error(f"Registration API call failed: {exc}")
+                form.add_error(None, "Service d'inscription indisponible. Reessayez plus tard.")
+    else:
+        form = await sync_to_async(_bound_form)(StudentRegistrationForm)
+
+    return await arender(request, 'registration/signup.html', {'form': form})
+
+
+async def login_view(request):
+    """External student login view using Site Management API."""
+    if request.method == 'POST':
+        form = await sync_to_async(_bound_form)(StudentLoginForm, request.POST)
+        if form.is_valid():
+            try:
+                response = await management_api_async.post(
+                    'student_login',
+                    '/public/student-login',
+                    json={
+                        'email': form.cleaned_data.get('email'),
+                        'password': form.cleaned_data.get('password'),
+                    }
+                )
+                payload = _json(response)
+                if response.status_code == 200 and payload.get('token'):
+                    await request.session.aset('external_student_token', payload.get('token'))
+                    await request.session.aset('external_student_profile', payload.get('student', {}))
+                    messages.success(request, "Connexion reussie.")
+                    return redirect('Prolean:dashboard')
+                form.add_error(None, payload.get('error') or "Identifiants invalides.")
+            except Exception as exc:
+                logger.error(f"External student login failed: {exc}")
+                form.add_error(None, "Service de connexion indisponible. Reessayez plus tard.")
+    else:
+        form = StudentLoginForm()
+
+    return await arender(request, 'registration/login.html', {'form': form})
+
+
+async def dashboard(request):
+    """Student dashboard view - external students are proxied asynchronously"""
+    external_token = await request.session.aget('external_student_token')
+    if not external_token:
+        # Local accounts: the regular (database-backed) dashboard
+        return await sync_to_async(views.dashboard)(request)
+
+    try:
+        payload = await management_api_async.get_json(
+            'student_dashboard',
+            views.STUDENT_DASHBOARD_PATH,
+            ttl=getattr(settings, 'STUDENT_DASHBOARD_CACHE_TTL', 30),
+            stale_ttl=getattr(settings, 'STUDENT_DASHBOARD_STALE_TTL', 300),
+            headers={'Authorization': f'Bearer {external_token}'},
+            variant=views._token_variant(external_token),
+        )
+    except APIError as exc:
+        if exc.status_code == 401:
+            await sync_to_async(views._clear_external_student_session)(request)
+            messages.error(request, "Session expiree. Veuillez vous reconnecter.")
+            return redirect('Prolean:login')
+        logger.error(f"Failed to load external student dashboard: {exc}")
+        messages.error(request, "Impossible de charger votre espace.")
+        return redirect('Prolean:login')
+    except Exception as exc:
+        logger.error(f"Failed to load external student dashboard: {exc}")
+        messages.error(request, "Service indisponible. Reessayez plus tard.")
+        return redirect('Prolean:login')
+    return await arender(request, 'Prolean/dashboard/api_dashboard.html', views.api_dashboard_context(payload))
@@ -0,0 +1,134 @@
+# blocklist.py - process-local blocked IP lookup
+"""
+Answer "is this IP blocked?" without a database query.
+
+Each worker keeps the blocked IPs from ``ThreatIP`` in a frozenset, fronted
+by a Bloom filter: the overwhelming majority of visitors are not blocked and
+are rejected by the filter with a few hash probes. The ThreatIP signals
+(signals.py) publish the ``blocklist`` channel of the invalidation bus
+(bus.py), and each worker rebuilds its set at the next lookup after the
+message reaches it.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from . import bus
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'blocklist'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+class Blocklist:
+    """Blocked IPs of this process, refreshed from ThreatIP on version change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ips = frozenset()
+        self._bloom = BloomFilter(1)
+        self._version = None
+        self._loaded_at = None
+        self._checked_at = None
+        self.rebuilds = 0
+
+    def is_blocked(self, ip_address):
+        if not ip_address:
+            return False
+        self._refresh_if_needed()
+        # Read both references once: a concurrent rebuild swaps them together
+        bloom, ips = self._bloom, self._ips
+        if ip_address not in bloom:
+            return False
+        return ip_address in ips
+
+    def _refresh_if_needed(self):
+        now = time.monotonic()
+        interval = getattr(settings, 'BLOCKLIST_CHECK_INTERVAL', 5)
+        if self._checked_at is not None and now - self._checked_at < interval:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < interval:
+                return
+            self._checked_at = now
+            version = bus.version(CHANNEL)
+            max_age = getattr(settings, 'BLOCKLIST_MAX_AGE', 60)
+            stale = self._loaded_at is None or now - self._loaded_at >= max_age
+            if version != self._version or stale:
+                self._rebuild(version, now)
+
+    def _rebuild(self, version, now):
+        from .models import ThreatIP
+
+        try:
+            ips = frozenset(
+                ThreatIP.objects.filter(is_blocked=True).values_list('ip_address', flat=True)
+            )
+        except Exception as exc:
+            # Keep serving the previous set; retry at the next check
+            logger.warning(f"ThreatIP DB unavailable, keeping previous blocklist: {exc}")
+            return
+
+        bloom = BloomFilter(len(ips) * 2 + 64)
+        for ip in ips:
+            bloom.add(ip)
+        self._bloom, self._ips = bloom, ips
+        self._version = version
+        self._loaded_at = now
+        self.rebuilds += 1
+
+    def invalidate(self):
+        """Force a rebuild at the next lookup in this process"""
+        self._checked_at = None
+        self._version = None
+
+    def stats(self):
+        return {
+            'blocked_ips': len(self._ips),
+            'bloom_bits': self._bloom.size,
+            'bloom_hashes': self._bloom.hash_count,
+            'version': self._version,
+            'rebuilds': self.rebuilds,
+        }
+
+
+def bump_version():
+    """Signal every worker that ThreatIP blocks changed"""
+    bus.publish(CHANNEL)
+
+
+blocklist = Blocklist()
+bus.subscribe(CHANNEL, blocklist.invalidate)
+
+
+def is_blocked(ip_address):
+    return blocklist.is_blocked(ip_address)
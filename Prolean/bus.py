@@ -0,0 +1,237 @@
+# bus.py - cross-worker invalidation bus
+"""
+Process-local caches (currency rates, catalog snapshot, search index, city
+choices, blocklist, the model generations of invalidation.py) have to hear
+when another worker or node changed the data they were built from. Each of
+them gets a channel on the bus::
+
+    bus.subscribe('catalog', expire)   # at import, in every process
+    bus.publish('catalog')             # after an edit, in any process
+    bus.version('catalog')             # the newest version this process saw
+
+``publish`` increments the channel's ``CacheChannel`` row once the current
+transaction commits, so versions are shared by every worker and node, and
+runs this process's subscribers at once. A daemon thread per process reads
+the table every BUS_POLL_INTERVAL seconds and runs the subscribers of the
+channels that moved. With REDIS_URL set, publishes are also pushed over
+Redis pub/sub and arrive within milliseconds; the table is then re-read
+every BUS_REDIS_POLL_INTERVAL seconds only in case a message was lost.
+
+``version`` is a dict lookup, so caches can compare it on every access.
+Subscribers run on the bus thread: they should only mark their cache
+stale, not rebuild it.
+"""
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_subscribers = {}  # channel -> [callback]
+_versions = {}  # channel -> newest version seen by this process
+_lock = threading.Lock()
+_loaded = False
+_pid = None
+_redis_client = None
+_stats = {'published': 0, 'pushed': 0, 'received': 0, 'polls': 0, 'poll_errors': 0}
+
+
+def subscribe(channel, callback):
+    """Call ``callback()`` in this process whenever ``channel`` is published"""
+    with _lock:
+        _subscribers.setdefault(channel, []).append(callback)
+
+
+def skip_listener():
+    """Never start the bus thread in this process (gunicorn master); forked children start their own"""
+    global _pid
+    _pid = os.getpid()
+
+
+def version(channel):
+    """Newest version of ``channel`` this process has seen (0 if never published)"""
+    _ensure_listening()
+    if not _loaded:
+        _load()
+    return _versions.get(channel, 0)
+
+
+def publish(channel):
+    """Tell every process that ``channel`` changed, once the current transaction commits"""
+    transaction.on_commit(lambda: _publish(channel))
+
+
+def _publish(channel):
+    try:
+        number = _increment(channel)
+    except Exception as exc:
+        logger.warning(f"Invalidation bus: could not publish {channel!r}: {exc}")
+        return
+    _stats['published'] += 1
+    _apply({channel: number})
+    _push(channel, number)
+
+
+def _increment(channel):
+    from .models import CacheChannel
+
+    rows = CacheChannel.objects.filter(name=channel)
+    if not rows.update(version=F('version') + 1, updated_at=timezone.now()):
+        CacheChannel.objects.get_or_create(name=channel)
+        rows.update(version=F('version') + 1, updated_at=timezone.now())
+    return rows.values_list('version', flat=True).get()
+
+
+def _read():
+    from .models import CacheChannel
+
+    return dict(CacheChannel.objects.values_list('name', 'version'))
+
+
+def _load():
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+    try:
+        _apply(_read())
+    except Exception as exc:
+        # The bus thread retries at its next poll
+        logger.warning(f"Invalidation bus: could not read channel versions: {exc}")
+
+
+def _apply(versions):
+    """Record newer versions and run the subscribers of the channels that moved"""
+    changed = []
+    with _lock:
+        for channel, number in versions.items():
+            if number > _versions.get(channel, 0):
+                _versions[channel] = number
+                changed.append(channel)
+        callbacks = [(channel, list(_subscribers.get(channel, ()))) for channel in changed]
+    for channel, channel_callbacks in callbacks:
+        for callback in channel_callbacks:
+            try:
+                callback()
+            except Exception as exc:
+                logger.error(f"Invalidation bus: subscriber of {channel!r} failed: {exc}")
+
+
+def _redis():
+    """Redis client when REDIS_URL is set and redis-py is installed, else None"""
+    global _redis_client
+    url = getattr(settings, 'REDIS_URL', None)
+    if not url:
+        return None
+    if _redis_client is None:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("Invalidation bus: redis is not installed, polling the database only")
+            return None
+        _redis_client = redis.Redis.from_url(url)
+    return _redis_client
+
+
+def _redis_channel():
+    return getattr(settings, 'BUS_REDIS_CHANNEL', 'prolean:invalidation')
+
+
+def _push(channel, number):
+    client = _redis()
+    if client is None:
+        return
+    try:
+        client.publish(_redis_channel(), f'{number} {channel}')
+        _stats['pushed'] += 1
+    except Exception as exc:
+        logger.warning(f"Invalidation bus: Redis publish failed, peers will poll it: {exc}")
+
+
+def _receive(data):
+    if isinstance(data, bytes):
+        data = data.decode()
+    try:
+        number, channel = data.split(' ', 1)
+        number = int(number)
+    except ValueError:
+        logger.warning(f"Invalidation bus: ignoring malformed message {data!r}")
+        return
+    _stats['received'] += 1
+    _apply({channel: number})
+
+
+def _poll():
+    _stats['polls'] += 1
+    try:
+        _apply(_read())
+    except Exception as exc:
+        _stats['poll_errors'] += 1
+        logger.debug(f"Invalidation bus: poll failed: {exc}")
+    finally:
+        # This thread owns its own DB connection; recycle it like a request would
+        close_old_connections()
+
+
+def _subscribe_redis():
+    client = _redis()
+    if client is None:
+        return None
+    try:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(_redis_channel())
+        return pubsub
+    except Exception as exc:
+        logger.warning(f"Invalidation bus: Redis unavailable, polling the database: {exc}")
+        return None
+
+
+def _listen():
+    pubsub = _subscribe_redis()
+    next_poll = 0
+    while True:
+        if pubsub is not None:
+            try:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    _receive(message['data'])
+            except Exception as exc:
+                logger.warning(f"Invalidation bus: lost Redis, polling the database: {exc}")
+                pubsub = None
+            interval = getattr(settings, 'BUS_REDIS_POLL_INTERVAL', 30)
+        else:
+            interval = getattr(settings, 'BUS_POLL_INTERVAL', 1)
+            time.sleep(max(0.0, next_poll - time.monotonic()))
+        if time.monotonic() >= next_poll:
+            _poll()
+            next_poll = time.monotonic() + interval
+
+
+def _ensure_listening():
+    # Threads do not survive fork(): start one per worker process
+    global _pid, _redis_client
+    pid = os.getpid()
+    if _pid == pid:
+        return
+    with _lock:
+        if _pid == pid:
+            return
+        _pid = pid
+        _redis_client = None
+        threading.Thread(target=_listen, name='invalidation-bus', daemon=True).start()
+
+
+def stats():
+    return dict(
+        _stats,
+        transport='redis' if _redis() is not None else 'database',
+        channels=dict(_versions),
+        subscribers={channel: len(callbacks) for channel, callbacks in _subscribers.items()},
+    )
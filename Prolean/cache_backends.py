@@ -0,0 +1,295 @@
+# cache_backends.py - two-tier cache backend
+"""
+``TieredCache`` puts a small per-process LRU (L1) in front of a shared
+cache (L2, another ``CACHES`` alias: Redis), so every worker shares what
+one of them computed while hot keys are still read without a round trip.
+Settings only configure it when REDIS_URL is set.
+
+- Reads try L1, then L2, and copy L2 hits into L1 for ``L1_TIMEOUT``
+  seconds. That bounds how long a worker can see a value another worker
+  has replaced; writes made by this process update its own L1 at once.
+  Keys starting with one of ``L1_EXCLUDE_PREFIXES`` skip L1.
+- ``add``, ``incr``, ``decr``, ``touch`` and ``delete`` go to L2 and drop
+  the L1 copy, so counters and locks stay atomic in L2.
+- ``get_or_set`` with a callable is single-flight: on a miss one caller
+  takes a lock in L2 and computes while the others wait for its result.
+  Values it stores carry their expiry and compute time and are refreshed
+  early with a probability that grows as the expiry nears (XFetch), so a
+  hot key is recomputed by one worker before it expires instead of by
+  every worker just after. The lock is as atomic as L2's ``add``: exact
+  with Redis (SET NX), best effort with a backend such as the file cache.
+
+L1 holds pickled values, like ``LocMemCache``: callers may mutate what
+they get back.
+"""
+import logging
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# L2 alias -> (L1 LRU, lock, counters), shared by the threads of a process
+_process_state = {}
+_process_lock = threading.Lock()
+
+
+class _Entry:
+    """A value stored by ``get_or_set``, with what early expiry needs"""
+
+    __slots__ = ('value', 'expires_at', 'delta')
+
+    def __init__(self, value, expires_at, delta):
+        self.value = value
+        self.expires_at = expires_at
+        self.delta = delta
+
+    def __getstate__(self):
+        return (self.value, self.expires_at, self.delta)
+
+    def __setstate__(self, state):
+        self.value, self.expires_at, self.delta = state
+
+    def expires_early(self, beta):
+        if self.expires_at is None:
+            return False
+        # -log(u) is exponentially distributed: usually small, now and then large
+        return time.time() - self.delta * beta * math.log(1.0 - random.random()) >= self.expires_at
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, _Entry) else value
+
+
+class TieredCache(BaseCache):
+    """In-process LRU (L1) in front of a shared cache alias (L2)"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', location or 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 2)
+        self.exclude = tuple(options.get('L1_EXCLUDE_PREFIXES', ()))
+        self.beta = options.get('EARLY_EXPIRY_BETA', 1.0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 30)
+        self.lock_wait = options.get('LOCK_WAIT', 5)
+        # Django builds one backend per thread: L1 and counters are per process
+        with _process_lock:
+            self.l1, self._lock, self._counts = _process_state.setdefault(self.l2_alias, (
+                LRUCache(maxsize=options.get('L1_MAX_ENTRIES', 500), ttl=self.l1_timeout),
+                threading.Lock(),
+                {
+                    'l2_hits': 0, 'l2_misses': 0, 'computes': 0,
+                    'early_recomputes': 0, 'lock_waits': 0, 'lock_timeouts': 0,
+                },
+            ))
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _l1_key(self, key, version):
+        if str(key).startswith(self.exclude):
+            return None
+        return self.make_and_validate_key(key, version=version)
+
+    def _remember(self, l1_key, value, timeout=DEFAULT_TIMEOUT):
+        if l1_key is None:
+            return
+        timeout = self._seconds(timeout)
+        if timeout is not None and timeout <= 0:
+            self.l1.delete(l1_key)
+            return
+        ttl = self.l1_timeout if timeout is None else min(timeout, self.l1_timeout)
+        self.l1.set(l1_key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ttl)
+
+    def _get(self, key, version=None):
+        """Stored value (possibly an _Entry) or _MISSING"""
+        l1_key = self._l1_key(key, version)
+        if l1_key is not None:
+            raw = self.l1.get(l1_key, _MISSING)
+            if raw is not _MISSING:
+                return pickle.loads(raw)
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('l2_misses')
+            return _MISSING
+        self._count('l2_hits')
+        self._remember(l1_key, value)
+        return value
+
+    def get(self, key, default=None, version=None):
+        value = self._get(key, version)
+        return default if value is _MISSING else _unwrap(value)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            l1_key = self._l1_key(key, version)
+            raw = self.l1.get(l1_key, _MISSING) if l1_key is not None else _MISSING
+            if raw is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = _unwrap(pickle.loads(raw))
+        if remaining:
+            fetched = self.l2.get_many(remaining, version=version)
+            with self._lock:
+                self._counts['l2_hits'] += len(fetched)
+                self._counts['l2_misses'] += len(remaining) - len(fetched)
+            for key, value in fetched.items():
+                self._remember(self._l1_key(key, version), value)
+                found[key] = _unwrap(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._seconds(timeout)
+        self.l2.set(key, value, timeout, version=version)
+        self._remember(self._l1_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._seconds(timeout)
+        failed = self.l2.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            self._remember(self._l1_key(key, version), value, timeout)
+        return failed
+
+    def _forget(self, key, version):
+        l1_key = self._l1_key(key, version)
+        if l1_key is not None:
+            self.l1.delete(l1_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self.l2.add(key, value, self._seconds(timeout), version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._forget(key, version)
+        return self.l2.touch(key, self._seconds(timeout), version=version)
+
+    def delete(self, key, version=None):
+        self._forget(key, version)
+        return self.l2.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._forget(key, version)
+        self.l2.delete_many(keys, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.l2.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._forget(key, version)
+        return self.l2.decr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        return self._get(key, version) is not _MISSING
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        if not callable(default):
+            return super().get_or_set(key, default, timeout, version=version)
+
+        stored = self._get(key, version)
+        if isinstance(stored, _Entry):
+            if not stored.expires_early(self.beta):
+                return stored.value
+            lock = self._acquire(key, version)
+            if lock is None:
+                # Another worker is refreshing it; the current value is still valid
+                return stored.value
+            self._count('early_recomputes')
+            return self._compute(key, default, timeout, version, lock)
+        if stored is not _MISSING:
+            return stored
+
+        lock = self._acquire(key, version)
+        if lock is None:
+            value = self._wait(key, version)
+            if value is not _MISSING:
+                return value
+        return self._compute(key, default, timeout, version, lock)
+
+    def _lock_key(self, key):
+        return f'lock:{key}'
+
+    def _acquire(self, key, version):
+        token = uuid.uuid4().hex
+        if self.l2.add(self._lock_key(key), token, self.lock_timeout, version=version):
+            return token
+        return None
+
+    def _release(self, key, version, token):
+        lock_key = self._lock_key(key)
+        if self.l2.get(lock_key, version=version) == token:
+            self.l2.delete(lock_key, version=version)
+
+    def _wait(self, key, version):
+        """The value computed by the lock holder, or _MISSING after LOCK_WAIT seconds"""
+        self._count('lock_waits')
+        deadline = time.monotonic() + self.lock_wait
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            value = self.l2.get(key, _MISSING, version=version)
+            if value is not _MISSING:
+                self._remember(self._l1_key(key, version), value)
+                return _unwrap(value)
+            delay = min(delay * 2, 0.2)
+        self._count('lock_timeouts')
+        logger.warning(f"Gave up waiting for cache key {key!r} to be computed")
+        return _MISSING
+
+    def _compute(self, key, default, timeout, version, lock):
+        self._count('computes')
+        try:
+            started = time.monotonic()
+            value = default()
+            delta = time.monotonic() - started
+            seconds = self._seconds(timeout)
+            expires_at = None if seconds is None else time.time() + seconds
+            self.set(key, _Entry(value, expires_at, delta), timeout, version=version)
+            return value
+        finally:
+            if lock is not None:
+                self._release(key, version, lock)
+
+    def _seconds(self, timeout):
+        """Relative timeout in seconds (None for never): this alias's TIMEOUT wins over L2's"""
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        l2_hits = counts.pop('l2_hits')
+        l2_misses = counts.pop('l2_misses')
+        l2_total = l2_hits + l2_misses
+        return {
+            'l1': self.l1.stats(),
+            'l2': {
+                'alias': self.l2_alias,
+                'hits': l2_hits,
+                'misses': l2_misses,
+                'hit_ratio': round(l2_hits / l2_total, 4) if l2_total else 0.0,
+            },
+            **counts,
+        }
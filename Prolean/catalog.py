@@ -0,0 +1,267 @@
+# catalog.py - in-memory snapshot of the active training catalog
+"""
+The public catalog (``training_catalog`` and the formations API) is served
+from an immutable snapshot of the active trainings, built with one query and
+shared by every request of the process.
+
+Each entry carries its category and city availability as bitmasks and its
+price converted into every supported currency, and the snapshot keeps the
+per-category counts, so filtering, counting and pagination run without any
+database query. Saving or deleting a Training publishes the ``catalog``
+channel of the invalidation bus (see signals.py and bus.py); processes
+rebuild at the next request after the message reaches them, or when the
+currency rate table was reloaded. Rating summary changes bump it too
+(ratings.py), so cards show current averages.
+"""
+import copy
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import bus, currency
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'catalog'
+
+# (id, model field, label, icon) - the order is the bit order
+CATEGORIES = [
+    ('caces', 'category_caces', 'CACES Engins', 'construction'),
+    ('electricite', 'category_electricite', 'Électricité', 'bolt'),
+    ('soudage', 'category_soudage', 'Soudage', 'whatshot'),
+    ('securite', 'category_securite', 'Sécurité', 'security'),
+    ('management', 'category_management', 'Management', 'groups'),
+    ('autre', 'category_autre', 'Autre', 'category'),
+]
+CATEGORY_BITS = {category_id: 1 << i for i, (category_id, *_) in enumerate(CATEGORIES)}
+
+# (id, model field, label)
+CITIES = [
+    ('casablanca', 'available_casablanca', 'Casablanca'),
+    ('rabat', 'available_rabat', 'Rabat'),
+    ('tanger', 'available_tanger', 'Tanger'),
+    ('marrakech', 'available_marrakech', 'Marrakech'),
+    ('agadir', 'available_agadir', 'Agadir'),
+    ('fes', 'available_fes', 'Fès'),
+    ('meknes', 'available_meknes', 'Meknès'),
+    ('oujda', 'available_oujda', 'Oujda'),
+    ('laayoune', 'available_laayoune', 'Laâyoune'),
+    ('dakhla', 'available_dakhla', 'Dakhla'),
+    ('other', 'available_other', 'Autre'),
+]
+CITY_BITS = {city_id: 1 << i for i, (city_id, *_) in enumerate(CITIES)}
+
+SNAPSHOT_FIELDS = [
+    'id', 'title', 'slug', 'short_description', 'price_mad', 'duration_days',
+    'success_rate', 'max_students', 'badge', 'thumbnail', 'next_session',
+    'is_featured', 'created_at', 'programme_structure',
+] + [field for _, field, *_ in CATEGORIES] + [field for _, field, _ in CITIES]
+RATING_FIELDS = ['rating_summary__review_count', 'rating_summary__rating_sum']
+
+
+def count_modules(structure):
+    """Number of theory + practice modules in a programme_structure"""
+    structure = structure or {}
+    count = 0
+    for part in ('theorique', 'pratique'):
+        if part in structure and 'modules' in structure[part]:
+            count += len(structure[part]['modules'])
+    return count
+
+
+class CatalogEntry:
+    """
+    Read-only view of one active training, with the attributes the catalog
+    template and the list serializer read. Plain values in slots: no model
+    instance and no per-entry ``__dict__``, so a snapshot built before fork
+    stays compact and shared.
+    """
+
+    __slots__ = (
+        'id', 'title', 'slug', 'short_description', 'price_mad', 'price_mad_float',
+        'duration_days', 'success_rate', 'max_students', 'badge', 'thumbnail',
+        'next_session', 'is_featured', 'created_at', 'module_count', 'review_count',
+        'avg_rating', 'category_mask', 'city_mask', 'prices', 'price_in_preferred',
+    ) + tuple(field for _, field, *_ in CATEGORIES)
+
+    def __init__(self, training, rate_table):
+        self.id = training.id
+        self.title = training.title
+        self.slug = training.slug
+        self.short_description = training.short_description
+        self.price_mad = training.price_mad
+        self.price_mad_float = float(training.price_mad)
+        self.duration_days = training.duration_days
+        self.success_rate = training.success_rate
+        self.max_students = training.max_students
+        self.badge = training.badge
+        self.thumbnail = training.thumbnail
+        self.next_session = training.next_session
+        self.is_featured = training.is_featured
+        self.created_at = training.created_at
+        self.module_count = count_modules(training.programme_structure)
+
+        summary = getattr(training, 'rating_summary', None)
+        self.review_count = summary.review_count if summary else 0
+        self.avg_rating = summary.average if summary else 0
+
+        self.category_mask = 0
+        for category_id, field, *_ in CATEGORIES:
+            flag = bool(getattr(training, field))
+            setattr(self, field, flag)
+            if flag:
+                self.category_mask |= CATEGORY_BITS[category_id]
+
+        self.city_mask = 0
+        for city_id, field, _ in CITIES:
+            if getattr(training, field):
+                self.city_mask |= CITY_BITS[city_id]
+
+        self.prices = {
+            code: rate_table.convert(training.price_mad, code) for code in rate_table.rates
+        }
+
+    def get_available_cities(self):
+        return [label for city_id, _, label in CITIES if self.city_mask & CITY_BITS[city_id]]
+
+    def get_price_in_currency(self, currency_code):
+        return self.prices.get(currency_code, self.price_mad)
+
+    def with_currency(self, currency_code):
+        """Copy carrying price_in_preferred for one request (entries are shared)"""
+        entry = copy.copy(self)
+        entry.price_in_preferred = float(self.get_price_in_currency(currency_code))
+        return entry
+
+
+class CatalogSnapshot:
+    """Immutable list of CatalogEntry in catalog order (newest first)"""
+
+    def __init__(self, entries, version, rate_table):
+        self.entries = tuple(entries)
+        self.by_slug = {entry.slug: entry for entry in self.entries}
+        self.version = version
+        self.rate_table = rate_table
+        self.category_counts = self.count_categories(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def filter(self, category=None, city=None, featured=None):
+        """Entries matching every given criterion; unknown categories/cities match nothing"""
+        category_bit = CATEGORY_BITS.get(category, 0) if category else None
+        city_bit = CITY_BITS.get(city, 0) if city else None
+
+        entries = self.entries
+        if category_bit is not None:
+            entries = [e for e in entries if e.category_mask & category_bit]
+        if city_bit is not None:
+            entries = [e for e in entries if e.city_mask & city_bit]
+        if featured is not None:
+            entries = [e for e in entries if e.is_featured == featured]
+        return list(entries)
+
+    @staticmethod
+    def count_categories(entries):
+        counts = dict.fromkeys(CATEGORY_BITS, 0)
+        for entry in entries:
+            mask = entry.category_mask
+            for category_id, bit in CATEGORY_BITS.items():
+                if mask & bit:
+                    counts[category_id] += 1
+        return counts
+
+    def categories(self, entries=None):
+        """Category choices with their counts (only non-empty ones), as the template expects"""
+        return category_choices(self.category_counts if entries is None else self.count_categories(entries))
+
+
+def category_choices(counts):
+    return [
+        {'id': category_id, 'name': name, 'icon': icon, 'active_count': counts[category_id]}
+        for category_id, _, name, icon in CATEGORIES
+        if counts[category_id] > 0
+    ]
+
+
+def categories_of(trainings):
+    """Category choices for trainings outside the snapshot (API fallback), counted on the spot"""
+    return category_choices({
+        category_id: sum(1 for training in trainings if getattr(training, field, False))
+        for category_id, field, *_ in CATEGORIES
+    })
+
+
+_snapshot = None
+_loaded_at = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def _build(version, rate_table):
+    from .models import Training
+
+    trainings = (
+        Training.objects.filter(is_active=True)
+        .select_related('rating_summary')
+        .only(*SNAPSHOT_FIELDS, *RATING_FIELDS)
+        .order_by('-created_at')
+    )
+    entries = [CatalogEntry(training, rate_table) for training in trainings]
+    return CatalogSnapshot(entries, version, rate_table)
+
+
+def get_snapshot():
+    """Current catalog snapshot, or None if it could never be built"""
+    global _snapshot, _loaded_at, _checked_at
+
+    now = time.monotonic()
+    interval = getattr(settings, 'CATALOG_CHECK_INTERVAL', 5)
+    rate_table = currency.get_table()
+    if (
+        _snapshot is not None
+        and _checked_at is not None
+        and now - _checked_at < interval
+        and _snapshot.rate_table is rate_table
+    ):
+        return _snapshot
+
+    with _lock:
+        if (
+            _snapshot is not None
+            and _checked_at is not None
+            and now - _checked_at < interval
+            and _snapshot.rate_table is rate_table
+        ):
+            return _snapshot
+        _checked_at = now
+        version = bus.version(CHANNEL)
+        max_age = getattr(settings, 'CATALOG_MAX_AGE', 900)
+        if (
+            _snapshot is None
+            or version != _snapshot.version
+            or _snapshot.rate_table is not rate_table
+            or now - _loaded_at >= max_age
+        ):
+            try:
+                _snapshot = _build(version, rate_table)
+                _loaded_at = now
+            except Exception as exc:
+                # Keep serving the previous snapshot; retry at the next check
+                logger.warning(f"Catalog snapshot rebuild failed: {exc}")
+    return _snapshot
+
+
+def _expire():
+    global _checked_at
+    _checked_at = None
+
+
+def bump_version():
+    """Make every process rebuild its catalog snapshot"""
+    bus.publish(CHANNEL)
+
+
+bus.subscribe(CHANNEL, _expire)
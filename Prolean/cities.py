@@ -0,0 +1,151 @@
+# cities.py - city choices for registration forms
+"""
+City choices are served from a process-level list so building a form never
+waits on the Site Management API.
+
+The list expires after CITY_CHOICES_TTL seconds; the next caller still gets
+the current list and a background thread refreshes it from the API, whose
+ids the registration endpoint expects. Saving a City publishes the
+``city_choices`` channel of the invalidation bus (bus.py) so every process
+refreshes as soon as the message reaches it.
+
+The local ``City`` table is only used while the API cannot be reached:
+before the first refresh completes, or when it has never answered. Synced
+rows offer their ``remote_id``; the others get ``fallback-`` values, as
+the fallback list always did.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.text import slugify
+
+from . import bus
+from .api_client import public_api
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'city_choices'
+
+# Last resort when neither the API nor the City table has anything
+FALLBACK_CHOICES = [
+    ('fallback-casa', 'Casablanca'),
+    ('fallback-rabat', 'Rabat'),
+    ('fallback-tanger', 'Tanger'),
+]
+
+_choices = None
+_source = None
+_loaded_at = None
+_version = None
+_checked_at = None
+_refreshing = False
+_lock = threading.Lock()
+
+
+def _local_choices():
+    from .models import City
+
+    try:
+        rows = City.objects.filter(is_active=True).order_by('name').values_list('name', 'remote_id')
+        return [(remote_id or f'fallback-{slugify(name)}', name) for name, remote_id in rows]
+    except Exception as exc:
+        logger.warning(f"City table unavailable for city choices: {exc}")
+        return []
+
+
+def _remote_choices():
+    response = public_api.get('cities', '/cities')
+    response.raise_for_status()
+    payload = response.json()
+    if not isinstance(payload, list):
+        return []
+    return [(item.get('id'), item.get('name')) for item in payload if item.get('id') and item.get('name')]
+
+
+def _install(choices, source, version):
+    global _choices, _source, _loaded_at, _version
+    _choices = choices or FALLBACK_CHOICES
+    _source = source
+    _loaded_at = time.monotonic()
+    _version = version
+
+
+def refresh(version=None):
+    """Reload the choices from the API, or the City table if it is down (blocking)"""
+    try:
+        choices, source = _remote_choices(), 'api'
+    except Exception as exc:
+        if _source == 'api':
+            # Keep the API ids we already have rather than degrading to local ones
+            logger.info(f"Cities API unavailable, keeping the current city choices: {exc}")
+            choices, source = _choices, 'api'
+        else:
+            logger.info(f"Cities API unavailable, refreshing city choices from the City table: {exc}")
+            choices, source = _local_choices(), 'local'
+    _install(choices, source, version)
+    return _choices
+
+
+def _refresh_in_background(version):
+    global _refreshing
+    with _lock:
+        if _refreshing:
+            return
+        _refreshing = True
+
+    def run():
+        global _refreshing
+        try:
+            refresh(version)
+        except Exception as exc:
+            logger.warning(f"City choices refresh failed: {exc}")
+        finally:
+            _refreshing = False
+
+    threading.Thread(target=run, name='city-choices-refresh', daemon=True).start()
+
+
+def get_choices():
+    """[(value, name)] for a city ChoiceField; never waits on the API"""
+    global _checked_at
+
+    if _choices is None:
+        with _lock:
+            if _choices is None:
+                _install(_local_choices(), 'local', None)
+                # Force the first background refresh to pick up API ids
+                _checked_at = None
+
+    now = time.monotonic()
+    interval = getattr(settings, 'CITY_CHOICES_CHECK_INTERVAL', 10)
+    if _checked_at is None or now - _checked_at >= interval:
+        _checked_at = now
+        version = bus.version(CHANNEL)
+        ttl = getattr(settings, 'CITY_CHOICES_TTL', 900)
+        if _source != 'api' or version != _version or now - _loaded_at >= ttl:
+            _refresh_in_background(version)
+    return _choices
+
+
+def _expire():
+    global _checked_at
+    _checked_at = None
+
+
+def bump_version():
+    """Make every process refresh its city choices"""
+    bus.publish(CHANNEL)
+
+
+bus.subscribe(CHANNEL, _expire)
+
+
+def stats():
+    return {
+        'count': len(_choices or ()),
+        'source': _source,
+        'age': None if _loaded_at is None else round(time.monotonic() - _loaded_at, 1),
+        'refreshing': _refreshing,
+    }
@@ -1,92 +1,48 @@
 # context_processors.py
-import requests
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.conf import settings
-from .models import CurrencyRate
+from . import currency, geoip, page_cache
+
+
+def _request_cache(request):
+    # Imported lazily: the middleware module imports the helpers below
+    from .middleware import get_request_cache
+    return get_request_cache(request)
+
 
 def get_client_ip(request):
-    """Get client IP address"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
+    """Get client IP address (first X-Forwarded-For hop, else REMOTE_ADDR)"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    ip = x_forwarded_for.split(',')[0].strip()
+    if not ip:
+        ip = request.META.get('REMOTE_ADDR', '').strip()
     return ip
 
 def get_location_from_ip(ip_address):
-    """Get location from IP address using ip-api.com"""
-    # Default fallback
-    default_location = {'city': 'Casablanca', 'country': 'Maroc', 'countryCode': 'MA'}
-    
-    # Localhost check
-    if ip_address in ['127.0.0.1', 'localhost', '::1']:
-        return default_location
-    
-    try:
-        # Use ip-api.com (free, reliable, no SSL for free plan)
-        # Using http because the free tier doesn't support https
-        response = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=3)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('status') == 'success':
-                return {
-                    'city': data.get('city', 'Casablanca'),
-                    'country': data.get('country', 'Maroc'),
-                    'countryCode': data.get('countryCode', 'MA')
-                }
-    except Exception as e:
-        print(f"Location detection error: {e}")
-        pass
-    
-    # Fallback to ipapi.co if the first one fails
-    try:
-        response = requests.get(f'https://ipapi.co/{ip_address}/json/', timeout=3, verify=False)
-        if response.status_code == 200:
-            data = response.json()
-            if not data.get('error'):
-                return {
-                    'city': data.get('city', 'Casablanca'),
-                    'country': data.get('country_name', 'Maroc'),
-                    'countryCode': data.get('country_code', 'MA')
-                }
-    except Exception as e:
-        print(f"Fallback location detection error: {e}")
-        pass
-    
-    return default_location
+    """Get location from IP address using the local GeoIP range database"""
+    return geoip.lookup(ip_address)
+
+def load_currency_rates():
+    """Get currency rates from the process-wide rate table"""
+    return currency.rates()
 
 def currency_rates(request):
     """Add currency rates to context"""
-    rates = {}
-    try:
-        db_rates = CurrencyRate.objects.all()
-        for rate in db_rates:
-            rates[rate.currency_code] = float(rate.rate_to_mad)
-    except:
-        rates = {
-            'MAD': 1.0,
-            'EUR': 0.093,
-            'USD': 0.100,
-            'GBP': 0.079,
-            'CAD': 0.136,
-            'AED': 0.367
-        }
-    
-    preferred_currency = request.session.get('preferred_currency', 'MAD')
-    
+    request_cache = _request_cache(request)
     return {
-        'currency_rates': rates,
-        'preferred_currency': preferred_currency,
+        'currency_rates': SimpleLazyObject(lambda: request_cache.currency_rates),
+        'preferred_currency': request_cache.preferred_currency,
     }
 
 def user_location(request):
-    """Add user location to context"""
-    ip_address = get_client_ip(request)
-    location = get_location_from_ip(ip_address)
-    
+    """Add user location to context (resolved only if a template reads it)"""
+    if page_cache.is_filling(request):
+        # Shared cached page: never bake one visitor's location into it
+        return {'user_location': dict(geoip.DEFAULT_LOCATION)}
+    request_cache = _request_cache(request)
     return {
-        'user_location': location,
+        'user_location': SimpleLazyObject(lambda: request_cache.location),
     }
 
 def site_settings(request):
@@ -104,14 +60,8 @@ site_context = site_settings
 
 def notifications(request):
     """Add user notifications to context"""
-    if request.user.is_authenticated:
-        unread_notifications = request.user.notifications.filter(is_read=False).order_by('-created_at')[:5]
-        unread_count = request.user.notifications.filter(is_read=False).count()
-        return {
-            'global_notifications': unread_notifications,
-            'unread_notifications_count': unread_count,
-        }
+    request_cache = _request_cache(request)
     return {
-        'global_notifications': [],
-        'unread_notifications_count': 0,
+        'global_notifications': SimpleLazyObject(lambda: request_cache.unread_notifications),
+        'unread_notifications_count': SimpleLazyObject(lambda: request_cache.unread_notifications_count),
     }
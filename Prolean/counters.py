@@ -0,0 +1,179 @@
+# counters.py - write-behind counters for hot rows
+"""
+``increment(obj, 'view_count')`` adds to a process-local buffer instead of
+issuing ``UPDATE ... SET view_count = view_count + 1`` on the request path.
+A daemon thread flushes the buffer every COUNTER_FLUSH_INTERVAL seconds as
+one ``UPDATE ... SET f = f + CASE id WHEN ... END`` per model and chunk of
+rows, and again at interpreter exit (worker shutdown). A flush that fails
+because the database is unavailable puts its deltas back for the next one,
+at most COUNTER_MAX_RETRIES times; any other error (a bad field name, a
+value out of range) would fail again, so its deltas are logged and dropped.
+
+``pending(obj, field)`` is the not-yet-flushed delta of a row.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, models
+
+from .utils import BackgroundFlusher
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+
+
+class CounterBuffer(BackgroundFlusher):
+    """Accumulates {(model, pk): {field: delta}} and flushes it in bulk"""
+
+    def __init__(self, interval=5.0, max_retries=12):
+        super().__init__('counter-flush', interval)
+        self.max_retries = max_retries
+        self._deltas = defaultdict(lambda: defaultdict(int))
+        self._attempts = defaultdict(int)  # (model, pk) -> failed flushes in a row
+        self.increments = 0
+        self.flushed_rows = 0
+        self.updates = 0
+        self.failures = 0
+        self.dropped_rows = 0
+
+    def increment(self, model, pk, field, amount=1):
+        self._ensure_thread()
+        with self._lock:
+            self._deltas[(model, pk)][field] += amount
+            self.increments += 1
+
+    def pending(self, model, pk, field):
+        with self._lock:
+            deltas = self._deltas.get((model, pk))
+            return deltas.get(field, 0) if deltas else 0
+
+    def _take(self):
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(lambda: defaultdict(int))
+        return deltas
+
+    def _restore(self, deltas):
+        """Put failed deltas back, except for rows that already failed max_retries times"""
+        dropped = {}
+        with self._lock:
+            for key, fields in deltas.items():
+                self._attempts[key] += 1
+                if self._attempts[key] > self.max_retries:
+                    del self._attempts[key]
+                    dropped[key] = fields
+                    continue
+                for field, amount in fields.items():
+                    self._deltas[key][field] += amount
+        return dropped
+
+    def _drop(self, deltas, reason):
+        with self._lock:
+            for key in deltas:
+                self._attempts.pop(key, None)
+        self.dropped_rows += len(deltas)
+        model = next(iter(deltas))[0]
+        pks = sorted(pk for _, pk in deltas)
+        logger.error(f"Counter deltas of {len(pks)} {model.__name__} row(s) dropped ({pks[:10]}): {reason}")
+
+    def _succeeded(self, keys):
+        if not self._attempts:
+            return
+        with self._lock:
+            for key in keys:
+                self._attempts.pop(key, None)
+
+    def flush(self):
+        """Write every buffered delta; returns the number of rows updated"""
+        deltas = self._take()
+        if not deltas:
+            return 0
+
+        by_model = defaultdict(dict)
+        for (model, pk), fields in deltas.items():
+            by_model[model][pk] = fields
+
+        written = 0
+        for model, rows in by_model.items():
+            pks = list(rows)
+            for i in range(0, len(pks), CHUNK_SIZE):
+                chunk = pks[i:i + CHUNK_SIZE]
+                chunk_deltas = {(model, pk): rows[pk] for pk in chunk}
+                try:
+                    self._write(model, {pk: rows[pk] for pk in chunk})
+                    written += len(chunk)
+                    self._succeeded(chunk_deltas)
+                except (OperationalError, InterfaceError) as exc:
+                    self.failures += 1
+                    logger.error(f"Counter flush for {model.__name__} failed, will retry: {exc}")
+                    dropped = self._restore(chunk_deltas)
+                    if dropped:
+                        self._drop(dropped, f"still failing after {self.max_retries} retries: {exc}")
+                except Exception as exc:
+                    self.failures += 1
+                    self._drop(chunk_deltas, f"{type(exc).__name__}: {exc}")
+        self.flushed_rows += written
+        return written
+
+    def _write(self, model, rows):
+        fields = sorted({field for deltas in rows.values() for field in deltas})
+        updates = {}
+        for field in fields:
+            whens = [
+                models.When(pk=pk, then=models.Value(deltas[field]))
+                for pk, deltas in rows.items() if deltas.get(field)
+            ]
+            updates[field] = models.F(field) + models.Case(
+                *whens,
+                default=models.Value(0),
+                output_field=model._meta.get_field(field).__class__(),
+            )
+        model.objects.filter(pk__in=list(rows)).update(**updates)
+        self.updates += 1
+
+    def stats(self):
+        with self._lock:
+            pending_rows = len(self._deltas)
+        return {
+            'pending_rows': pending_rows,
+            'increments': self.increments,
+            'flushed_rows': self.flushed_rows,
+            'updates': self.updates,
+            'failures': self.failures,
+            'dropped_rows': self.dropped_rows,
+        }
+
+
+buffer = CounterBuffer(
+    interval=getattr(settings, 'COUNTER_FLUSH_INTERVAL', 5.0),
+    max_retries=getattr(settings, 'COUNTER_MAX_RETRIES', 12),
+)
+
+
+def increment(obj, field, amount=1):
+    """
+    Buffer ``obj.<field> += amount``. ``obj`` (freshly loaded) then shows the
+    stored value plus everything still buffered, this increment included.
+    """
+    buffer.increment(type(obj), obj.pk, field, amount)
+    value = getattr(obj, field, None)
+    if isinstance(value, int):
+        setattr(obj, field, value + buffer.pending(type(obj), obj.pk, field))
+
+
+def increment_pk(model, pk, field, amount=1):
+    """Buffer an increment for a row that is not loaded"""
+    buffer.increment(model, pk, field, amount)
+
+
+def pending(obj, field):
+    return buffer.pending(type(obj), obj.pk, field)
+
+
+def flush():
+    return buffer.flush()
+
+
+def stats():
+    return buffer.stats()
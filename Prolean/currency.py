@@ -0,0 +1,155 @@
+# currency.py - process-wide currency conversion
+"""
+Exchange rates are loaded from ``CurrencyRate`` once per process into an
+immutable rate table and reused by every conversion. Saving a CurrencyRate
+(admin, update_currency_rates command or task) publishes the
+``currency_rates`` channel of the invalidation bus (bus.py); every process
+reloads its table at the next conversion after the message reaches it.
+
+Listings should use ``convert_many`` / ``apply_prices`` to convert every
+price of a page in one pass.
+"""
+import logging
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+from . import bus
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'currency_rates'
+
+# MAD -> currency, used when a currency has no usable CurrencyRate row
+DEFAULT_RATES = {
+    'MAD': Decimal('1'),
+    'EUR': Decimal('0.093'),
+    'USD': Decimal('0.100'),
+    'GBP': Decimal('0.079'),
+    'CAD': Decimal('0.136'),
+    'AED': Decimal('0.367'),
+}
+
+CENT = Decimal('0.01')
+
+
+class RateTable:
+    """Immutable snapshot of MAD -> currency rates"""
+
+    def __init__(self, rates, version=None):
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates)
+        self.rates['MAD'] = Decimal('1')
+        self.version = version
+
+    def rate(self, currency_code):
+        return self.rates.get(currency_code, Decimal('1'))
+
+    def convert(self, amount_mad, currency_code):
+        if amount_mad is None:
+            return Decimal('0')
+        amount = amount_mad if isinstance(amount_mad, Decimal) else Decimal(str(amount_mad))
+        return (amount * self.rate(currency_code)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def as_floats(self):
+        return {code: float(rate) for code, rate in self.rates.items()}
+
+
+_table = None
+_loaded_at = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def _load(version):
+    from .models import CurrencyRate
+
+    rates = {}
+    try:
+        for code, rate in CurrencyRate.objects.values_list('currency_code', 'rate_to_mad'):
+            if rate and rate > 0:
+                rates[code] = rate
+    except Exception as exc:
+        logger.warning(f"CurrencyRate DB unavailable, using default rates: {exc}")
+    return RateTable(rates, version)
+
+
+def get_table():
+    """Current rate table, reloaded when the version stamp changed"""
+    global _table, _loaded_at, _checked_at
+
+    now = time.monotonic()
+    interval = getattr(settings, 'CURRENCY_RATES_CHECK_INTERVAL', 30)
+    if _table is not None and _checked_at is not None and now - _checked_at < interval:
+        return _table
+
+    with _lock:
+        if _table is not None and _checked_at is not None and now - _checked_at < interval:
+            return _table
+        _checked_at = now
+        version = bus.version(CHANNEL)
+        max_age = getattr(settings, 'CURRENCY_RATES_MAX_AGE', 3600)
+        if _table is None or version != _table.version or now - _loaded_at >= max_age:
+            _table = _load(version)
+            _loaded_at = now
+    return _table
+
+
+def _expire():
+    global _checked_at
+    _checked_at = None
+
+
+def bump_version():
+    """Make every process reload its rate table"""
+    bus.publish(CHANNEL)
+
+
+bus.subscribe(CHANNEL, _expire)
+
+
+def supported_currencies():
+    return list(get_table().rates)
+
+
+def rates():
+    """{currency_code: float rate} for templates and JSON"""
+    return get_table().as_floats()
+
+
+def convert(amount_mad, currency_code):
+    """Convert a MAD amount, rounded to the cent"""
+    return get_table().convert(amount_mad, currency_code)
+
+
+def convert_many(amounts_mad, currencies=None):
+    """
+    Convert a list of MAD amounts into several currencies at once.
+    Returns {currency_code: [converted amounts in input order]}.
+    """
+    table = get_table()
+    currencies = currencies or list(table.rates)
+    amounts = [
+        Decimal('0') if amount is None
+        else amount if isinstance(amount, Decimal)
+        else Decimal(str(amount))
+        for amount in amounts_mad
+    ]
+    converted = {}
+    for code in currencies:
+        rate = table.rate(code)
+        converted[code] = [(amount * rate).quantize(CENT, rounding=ROUND_HALF_UP) for amount in amounts]
+    return converted
+
+
+def apply_prices(objects, currency_code, field='price_mad'):
+    """Set price_mad_float / price_in_preferred on every object of a listing"""
+    objects = list(objects)
+    prices = [getattr(obj, field) or 0 for obj in objects]
+    converted = convert_many(prices, [currency_code])[currency_code]
+    for obj, price, price_in_preferred in zip(objects, prices, converted):
+        obj.price_mad_float = float(price)
+        obj.price_in_preferred = float(price_in_preferred)
+    return objects
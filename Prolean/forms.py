@@ -1,37 +1,13 @@
 import re
-import requests
 from django import forms
 from django.core.validators import MinLengthValidator, EmailValidator
-from django.conf import settings
 from .models import ContactRequest, TrainingReview , TrainingWaitlist
-
-
-def _public_api_base_url():
-    base = getattr(
-        settings,
-        'SITE_MANAGEMENT_PUBLIC_API_BASE',
-        'https://sitemanagement-production.up.railway.app/api/public'
-    )
-    return base.rstrip('/')
+from . import cities
 
 
 def get_city_choices():
-    try:
-        response = requests.get(f"{_public_api_base_url()}/cities", timeout=8)
-        response.raise_for_status()
-        payload = response.json()
-        if isinstance(payload, list):
-            choices = [(item.get('id'), item.get('name')) for item in payload if item.get('id') and item.get('name')]
-            if choices:
-                return choices
-    except Exception:
-        pass
-
-    return [
-        ('fallback-casa', 'Casablanca'),
-        ('fallback-rabat', 'Rabat'),
-        ('fallback-tanger', 'Tanger'),
-    ]
+    return cities.get_choices()
+
 
 class ContactRequestForm(forms.ModelForm):
     """Contact request form with validation"""
@@ -0,0 +1,290 @@
+# geoip.py - local IP geolocation backed by a memory-mapped range table
+"""
+Resolve visitor IPs to a city/country without any network call.
+
+The database is a flat binary file built by ``manage.py build_geoip_db``:
+
+    header   : b'PLGEOIP1' + record_count (uint32) + locations_offset (uint32)
+    records  : record_count x (range_start uint32, range_end uint32, location uint32)
+               sorted by range_start, non-overlapping (IPv4 only)
+    locations: UTF-8 JSON list of [city, country, countryCode]
+
+Records are read straight from the mmap with a binary search, so a lookup
+costs ~20 struct reads and no allocation besides the result dict. Results
+are kept in a bounded LRU/TTL cache shared by every caller in the process.
+
+The deploy builds the file from the DB-IP city lite CSV (nixpacks build
+phase). Without it every visitor gets DEFAULT_LOCATION: the ``geoip.W001``
+system check and the first lookup of each process warn about it.
+"""
+import heapq
+import ipaddress
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core import checks
+
+from .utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PLGEOIP1'
+HEADER = struct.Struct('>8sII')
+RECORD = struct.Struct('>III')
+
+DEFAULT_LOCATION = {'city': 'Casablanca', 'country': 'Maroc', 'countryCode': 'MA'}
+
+
+class IPRangeDatabase:
+    """Read-only view over a geolocation range file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, self.record_count, locations_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a GeoIP range database")
+        self.locations = [
+            {'city': city, 'country': country, 'countryCode': code}
+            for city, country, code in json.loads(self._mm[locations_offset:].decode('utf-8'))
+        ]
+        self.mtime = os.path.getmtime(path)
+
+    def close(self):
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    def lookup(self, ip_int):
+        """Return the location dict for an integer IPv4 address, or None"""
+        mm = self._mm
+        lo, hi = 0, self.record_count - 1
+        base = HEADER.size
+        size = RECORD.size
+        while lo <= hi:
+            mid = (lo + hi) >> 1
+            start, end, location = RECORD.unpack_from(mm, base + mid * size)
+            if ip_int < start:
+                hi = mid - 1
+            elif ip_int > end:
+                lo = mid + 1
+            else:
+                return self.locations[location]
+        return None
+
+
+def write_database(path, rows, sort_chunk=1_000_000):
+    """
+    Write a range database from (start_int, end_int, city, country, code) rows.
+    Records are streamed to disk; only out-of-order input is sorted, in
+    chunks of ``sort_chunk`` records merged from temporary files. The file
+    is written next to the target and swapped in atomically. Raises
+    ValueError (leaving the current database in place) if ``rows`` is empty.
+    """
+    location_index = {}
+    locations = []
+    record_count = 0
+    previous = -1
+    in_order = True
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w+b') as fh:
+            fh.write(HEADER.pack(MAGIC, 0, 0))
+            for start, end, city, country, code in rows:
+                key = (city or '', country or '', code or '')
+                if key not in location_index:
+                    location_index[key] = len(locations)
+                    locations.append(list(key))
+                start = int(start)
+                in_order = in_order and start >= previous
+                previous = start
+                fh.write(RECORD.pack(start, int(end), location_index[key]))
+                record_count += 1
+            if not record_count:
+                raise ValueError('No ranges to write')
+            if not in_order:
+                _sort_records(fh, record_count, sort_chunk)
+
+            locations_offset = HEADER.size + RECORD.size * record_count
+            fh.seek(locations_offset)
+            fh.write(json.dumps(locations, ensure_ascii=False).encode('utf-8'))
+            fh.truncate()
+            fh.seek(0)
+            fh.write(HEADER.pack(MAGIC, record_count, locations_offset))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return record_count, len(locations)
+
+
+def _read_records(fh, count, block=65536):
+    """Iterate ``count`` records from the current position of ``fh``"""
+    while count > 0:
+        n = min(count, block)
+        data = fh.read(RECORD.size * n)
+        yield from RECORD.iter_unpack(data)
+        count -= n
+
+
+def _sort_records(fh, record_count, chunk):
+    """Sort the records after the header of ``fh`` in place: sorted runs on disk, then one merge"""
+    runs = []
+    try:
+        for offset in range(0, record_count, chunk):
+            fh.seek(HEADER.size + RECORD.size * offset)
+            records = sorted(_read_records(fh, min(chunk, record_count - offset)))
+            run = tempfile.TemporaryFile()
+            runs.append(run)
+            run.write(b''.join(RECORD.pack(*record) for record in records))
+            run.seek(0)
+            del records
+
+        counts = [min(chunk, record_count - offset) for offset in range(0, record_count, chunk)]
+        fh.seek(HEADER.size)
+        for record in heapq.merge(*(_read_records(run, n) for run, n in zip(runs, counts))):
+            fh.write(RECORD.pack(*record))
+    finally:
+        for run in runs:
+            run.close()
+
+
+# ========== PROCESS-WIDE STATE ==========
+
+_db = None
+_db_checked_at = None
+_db_missing_logged = False
+_db_lock = threading.Lock()
+_cache = LRUCache(
+    maxsize=getattr(settings, 'GEOIP_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'GEOIP_CACHE_TTL', 3600),
+)
+
+
+def _database_path():
+    return getattr(settings, 'GEOIP_DATABASE_PATH', os.path.join(settings.BASE_DIR, 'geoip', 'ip_ranges.bin'))
+
+
+def get_database():
+    """Open (or re-open after a rebuild) the range database; None if absent"""
+    global _db, _db_checked_at, _db_missing_logged
+
+    interval = getattr(settings, 'GEOIP_RELOAD_INTERVAL', 60)
+    now = time.monotonic()
+    if _db_checked_at is not None and now - _db_checked_at < interval:
+        return _db
+
+    with _db_lock:
+        if _db_checked_at is not None and now - _db_checked_at < interval:
+            return _db
+        _db_checked_at = now
+        path = _database_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            if _db is None and not _db_missing_logged:
+                _db_missing_logged = True
+                logger.warning(
+                    f"GeoIP database {path} is missing (python manage.py build_geoip_db): "
+                    f"every visitor resolves to {DEFAULT_LOCATION['city']}"
+                )
+            return _db
+        if _db is not None and _db.mtime == mtime:
+            return _db
+        try:
+            new_db = IPRangeDatabase(path)
+        except Exception as exc:
+            logger.warning(f"GeoIP database could not be opened: {exc}")
+            return _db
+        # The previous mapping is left to the GC: another thread may still be
+        # in the middle of a binary search over it.
+        _db = new_db
+        _cache.clear()
+        logger.info(f"GeoIP database loaded: {new_db.record_count} ranges from {path}")
+        return _db
+
+
+def _remote_lookup(ip_address):
+    """Legacy HTTP providers, only used when GEOIP_REMOTE_FALLBACK is enabled"""
+    try:
+        response = requests.get(f'http://ip-api.com/json/{ip_address}', timeout=3)
+        if response.status_code == 200:
+            data = response.json()
+            if data.get('status') == 'success':
+                return {
+                    'city': data.get('city', 'Casablanca'),
+                    'country': data.get('country', 'Maroc'),
+                    'countryCode': data.get('countryCode', 'MA')
+                }
+    except Exception as exc:
+        logger.warning(f"Remote location detection error: {exc}")
+    return None
+
+
+def lookup(ip_address):
+    """
+    Resolve an IP address to {'city', 'country', 'countryCode'}.
+    Never raises; unknown, private and IPv6 addresses get the default location.
+    """
+    if not ip_address:
+        return dict(DEFAULT_LOCATION)
+
+    cached = _cache.get(ip_address)
+    if cached is not None:
+        return dict(cached)
+
+    location = None
+    ttl = None
+    try:
+        ip = ipaddress.ip_address(ip_address.strip())
+    except ValueError:
+        ip = None
+
+    if ip is not None and ip.version == 4 and ip.is_global:
+        db = get_database()
+        if db is not None:
+            location = db.lookup(int(ip))
+        if location is None and getattr(settings, 'GEOIP_REMOTE_FALLBACK', False):
+            location = _remote_lookup(ip_address)
+            if location is None:
+                # The provider failed: ask again soon rather than for the full TTL
+                ttl = getattr(settings, 'GEOIP_FAILURE_TTL', 60)
+
+    location = location or DEFAULT_LOCATION
+    _cache.set(ip_address, location, ttl)
+    return dict(location)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+@checks.register(checks.Tags.compatibility)
+def check_database(app_configs, **kwargs):
+    path = _database_path()
+    if os.path.exists(path) or getattr(settings, 'GEOIP_REMOTE_FALLBACK', False):
+        return []
+    return [checks.Warning(
+        f"GeoIP database {path} is missing: every visitor will resolve to {DEFAULT_LOCATION['city']}.",
+        hint="Run 'python manage.py build_geoip_db' (the nixpacks build phase does) "
+             "or set GEOIP_REMOTE_FALLBACK=True.",
+        id='geoip.W001',
+    )]
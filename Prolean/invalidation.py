@@ -0,0 +1,161 @@
+# invalidation.py - model-driven cache invalidation
+"""
+Cached artifacts declare the models they are built from::
+
+    FEATURED = invalidation.artifact('featured_trainings', depends_on=['Prolean.Training'])
+    trainings = FEATURED.get_or_set(build_featured)
+
+Each dependency model has a generation: the version of its
+``model:<app_label>.<model>`` channel on the invalidation bus (bus.py),
+published by its post_save / post_delete / m2m_changed signals. An
+artifact's cache key embeds the current generation of every model it
+depends on, so the first read after an edit misses in every process the
+message reached and entries built from older data are never read again
+(they expire on their own). Artifacts can
+therefore be cached for hours (CACHE_ARTIFACT_TTL) and still be correct
+right after an edit.
+
+Writes that send no signals (``QuerySet.update``, ``bulk_create``,
+``bulk_update``) must call ``bump(model)`` themselves.
+"""
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import bus
+
+logger = logging.getLogger(__name__)
+
+_artifacts = {}
+_watched = set()
+_lock = threading.Lock()
+
+
+def _label(model):
+    """'app_label.modelname' for a model class or an 'app_label.Model' string"""
+    if isinstance(model, str):
+        app_label, model_name = model.split('.')
+        return f'{app_label}.{model_name.lower()}'
+    return f'{model._meta.app_label}.{model._meta.model_name}'
+
+
+def _channel(label):
+    return f'model:{label}'
+
+
+def generations(labels):
+    """{label: generation} as last seen by this process"""
+    return {label: bus.version(_channel(label)) for label in labels}
+
+
+def bump(model):
+    """Invalidate every artifact that depends on ``model``"""
+    bus.publish(_channel(_label(model)))
+
+
+def _on_change(sender, **kwargs):
+    bump(sender)
+
+
+def _on_m2m_change(sender, instance, action, model=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    for changed in (type(instance), model):
+        if changed is not None and _label(changed) in _watched:
+            bump(changed)
+
+
+def _watch(label):
+    with _lock:
+        if label in _watched:
+            return
+        _watched.add(label)
+    for name, signal in (('save', post_save), ('delete', post_delete)):
+        # Lazy string sender: the model class may not be loaded yet
+        signal.connect(_on_change, sender=label, weak=False,
+                       dispatch_uid=f'invalidation:{name}:{label}')
+    m2m_changed.connect(_on_m2m_change, weak=False, dispatch_uid='invalidation:m2m')
+
+
+def watch(*models):
+    """
+    Keep generation counters for ``models``. Declaring an artifact watches its
+    dependencies too, but only once its module is imported: models edited in
+    processes that never import it (shell, workers) are watched from signals.py.
+    """
+    for model in models:
+        _watch(_label(model))
+
+
+class Artifact:
+    """A cached value whose key follows the generations of its dependency models"""
+
+    def __init__(self, name, depends_on, ttl=None):
+        self.name = name
+        self.depends_on = tuple(sorted({_label(model) for model in depends_on}))
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, *parts):
+        current = generations(self.depends_on)
+        stamp = '.'.join(str(current[label]) for label in self.depends_on)
+        suffix = ':'.join(str(part) for part in parts)
+        if len(suffix) > 100:
+            suffix = hashlib.md5(suffix.encode()).hexdigest()
+        return f'artifact:{self.name}:{stamp}:{suffix}'
+
+    def timeout(self):
+        return self.ttl if self.ttl is not None else getattr(settings, 'CACHE_ARTIFACT_TTL', 6 * 3600)
+
+    def get(self, *parts, key=None):
+        """(found, value) for the current generations"""
+        entry = cache.get(key or self.key(*parts))
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        # Stored wrapped so a cached None is a hit
+        return True, entry[0]
+
+    def set(self, value, *parts, key=None):
+        cache.set(key or self.key(*parts), (value,), self.timeout())
+
+    def get_or_set(self, build, *parts):
+        """Cached value, built on a miss (single-flight with the tiered cache)"""
+        built = []
+
+        def wrapped():
+            built.append(True)
+            return (build(),)
+
+        entry = cache.get_or_set(self.key(*parts), wrapped, self.timeout())
+        if built:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry[0]
+
+
+def artifact(name, depends_on, ttl=None):
+    """Declare (or return the already declared) cached artifact ``name``"""
+    with _lock:
+        existing = _artifacts.get(name)
+    if existing is not None:
+        return existing
+    declared = Artifact(name, depends_on, ttl)
+    for label in declared.depends_on:
+        _watch(label)
+    with _lock:
+        return _artifacts.setdefault(name, declared)
+
+
+def stats():
+    return {
+        name: {'depends_on': list(item.depends_on), 'hits': item.hits, 'misses': item.misses}
+        for name, item in _artifacts.items()
+    }
@@ -0,0 +1,160 @@
+# management/commands/api_stub.py
+import hashlib
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from django.core.management.base import BaseCommand
+
+CITIES = [
+    {'id': 'casa', 'name': 'Casablanca'},
+    {'id': 'rabat', 'name': 'Rabat'},
+    {'id': 'tanger', 'name': 'Tanger'},
+    {'id': 'marrakech', 'name': 'Marrakech'},
+]
+
+TOPICS = ['CACES Engins', 'Habilitation électrique', 'Soudage', 'Sécurité incendie', 'Management']
+
+
+def sample_formations(count):
+    # Spread updated_at over the last `count` minutes so updated_since filters
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            'id': i + 1,
+            'title': f'{TOPICS[i % len(TOPICS)]} niveau {i + 1}',
+            'slug': f'stub-formation-{i + 1}',
+            'short_description': f'Formation de démonstration {i + 1}',
+            'description': f'Description détaillée de la formation de démonstration {i + 1}',
+            'price_mad': 2500 + 100 * i,
+            'duration_hours': 16 + 8 * (i % 4),
+            'success_rate': 95,
+            'max_students': 20,
+            'is_featured': i < 4,
+            'updated_at': (now - timedelta(minutes=count - i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Site Management API stand-in; behaviour comes from server.options"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.options['verbosity'] > 1:
+            super().log_message(format, *args)
+
+    def _misbehave(self):
+        options = self.server.options
+        delay = (options['latency'] + random.uniform(0, options['jitter'])) / 1000
+        if random.random() < options['hang_rate']:
+            delay = options['hang_seconds']
+        if delay:
+            time.sleep(delay)
+        if random.random() < options['fail_rate']:
+            self._send(options['fail_status'], {'error': 'stub failure'})
+            return True
+        return False
+
+    def _send(self, status, payload, etag=False):
+        body = json.dumps(payload).encode('utf-8')
+        tag = f'"{hashlib.md5(body).hexdigest()}"' if etag else None
+        if tag and self.headers.get('If-None-Match') == tag:
+            status, body = 304, b''
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+        if tag:
+            self.send_header('ETag', tag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self._misbehave():
+            return
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        formations = self.server.formations
+
+        if path == '/api/public/formations':
+            since = parse_qs(url.query).get('updated_since')
+            if since:
+                formations = [f for f in formations if f['updated_at'] > since[0]]
+            self._send(200, formations, etag=True)
+        elif path.startswith('/api/public/formations/'):
+            slug = path.rsplit('/', 1)[-1]
+            match = next((f for f in formations if f['slug'] == slug), None)
+            self._send(200, match) if match else self._send(404, {'error': 'not found'})
+        elif path == '/api/public/cities':
+            self._send(200, CITIES, etag=True)
+        elif path == '/api/public/student/dashboard':
+            if not self.headers.get('Authorization', '').startswith('Bearer '):
+                self._send(401, {'error': 'unauthorized'})
+            else:
+                self._send(200, {'profile': {'full_name': 'Stub Student'}, 'stats': {}, 'formations': [], 'sessions': []}, etag=True)
+        else:
+            self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self._misbehave():
+            return
+        path = self.path.rstrip('/')
+
+        if path in ('/api/public/contact-requests', '/api/public/pre-inscriptions', '/api/public/student-register'):
+            key = self.headers.get('Idempotency-Key')
+            if key and key in self.server.received:
+                self._send(409, {'id': self.server.received[key], 'error': 'duplicate'})
+                return
+            record_id = str(uuid.uuid4())
+            if key:
+                self.server.received[key] = record_id
+            self._send(201, {'id': record_id})
+        elif path == '/api/public/student-login':
+            self._send(200, {'token': uuid.uuid4().hex, 'student': {'full_name': 'Stub Student'}})
+        else:
+            self._send(404, {'error': 'not found'})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # accept bursts of concurrent connections
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the Site Management API with tunable latency and failures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0, help='Added latency per request (ms)')
+        parser.add_argument('--jitter', type=float, default=0, help='Random extra latency, up to this many ms')
+        parser.add_argument('--fail-rate', type=float, default=0, help='Fraction of requests answered with --fail-status')
+        parser.add_argument('--fail-status', type=int, default=503)
+        parser.add_argument('--hang-rate', type=float, default=0, help='Fraction of requests that stall for --hang-seconds')
+        parser.add_argument('--hang-seconds', type=float, default=30)
+        parser.add_argument('--formations', type=int, default=24, help='Number of sample formations')
+
+    def handle(self, *args, **options):
+        server = StubServer((options['host'], options['port']), StubHandler)
+        server.options = options
+        server.formations = sample_formations(options['formations'])
+        server.received = {}  # Idempotency-Key -> id
+
+        base = f"http://{options['host']}:{options['port']}/api"
+        self.stdout.write(self.style.SUCCESS(f"Stub API listening on {base}"))
+        self.stdout.write(f"  SITE_MANAGEMENT_API_BASE={base}")
+        self.stdout.write(f"  SITE_MANAGEMENT_PUBLIC_API_BASE={base}/public")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,50 @@
+# management/commands/backfill_rollups.py
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from Prolean import rollups
+from Prolean.models import PageView
+
+
+class Command(BaseCommand):
+    help = 'Recompute analytics rollups and DailyStat for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day (YYYY-MM-DD), defaults to the oldest page view')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD), defaults to today')
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only fold in events added since the last run (ignores --start/--end)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        if options['incremental']:
+            days = rollups.update_rollups()
+            self.stdout.write(self.style.SUCCESS(
+                f"Recomputed {len(days)} day(s) in {time.perf_counter() - started:.2f}s"
+            ))
+            return
+
+        try:
+            end_date = date.fromisoformat(options['end']) if options['end'] else timezone.localdate()
+            if options['start']:
+                start_date = date.fromisoformat(options['start'])
+            else:
+                oldest = PageView.objects.aggregate(oldest=Min('timestamp'))['oldest']
+                start_date = timezone.localtime(oldest).date() if oldest else end_date
+        except ValueError as exc:
+            raise CommandError(f"Invalid date: {exc}")
+
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end')
+
+        rows = rollups.rebuild(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rollup rows for {start_date} .. {end_date} "
+            f"in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,80 @@
+# management/commands/bench_proxy.py
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running server with many concurrent proxy calls. Start '
+        '`manage.py api_stub --latency 1000` and point SITE_MANAGEMENT_API_BASE '
+        'at it, then compare e.g. `gunicorn Project.wsgi --threads 8` with '
+        '`ASYNC_PROXY_VIEWS=True gunicorn Project.asgi -k uvicorn.workers.UvicornWorker`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server under test')
+        parser.add_argument('--path', default='/api/pre-subscribe/', help='Proxy endpoint (POST JSON)')
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=200, help='Calls in flight at once')
+        parser.add_argument('--timeout', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        result = asyncio.run(self.run(options))
+        timings = sorted(result['timings'])
+        if not timings:
+            self.stdout.write(self.style.ERROR(f"No responses: {result['statuses']}"))
+            return
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['requests']} calls, {options['concurrency']} in flight: "
+            f"{len(timings) / result['elapsed']:.1f} req/s in {result['elapsed']:.2f}s"
+        ))
+        self.stdout.write(
+            f"p50 {statistics.median(timings):.0f} ms  p95 {percentile(0.95):.0f} ms  "
+            f"p99 {percentile(0.99):.0f} ms  max {timings[-1]:.0f} ms  statuses {result['statuses']}"
+        )
+
+    async def run(self, options):
+        payload = json.dumps({
+            'training_id': 1,
+            'full_name': 'Bench Client',
+            'email': 'bench@example.com',
+            'phone': '+212600000000',
+            'message': 'load test',
+        })
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        limits = httpx.Limits(max_connections=options['concurrency'])
+        timings, statuses = [], {}
+
+        async with httpx.AsyncClient(base_url=options['url'], limits=limits, timeout=options['timeout']) as client:
+            async def call(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(
+                            options['path'],
+                            content=payload,
+                            headers={
+                                'Content-Type': 'application/json',
+                                # One client IP per call so per-IP rate limits stay out of the way
+                                'X-Forwarded-For': f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',
+                            },
+                        )
+                        outcome = response.status_code
+                        timings.append((time.perf_counter() - started) * 1000)
+                    except httpx.HTTPError as exc:
+                        outcome = type(exc).__name__
+                    statuses[outcome] = statuses.get(outcome, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(call(i) for i in range(options['requests'])))
+            elapsed = time.perf_counter() - started
+
+        return {'timings': timings, 'statuses': statuses, 'elapsed': elapsed}
@@ -0,0 +1,109 @@
+# management/commands/bench_views.py
+import statistics
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from Prolean import ratelimit
+
+# Every variant starts from an empty private cache: the configured one may
+# be the shared Redis cache of the deploy (rate limits, pages, sync locks)
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench-views',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure requests/sec and latency percentiles of a view in-process '
+        '(DEBUG only: requests write rate limit logs, analytics and view counts)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/formations/', help='URL to request (default: catalog)')
+        parser.add_argument('--requests', type=int, default=300, help='Number of measured requests')
+        parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests sent first')
+        parser.add_argument(
+            '--same-ip',
+            action='store_true',
+            help='Send every request from one IP (exercises the 429 path)',
+        )
+        parser.add_argument(
+            '--compare',
+            nargs='+',
+            metavar='BACKEND',
+            help='Rate limit backends to compare, e.g. '
+                 'Prolean.ratelimit.DatabaseRateLimitBackend Prolean.ratelimit.CacheSlidingWindowBackend',
+        )
+        parser.add_argument(
+            '--page-cache',
+            action='store_true',
+            help='Compare the view with the anonymous page cache off and on',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError(
+                'bench_views sends hundreds of requests through the middleware against the '
+                'configured database; run it with DEBUG=True on a development database'
+            )
+        variants = []
+        for backend in options['compare'] or [None]:
+            label = backend.rsplit('.', 1)[-1] if backend else 'configured settings'
+            variants.append((label, {'PROLEAN_RATELIMIT_BACKEND': backend} if backend else {}))
+        if options['page_cache']:
+            variants = [
+                (f'{label} / page cache {state}', dict(overrides, PAGE_CACHE_ENABLED=enabled))
+                for label, overrides in variants
+                for state, enabled in (('off', False), ('on', True))
+            ]
+        results = []
+
+        for label, overrides in variants:
+            with override_settings(CACHES=BENCH_CACHES, **overrides):
+                ratelimit.reset_backend()
+                caches['default'].clear()
+                result = self.run(options)
+            ratelimit.reset_backend()
+            results.append((label, result))
+
+        self.stdout.write('')
+        self.stdout.write(f"{'variant':<48} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}  statuses")
+        for label, result in results:
+            self.stdout.write(
+                f"{label:<48} {result['rps']:>9.1f} {result['p50']:>9.2f} {result['p99']:>9.2f}  {result['statuses']}"
+            )
+
+    def run(self, options):
+        client = Client()
+        path = options['path']
+
+        def remote_addr(i):
+            if options['same_ip']:
+                return '10.0.0.1'
+            return f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+
+        for i in range(options['warmup']):
+            client.get(path, REMOTE_ADDR=remote_addr(i + 1_000_000))
+
+        timings = []
+        statuses = {}
+        started = time.perf_counter()
+        for i in range(options['requests']):
+            t0 = time.perf_counter()
+            response = client.get(path, REMOTE_ADDR=remote_addr(i))
+            timings.append((time.perf_counter() - t0) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return {
+            'rps': len(timings) / elapsed if elapsed else 0,
+            'p50': statistics.median(timings),
+            'p99': timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+            'statuses': statuses,
+        }
@@ -0,0 +1,121 @@
+# management/commands/bench_workers.py
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid):
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as handle:
+            children += [int(child) for child in handle.read().split()]
+    return children
+
+
+def _memory(pid):
+    """{field: kB} from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as handle:
+        for line in handle:
+            name, _, rest = line.partition(':')
+            if name in SMAPS_FIELDS:
+                values[name] = int(rest.split()[0])
+    values['Uss'] = values['Private_Clean'] + values['Private_Dirty']
+    return values
+
+
+class Command(BaseCommand):
+    help = 'Compare the memory of gunicorn workers with and without --preload (Linux)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers per run')
+        parser.add_argument('--requests', type=int, default=200, help='Requests sent before measuring')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='URL requested round-robin (repeatable; default: catalog, home and one training page)',
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError('Needs /proc/<pid>/smaps_rollup (Linux 4.14+)')
+        paths = options['paths'] or ['/formations/', '/']
+        if not options['paths']:
+            from Prolean.models import Training
+            slug = Training.objects.filter(is_active=True).values_list('slug', flat=True).first()
+            if slug:
+                paths.append(f'/formations/{slug}/')
+
+        results = []
+        for label, extra in (('without --preload', []), ('with --preload', ['--preload'])):
+            self.stdout.write(f"Measuring {options['workers']} workers {label}...")
+            results.append((label, self.run(extra, paths, options)))
+
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'mode':<20} {'worker':>7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8} {'shared MB':>10}"
+        )
+        for label, workers in results:
+            for pid, memory in workers:
+                shared = memory['Shared_Clean'] + memory['Shared_Dirty']
+                self.stdout.write(
+                    f"{label:<20} {pid:>7} {memory['Rss'] / 1024:>8.1f} {memory['Pss'] / 1024:>8.1f} "
+                    f"{memory['Uss'] / 1024:>8.1f} {shared / 1024:>10.1f}"
+                )
+        self.stdout.write('')
+        for label, workers in results:
+            count = len(workers) or 1
+            rss = sum(memory['Rss'] for _, memory in workers) / count / 1024
+            pss = sum(memory['Pss'] for _, memory in workers) / count / 1024
+            uss = sum(memory['Uss'] for _, memory in workers) / count / 1024
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: mean per worker RSS {rss:.1f} MB, PSS {pss:.1f} MB, USS {uss:.1f} MB"
+            ))
+
+    def run(self, extra, paths, options):
+        port = _free_port()
+        command = [
+            sys.executable, '-m', 'gunicorn', '--pythonpath', str(settings.BASE_DIR),
+            '--chdir', str(settings.BASE_DIR), '-w', str(options['workers']),
+            '-b', f'127.0.0.1:{port}', '--log-level', 'warning', *extra, 'Project.wsgi',
+        ]
+        server = subprocess.Popen(command, cwd=settings.BASE_DIR)
+        try:
+            base = f'http://127.0.0.1:{port}'
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    urllib.request.urlopen(base + paths[0], timeout=5).read()
+                    break
+                except OSError:
+                    if time.monotonic() > deadline or server.poll() is not None:
+                        raise CommandError('gunicorn did not start')
+                    time.sleep(0.2)
+            for i in range(options['requests']):
+                request = urllib.request.Request(
+                    base + paths[i % len(paths)],
+                    headers={'X-Forwarded-For': f'10.9.{(i >> 8) & 255}.{i & 255}'},
+                )
+                try:
+                    urllib.request.urlopen(request, timeout=10).read()
+                except OSError:
+                    pass
+            return [(pid, _memory(pid)) for pid in sorted(_children(server.pid))]
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
@@ -0,0 +1,136 @@
+# management/commands/build_geoip_db.py
+import csv
+import gzip
+import io
+import ipaddress
+import tempfile
+import time
+from datetime import date
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from Prolean import geoip
+
+COUNTRY_NAMES = {
+    'MA': 'Maroc',
+    'FR': 'France',
+    'ES': 'Espagne',
+    'BE': 'Belgique',
+    'DE': 'Allemagne',
+    'IT': 'Italie',
+    'CA': 'Canada',
+    'US': 'États-Unis',
+    'GB': 'Royaume-Uni',
+    'AE': 'Émirats Arabes Unis',
+}
+
+
+class Command(BaseCommand):
+    help = 'Build the local IP geolocation range database from a CSV export'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_path',
+            nargs='?',
+            help='Path or URL of an IP2Location LITE DB3 or DB-IP city lite CSV file (.csv or .csv.gz); '
+                 'defaults to downloading GEOIP_SOURCE_URL (DB-IP city lite, dbip format)',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ip2location', 'dbip'],
+            default='ip2location',
+            help='ip2location: ip_from,ip_to,country_code,country_name,region,city (integer IPs); '
+                 'dbip: start_ip,end_ip,continent,country_code,region,city (dotted IPs)',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Target file (defaults to settings.GEOIP_DATABASE_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output'] or geoip._database_path()
+        started = time.monotonic()
+        source, fmt = options['csv_path'], options['format']
+        if source is None:
+            source, fmt = self.default_source(), 'dbip'
+
+        with tempfile.TemporaryFile() as download:
+            if source.startswith(('http://', 'https://')):
+                self.download(source, download)
+                raw, name = download, source
+            else:
+                try:
+                    raw, name = open(source, 'rb'), source
+                except OSError as e:
+                    raise CommandError(f"Cannot read {source}: {e}")
+            try:
+                with raw:
+                    binary = gzip.GzipFile(fileobj=raw) if name.endswith('.gz') else raw
+                    fh = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+                    # Streamed: the CSV (millions of ranges) is never held in memory
+                    record_count, location_count = geoip.write_database(
+                        output, self.iter_rows(csv.reader(fh), fmt)
+                    )
+            except (OSError, EOFError) as e:
+                raise CommandError(f"Cannot read {source}: {e}")
+            except ValueError:
+                raise CommandError('No IPv4 ranges found in the input file.')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {record_count} ranges / {location_count} locations to {output} in {elapsed:.1f}s'
+        ))
+
+    def default_source(self):
+        """This month's GEOIP_SOURCE_URL, or last month's if it is not published yet"""
+        template = getattr(settings, 'GEOIP_SOURCE_URL', '')
+        if not template:
+            raise CommandError('No CSV given and GEOIP_SOURCE_URL is not set.')
+        today = date.today()
+        previous = date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+        for month in (today, previous):
+            url = template.format(month=month.strftime('%Y-%m'))
+            try:
+                if requests.head(url, timeout=10, allow_redirects=True).status_code == 200:
+                    return url
+            except requests.RequestException as e:
+                raise CommandError(f"Cannot reach {url}: {e}")
+        raise CommandError(f"No GeoIP source published at {template}")
+
+    def download(self, url, target):
+        self.stdout.write(f"Downloading {url}...")
+        try:
+            with requests.get(url, stream=True, timeout=(10, 60)) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    target.write(chunk)
+        except requests.RequestException as e:
+            raise CommandError(f"Cannot download {url}: {e}")
+        target.seek(0)
+
+    def iter_rows(self, reader, fmt):
+        for line in reader:
+            if len(line) < 6:
+                continue
+            try:
+                if fmt == 'ip2location':
+                    start, end = int(line[0]), int(line[1])
+                    code, country, city = line[2], line[3], line[5]
+                else:
+                    start_ip = ipaddress.ip_address(line[0])
+                    end_ip = ipaddress.ip_address(line[1])
+                    if start_ip.version != 4:
+                        continue
+                    start, end = int(start_ip), int(end_ip)
+                    code, city = line[3], line[5]
+                    country = COUNTRY_NAMES.get(code, code)
+            except ValueError:
+                # Header line or malformed row
+                continue
+
+            if code in ('', '-'):
+                continue
+            if code in COUNTRY_NAMES:
+                country = COUNTRY_NAMES[code]
+            yield start, end, city if city != '-' else '', country, code
@@ -0,0 +1,36 @@
+# management/commands/deliver_outbox.py
+import json
+import time
+from django.core.management.base import BaseCommand
+from Prolean import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued contact requests and pre-inscriptions to the Site Management API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep delivering until interrupted')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between sweeps with --loop')
+        parser.add_argument('--retry-dead', action='store_true', help='Requeue dead-lettered messages first')
+        parser.add_argument('--stats', action='store_true', help='Only print queue statistics')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox.stats(), indent=2))
+            return
+
+        if options['retry_dead']:
+            self.stdout.write(f"Requeued {outbox.retry_dead()} dead message(s)")
+
+        while True:
+            started = time.perf_counter()
+            counts = outbox.dispatch_all()
+            if counts:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Delivered batch in {time.perf_counter() - started:.2f}s: {counts}"
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(json.dumps(outbox.stats(), indent=2))
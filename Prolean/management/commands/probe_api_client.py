@@ -0,0 +1,48 @@
+# management/commands/probe_api_client.py
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from Prolean import api_client
+
+
+class Command(BaseCommand):
+    help = 'Send requests through the shared API client and print its latency, error and breaker metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--mode',
+            choices=['direct', 'cached'],
+            default='direct',
+            help='direct: GET /formations every time; cached: get_json with stale-while-revalidate',
+        )
+        parser.add_argument('--ttl', type=float, default=1.0, help='Cache TTL for --mode cached (s)')
+
+    def handle(self, *args, **options):
+        api_client.reset()
+        outcomes = {}
+
+        def call(_):
+            started = time.perf_counter()
+            try:
+                if options['mode'] == 'cached':
+                    api_client.public_api.get_json('formations', '/formations', ttl=options['ttl'])
+                    outcome = 'ok'
+                else:
+                    outcome = str(api_client.public_api.get('formations', '/formations').status_code)
+            except api_client.CircuitOpenError:
+                outcome = 'short-circuited'
+            except Exception as exc:
+                outcome = type(exc).__name__
+            return outcome, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for outcome, _ in pool.map(call, range(options['requests'])):
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"{options['requests']} calls in {elapsed:.2f}s: {outcomes}")
+        self.stdout.write(json.dumps(api_client.metrics(), indent=2))
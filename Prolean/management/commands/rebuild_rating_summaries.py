@@ -0,0 +1,18 @@
+# management/commands/rebuild_rating_summaries.py
+import time
+from django.core.management.base import BaseCommand
+from Prolean import ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild every training rating summary from the approved reviews (one grouped query)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--training', type=int, action='append', help='Only this training id (repeatable)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = ratings.rebuild(options['training'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} rating summaries in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,29 @@
+# management/commands/run_scheduler.py
+from django.core.management.base import BaseCommand
+from Prolean import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the periodic jobs (sync, outbox, rollups) on their intervals: the Procfile worker process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--job',
+            action='append',
+            dest='jobs',
+            choices=sorted(scheduler.JOBS),
+            help='Job to run (repeatable), defaults to all',
+        )
+        parser.add_argument('--once', action='store_true', help='Run the jobs once and exit')
+
+    def handle(self, *args, **options):
+        names = options['jobs'] or sorted(scheduler.JOBS)
+        if not options['once']:
+            for name in names:
+                self.stdout.write(f"{name}: every {scheduler.JOBS[name].interval} s")
+            scheduler.run_forever(names)
+
+        for name in names:
+            ok, result = scheduler.run_job(name)
+            line = f"{name}: {result}"
+            self.stdout.write(self.style.SUCCESS(line) if ok else self.style.ERROR(line))
@@ -0,0 +1,38 @@
+# management/commands/sync_management_api.py
+import json
+from django.core.management.base import BaseCommand
+from Prolean import sync
+
+
+class Command(BaseCommand):
+    help = 'Pull formations and cities changed on the Site Management API into the local database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource',
+            action='append',
+            choices=sorted(sync.RESOURCES),
+            help='Resource to sync (repeatable), defaults to all',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the cursors, re-read everything and deactivate rows removed upstream',
+        )
+        parser.add_argument('--status', action='store_true', help='Only print cursors and sync lag')
+
+    def handle(self, *args, **options):
+        if not options['status']:
+            for summary in sync.sync_all(full=options['full'], resources=options['resource']):
+                name = summary['resource']
+                if summary.get('skipped'):
+                    self.stdout.write(self.style.WARNING(f"{name}: another sync is running, skipped"))
+                elif summary.get('error'):
+                    self.stdout.write(self.style.ERROR(f"{name}: {summary['error']}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{name}: fetched {summary['fetched']}, created {summary['created']}, "
+                        f"updated {summary['updated']}, deactivated {summary['deactivated']} "
+                        f"in {summary['duration_ms']} ms"
+                    ))
+        self.stdout.write(json.dumps(sync.status(), indent=2))
@@ -0,0 +1,36 @@
+# management/commands/warm_caches.py
+from django.core.management.base import BaseCommand
+from Prolean import warmup
+
+
+class Command(BaseCommand):
+    help = 'Precompute the catalog, currency, city, featured and top training page caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=None,
+            help='Number of most viewed training detail pages to render (default: WARMUP_TOP_TRAININGS)',
+        )
+        parser.add_argument(
+            '--shared-only',
+            action='store_true',
+            help='Skip the process-local caches (they die with this process, e.g. in the release phase)',
+        )
+
+    def handle(self, *args, **options):
+        if options['shared_only'] and not warmup.has_shared_cache():
+            self.stdout.write('No shared cache configured (REDIS_URL is unset): nothing to warm')
+            return
+        results = warmup.warm(top=options['top'], local=not options['shared_only'])
+
+        self.stdout.write(f"{'artifact':<56} {'ms':>9}  detail")
+        for result in results:
+            line = f"{result['artifact']:<56} {result['ms']:>9.1f}  {result['detail']}"
+            self.stdout.write(line if result['ok'] else self.style.WARNING(line))
+
+        failed = sum(1 for result in results if not result['ok'])
+        total_ms = sum(result['ms'] for result in results)
+        summary = f"Warmed {len(results) - failed}/{len(results)} artifacts in {total_ms:.0f} ms"
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
@@ -0,0 +1,114 @@
+# middleware.py
+from functools import cached_property
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .context_processors import get_client_ip, get_location_from_ip, load_currency_rates
+
+
+class RequestCache:
+    """
+    Per-request memo for values needed by views, context processors and
+    template filters. Every value is computed lazily, at most once per request.
+    """
+
+    def __init__(self, request):
+        self._request = request
+
+    @cached_property
+    def client_ip(self):
+        return get_client_ip(self._request)
+
+    @cached_property
+    def location(self):
+        return get_location_from_ip(self.client_ip)
+
+    @cached_property
+    def currency_rates(self):
+        return load_currency_rates()
+
+    @cached_property
+    def preferred_currency(self):
+        session = getattr(self._request, 'session', None)
+        if session is None:
+            return 'MAD'
+        return session.get('preferred_currency', 'MAD')
+
+    @cached_property
+    def is_authenticated(self):
+        user = getattr(self._request, 'user', None)
+        return bool(user and user.is_authenticated)
+
+    @cached_property
+    def unread_notifications(self):
+        if not self.is_authenticated:
+            return []
+        return list(
+            self._request.user.notifications.filter(is_read=False).order_by('-created_at')[:5]
+        )
+
+    @cached_property
+    def unread_notifications_count(self):
+        if not self.is_authenticated:
+            return 0
+        # Skip the COUNT when the first page already shows every unread item
+        if len(self.unread_notifications) < 5:
+            return len(self.unread_notifications)
+        return self._request.user.notifications.filter(is_read=False).count()
+
+
+def get_request_cache(request):
+    """Return the request's RequestCache, creating it if the middleware did not run"""
+    request_cache = getattr(request, 'request_cache', None)
+    if request_cache is None:
+        request_cache = RequestCache(request)
+        request.request_cache = request_cache
+    return request_cache
+
+
+class RequestCacheMiddleware:
+    """Attach a RequestCache to every request as ``request.request_cache``"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        # Under ASGI get_response returns a coroutine, awaited by the caller
+        request.request_cache = RequestCache(request)
+        return self.get_response(request)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI. WhiteNoiseMiddleware is
+    sync-only, so Django would otherwise hold a thread for every request
+    (including async views awaiting the upstream API) below it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
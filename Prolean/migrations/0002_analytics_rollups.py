@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-17 03:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=50, unique=True, verbose_name='Source')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='Dernier ID traité')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': "Filigrane d'agrégation",
+                'verbose_name_plural': "Filigranes d'agrégation",
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Heure'), ('day', 'Jour')], max_length=10, verbose_name='Granularité')),
+                ('period_start', models.DateTimeField(verbose_name='Début de période')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('city', 'Ville'), ('training', 'Formation')], default='total', max_length=20, verbose_name='Dimension')),
+                ('key', models.CharField(blank=True, default='', max_length=200, verbose_name='Valeur de dimension')),
+                ('pageviews', models.IntegerField(default=0, verbose_name='Pages vues')),
+                ('visitors', models.IntegerField(default=0, verbose_name='Visiteurs')),
+                ('sessions', models.IntegerField(default=0, verbose_name='Sessions démarrées')),
+                ('session_duration_total', models.BigIntegerField(default=0, verbose_name='Durée cumulée des sessions (s)')),
+                ('form_submissions', models.IntegerField(default=0, verbose_name='Soumissions de formulaire')),
+                ('phone_calls', models.IntegerField(default=0, verbose_name='Appels téléphoniques')),
+                ('whatsapp_clicks', models.IntegerField(default=0, verbose_name='Clics WhatsApp')),
+            ],
+            options={
+                'verbose_name': 'Agrégat analytique',
+                'verbose_name_plural': 'Agrégats analytiques',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['granularity', 'dimension', 'period_start'], name='Prolean_ana_granula_77c409_idx')],
+                'unique_together': {('granularity', 'period_start', 'dimension', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0002_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50, unique=True, verbose_name='Ressource')),
+                ('cursor', models.CharField(blank=True, default='', max_length=64, verbose_name='Modifié depuis')),
+                ('etag', models.CharField(blank=True, default='', max_length=200, verbose_name='ETag')),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière tentative')),
+                ('last_success_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière synchronisation réussie')),
+                ('last_full_sync_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière resynchronisation complète')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('last_duration_ms', models.PositiveIntegerField(default=0, verbose_name='Durée (ms)')),
+                ('last_fetched', models.PositiveIntegerField(default=0, verbose_name='Éléments reçus')),
+                ('last_changed', models.PositiveIntegerField(default=0, verbose_name='Éléments modifiés')),
+                ('max_item_lag_seconds', models.FloatField(blank=True, null=True, verbose_name='Retard maximal (s)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Curseur de synchronisation',
+                'verbose_name_plural': 'Curseurs de synchronisation',
+            },
+        ),
+        migrations.AddField(
+            model_name='city',
+            name='remote_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='ID Site Management'),
+        ),
+        migrations.AddField(
+            model_name='training',
+            name='remote_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='ID Site Management'),
+        ),
+    ]
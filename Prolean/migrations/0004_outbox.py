@@ -0,0 +1,37 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:05
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0003_delta_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='Type')),
+                ('payload', models.JSONField(verbose_name='Contenu')),
+                ('idempotency_key', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name="Clé d'idempotence")),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('sending', "En cours d'envoi"), ('delivered', 'Livré'), ('dead', 'Abandonné')], default='pending', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('remote_id', models.CharField(blank=True, default='', max_length=64, verbose_name='ID Site Management')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+                ('delivered_at', models.DateTimeField(blank=True, null=True, verbose_name='Livré le')),
+            ],
+            options={
+                'verbose_name': 'Message sortant',
+                'verbose_name_plural': 'Messages sortants',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='Prolean_out_status_742cc6_idx')],
+            },
+        ),
+    ]
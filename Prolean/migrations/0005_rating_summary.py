@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def build_summaries(apps, schema_editor):
+    Training = apps.get_model('Prolean', 'Training')
+    TrainingReview = apps.get_model('Prolean', 'TrainingReview')
+    TrainingRatingSummary = apps.get_model('Prolean', 'TrainingRatingSummary')
+
+    rows = TrainingReview.objects.filter(is_approved=True, rating__gte=1, rating__lte=5).order_by().values('training_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        last_review_at=Max('created_at'),
+        **{f'stars_{n}': Count('id', filter=Q(rating=n)) for n in range(1, 6)},
+    )
+    grouped = {row.pop('training_id'): row for row in rows}
+    TrainingRatingSummary.objects.bulk_create(
+        [TrainingRatingSummary(training_id=pk, **grouped.get(pk, {})) for pk in Training.objects.values_list('id', flat=True)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0004_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingRatingSummary',
+            fields=[
+                ('training', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_summary', serialize=False, to='Prolean.training', verbose_name='Formation')),
+                ('review_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis")),
+                ('rating_sum', models.PositiveIntegerField(default=0, verbose_name='Somme des notes')),
+                ('stars_1', models.PositiveIntegerField(default=0, verbose_name='1 étoile')),
+                ('stars_2', models.PositiveIntegerField(default=0, verbose_name='2 étoiles')),
+                ('stars_3', models.PositiveIntegerField(default=0, verbose_name='3 étoiles')),
+                ('stars_4', models.PositiveIntegerField(default=0, verbose_name='4 étoiles')),
+                ('stars_5', models.PositiveIntegerField(default=0, verbose_name='5 étoiles')),
+                ('last_review_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernier avis')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Résumé des avis',
+                'verbose_name_plural': 'Résumés des avis',
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
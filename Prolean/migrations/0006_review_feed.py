@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:40
+
+from django.db import migrations, models
+
+
+def resolve_avatars(apps, schema_editor):
+    """Store the avatar path training_detail used to compute on every render"""
+    TrainingReview = apps.get_model('Prolean', 'TrainingReview')
+
+    reviews = []
+    for review in TrainingReview.objects.only('id', 'avatar').iterator(chunk_size=1000):
+        avatar = review.avatar
+        if not avatar:
+            avatar = f'images/avatars/avatar{(review.id % 4) + 1}.png'
+        elif not avatar.startswith('images/avatars/'):
+            avatar = f'images/avatars/{avatar}' if '.' in avatar else 'images/avatars/avatar1.png'
+        if avatar != review.avatar:
+            review.avatar = avatar
+            reviews.append(review)
+    TrainingReview.objects.bulk_update(reviews, ['avatar'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0005_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trainingreview',
+            index=models.Index(fields=['training', 'is_approved', '-created_at', '-id'], name='review_feed_idx'),
+        ),
+        migrations.RunPython(resolve_avatars, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0006_review_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheChannel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True, verbose_name='Canal')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Version')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': "Canal d'invalidation",
+                'verbose_name_plural': "Canaux d'invalidation",
+            },
+        ),
+    ]
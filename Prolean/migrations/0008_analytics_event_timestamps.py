@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-17 09:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0007_cache_channel'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clickevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Horodatage'),
+        ),
+        migrations.AlterField(
+            model_name='pageview',
+            name='timestamp',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Horodatage'),
+        ),
+        migrations.AlterField(
+            model_name='phonecall',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Horodatage'),
+        ),
+        migrations.AlterField(
+            model_name='whatsappclick',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Horodatage'),
+        ),
+    ]
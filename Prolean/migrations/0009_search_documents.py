@@ -0,0 +1,60 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:05
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+INDEX_NAME = 'training_search_vector_idx'
+
+
+def create_index(apps, schema_editor):
+    # tsvector and GIN only exist on PostgreSQL; other databases keep the
+    # (unused) table so the schema stays the same everywhere
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+    from Prolean.search import INDEXED_FIELDS, document_vector
+
+    Training = apps.get_model('Prolean', 'Training')
+    TrainingSearchDocument = apps.get_model('Prolean', 'TrainingSearchDocument')
+    schema_editor.add_index(TrainingSearchDocument, GinIndex(fields=['vector'], name=INDEX_NAME))
+
+    config = getattr(settings, 'SEARCH_POSTGRES_CONFIG', 'french')
+    trainings = Training.objects.filter(is_active=True).only(*INDEXED_FIELDS).iterator(chunk_size=200)
+    TrainingSearchDocument.objects.bulk_create(
+        [TrainingSearchDocument(training_id=training.id, vector=document_vector(training, config)) for training in trainings],
+        batch_size=100,
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex
+
+    TrainingSearchDocument = apps.get_model('Prolean', 'TrainingSearchDocument')
+    schema_editor.remove_index(TrainingSearchDocument, GinIndex(fields=['vector'], name=INDEX_NAME))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Prolean', '0008_analytics_event_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingSearchDocument',
+            fields=[
+                ('training', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='Prolean.training', verbose_name='Formation')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True, verbose_name='Vecteur de recherche')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Mis à jour le')),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,15 +1,19 @@
 # models.py - COMPLETE MULTILINGUAL VERSION
 from django.db import models
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.db.models.signals import post_save, m2m_changed
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 import uuid
 import json
 import os
+import zlib
 from django.conf import settings
+from . import counters, currency
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
@@ -350,6 +354,7 @@ class Training(models.Model):
     
     # ========== NEXT SESSION (COMMON) ==========
     next_session = models.DateField(null=True, blank=True, verbose_name="Prochaine session")
+    remote_id = models.CharField(max_length=64, blank=True, default="", db_index=True, verbose_name="ID Site Management")
     
     # ========== SCHEDULE (COMMON) ==========
     schedule_json = models.JSONField(
@@ -851,28 +856,15 @@ class Training(models.Model):
     
     def get_price_in_currency(self, currency_code):
         """Convert MAD to specified currency"""
-        try:
-            currency_rate = CurrencyRate.objects.filter(currency_code=currency_code).first()
-            if currency_rate and currency_rate.rate_to_mad and currency_rate.rate_to_mad > 0:
-                converted_price = self.price_mad * currency_rate.rate_to_mad
-                return Decimal(str(round(converted_price, 2)))
-            
-            default_rates = {'EUR': Decimal('0.093'), 'USD': Decimal('0.100'), 'GBP': Decimal('0.079'), 'CAD': Decimal('0.136'), 'AED': Decimal('0.367')}
-            rate = default_rates.get(currency_code, Decimal('1.0'))
-            return self.price_mad * rate
-            
-        except Exception:
-            return self.price_mad
+        return currency.convert(self.price_mad, currency_code)
     
     def increment_view_count(self):
-        """Increment view count atomically"""
-        self.view_count = models.F('view_count') + 1
-        self.save(update_fields=['view_count'])
+        """Increment view count (buffered, flushed in bulk by counters.py)"""
+        counters.increment(self, 'view_count')
     
     def increment_inquiry_count(self):
-        """Increment inquiry count atomically"""
-        self.inquiry_count = models.F('inquiry_count') + 1
-        self.save(update_fields=['inquiry_count'])
+        """Increment inquiry count (buffered, flushed in bulk by counters.py)"""
+        counters.increment(self, 'inquiry_count')
 
 # ========== OTHER MODELS (UNCHANGED) ==========
 
@@ -1129,18 +1121,7 @@ class Promotion(models.Model):
     
     def get_price_in_currency(self, currency_code):
         """Get promotional price in specified currency"""
-        try:
-            currency_rate = CurrencyRate.objects.filter(currency_code=currency_code).first()
-            if currency_rate and currency_rate.rate_to_mad and currency_rate.rate_to_mad > 0:
-                converted_price = self.promotional_price_mad * currency_rate.rate_to_mad
-                return Decimal(str(round(converted_price, 2)))
-            
-            default_rates = {'EUR': Decimal('0.093'), 'USD': Decimal('0.100'), 'GBP': Decimal('0.079')}
-            rate = default_rates.get(currency_code, Decimal('1.0'))
-            return self.promotional_price_mad * rate
-            
-        except Exception:
-            return self.promotional_price_mad
+        return currency.convert(self.promotional_price_mad, currency_code)
     
     def can_use(self):
         """Check if promotion can still be used"""
@@ -1161,6 +1142,7 @@ class City(models.Model):
     is_headquarters = models.BooleanField(default=False, verbose_name="Siège social")
     address = models.TextField(blank=True, verbose_name="Adresse complète")
     is_active = models.BooleanField(default=True, verbose_name="Active")
+    remote_id = models.CharField(max_length=64, blank=True, default="", db_index=True, verbose_name="ID Site Management")
     
     class Meta:
         verbose_name = "Ville"
@@ -1389,7 +1371,7 @@ class PageView(models.Model):
     city = models.CharField(max_length=100, blank=True, verbose_name="Ville détectée")
     country = models.CharField(max_length=100, blank=True, verbose_name="Pays détecté")
     device_type = models.CharField(max_length=50, blank=True, verbose_name="Type d'appareil")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Horodatage", db_index=True)
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Horodatage", db_index=True)
     
     class Meta:
         verbose_name = "Vue de page"
@@ -1413,7 +1395,7 @@ class ClickEvent(models.Model):
     session_id = models.CharField(max_length=100, verbose_name="ID de session")
     ip_address = models.GenericIPAddressField(verbose_name="Adresse IP")
     city = models.CharField(max_length=100, blank=True, verbose_name="Ville")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Horodatage")
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Horodatage")
     
     class Meta:
         verbose_name = "Événement de clic"
@@ -1428,7 +1410,7 @@ class PhoneCall(models.Model):
     url = models.CharField(max_length=500, blank=True, verbose_name="URL source")
     session_id = models.CharField(max_length=100, verbose_name="ID de session")
     ip_address = models.GenericIPAddressField(verbose_name="Adresse IP")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Horodatage")
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Horodatage")
     
     class Meta:
         verbose_name = "Appel téléphonique"
@@ -1443,7 +1425,7 @@ class WhatsAppClick(models.Model):
     session_id = models.CharField(max_length=100, verbose_name="ID de session")
     ip_address = models.GenericIPAddressField(verbose_name="Adresse IP")
     city = models.CharField(max_length=100, blank=True, verbose_name="Ville")
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Horodatage")
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="Horodatage")
     
     class Meta:
         verbose_name = "Clic WhatsApp"
@@ -1508,6 +1490,122 @@ class DailyStat(models.Model):
     def __str__(self):
         return f"Stats du {self.date}"
 
+class AnalyticsRollup(models.Model):
+    """Precomputed analytics counters per hour/day, overall and per city/training"""
+    GRANULARITY_CHOICES = [
+        ('hour', 'Heure'),
+        ('day', 'Jour'),
+    ]
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('city', 'Ville'),
+        ('training', 'Formation'),
+    ]
+
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES, verbose_name="Granularité")
+    period_start = models.DateTimeField(verbose_name="Début de période")
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, default='total', verbose_name="Dimension")
+    key = models.CharField(max_length=200, blank=True, default='', verbose_name="Valeur de dimension")
+    pageviews = models.IntegerField(default=0, verbose_name="Pages vues")
+    visitors = models.IntegerField(default=0, verbose_name="Visiteurs")
+    sessions = models.IntegerField(default=0, verbose_name="Sessions démarrées")
+    session_duration_total = models.BigIntegerField(default=0, verbose_name="Durée cumulée des sessions (s)")
+    form_submissions = models.IntegerField(default=0, verbose_name="Soumissions de formulaire")
+    phone_calls = models.IntegerField(default=0, verbose_name="Appels téléphoniques")
+    whatsapp_clicks = models.IntegerField(default=0, verbose_name="Clics WhatsApp")
+
+    class Meta:
+        verbose_name = "Agrégat analytique"
+        verbose_name_plural = "Agrégats analytiques"
+        ordering = ['-period_start']
+        unique_together = ['granularity', 'period_start', 'dimension', 'key']
+        indexes = [
+            models.Index(fields=['granularity', 'dimension', 'period_start']),
+        ]
+
+    def __str__(self):
+        label = f"{self.dimension}={self.key}" if self.key else self.dimension
+        return f"{self.granularity} {self.period_start:%Y-%m-%d %H:%M} {label}"
+
+class RollupWatermark(models.Model):
+    """Last event id folded into the rollups, per source table"""
+    source = models.CharField(max_length=50, unique=True, verbose_name="Source")
+    last_id = models.BigIntegerField(default=0, verbose_name="Dernier ID traité")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Filigrane d'agrégation"
+        verbose_name_plural = "Filigranes d'agrégation"
+
+    def __str__(self):
+        return f"{self.source}: {self.last_id}"
+
+class SyncCursor(models.Model):
+    """Delta-sync position and lag metrics for one Site Management API resource"""
+    resource = models.CharField(max_length=50, unique=True, verbose_name="Ressource")
+    cursor = models.CharField(max_length=64, blank=True, default="", verbose_name="Modifié depuis")
+    etag = models.CharField(max_length=200, blank=True, default="", verbose_name="ETag")
+    last_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière tentative")
+    last_success_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière synchronisation réussie")
+    last_full_sync_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière resynchronisation complète")
+    last_error = models.TextField(blank=True, default="", verbose_name="Dernière erreur")
+    last_duration_ms = models.PositiveIntegerField(default=0, verbose_name="Durée (ms)")
+    last_fetched = models.PositiveIntegerField(default=0, verbose_name="Éléments reçus")
+    last_changed = models.PositiveIntegerField(default=0, verbose_name="Éléments modifiés")
+    max_item_lag_seconds = models.FloatField(null=True, blank=True, verbose_name="Retard maximal (s)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Curseur de synchronisation"
+        verbose_name_plural = "Curseurs de synchronisation"
+
+    def __str__(self):
+        return f"{self.resource}: {self.cursor or '-'}"
+
+class CacheChannel(models.Model):
+    """Version of one invalidation bus channel, incremented by bus.publish"""
+    name = models.CharField(max_length=150, unique=True, verbose_name="Canal")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="Version")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Canal d'invalidation"
+        verbose_name_plural = "Canaux d'invalidation"
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+class OutboxMessage(models.Model):
+    """Submission stored locally and delivered to the Site Management API in the background"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('sending', 'En cours d\'envoi'),
+        ('delivered', 'Livré'),
+        ('dead', 'Abandonné'),
+    ]
+
+    kind = models.CharField(max_length=50, verbose_name="Type")
+    payload = models.JSONField(verbose_name="Contenu")
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Clé d'idempotence")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Prochaine tentative")
+    last_error = models.TextField(blank=True, default="", verbose_name="Dernière erreur")
+    remote_id = models.CharField(max_length=64, blank=True, default="", verbose_name="ID Site Management")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    delivered_at = models.DateTimeField(null=True, blank=True, verbose_name="Livré le")
+
+    class Meta:
+        verbose_name = "Message sortant"
+        verbose_name_plural = "Messages sortants"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.idempotency_key} ({self.status})"
+
 class CurrencyRate(models.Model):
     """Currency exchange rates"""
     currency_code = models.CharField(max_length=3, unique=True, verbose_name="Code devise")
@@ -1552,6 +1650,21 @@ class TrainingWaitlist(models.Model):
 
 
 
+def resolve_review_avatar(avatar, seed):
+    """
+    Full static path of a review avatar: a default picked from ``seed`` (the
+    review id, or its author's name before the first save) when empty, the
+    avatars folder prepended to bare file names.
+    """
+    if not avatar:
+        number = (seed % 4) + 1 if isinstance(seed, int) else (zlib.crc32(str(seed or '').encode()) % 4) + 1
+        return f'images/avatars/avatar{number}.png'
+    if avatar.startswith('images/avatars/'):
+        return avatar
+    if '.' in avatar:
+        return f'images/avatars/{avatar}'
+    return 'images/avatars/avatar1.png'
+
 # In models.py - Update the TrainingReview model
 class TrainingReview(models.Model):
     """Training reviews from verified students"""
@@ -1579,11 +1692,18 @@ class TrainingReview(models.Model):
         indexes = [
             models.Index(fields=['training', 'is_approved', 'is_verified']),
             models.Index(fields=['rating', 'is_approved']),
+            # Keyset pagination of the review feed (review_feed.py)
+            models.Index(fields=['training', 'is_approved', '-created_at', '-id'], name='review_feed_idx'),
         ]
     
     def __str__(self):
         return f"{self.full_name} - {self.training.title} - {self.rating}★"
     
+    def save(self, *args, **kwargs):
+        # Resolve the avatar once here rather than on every page render
+        self.avatar = resolve_review_avatar(self.avatar, self.pk or self.full_name)
+        super().save(*args, **kwargs)
+    
     def get_helpful_percentage(self):
         """Calculate helpful percentage"""
         total = self.helpful_count + self.not_helpful_count
@@ -1591,6 +1711,52 @@ class TrainingReview(models.Model):
             return 0
         return (self.helpful_count / total) * 100
 
+class TrainingRatingSummary(models.Model):
+    """Approved-review totals of one training, kept up to date by ratings.py"""
+    training = models.OneToOneField(Training, on_delete=models.CASCADE, primary_key=True, related_name='rating_summary', verbose_name="Formation")
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Somme des notes")
+    stars_1 = models.PositiveIntegerField(default=0, verbose_name="1 étoile")
+    stars_2 = models.PositiveIntegerField(default=0, verbose_name="2 étoiles")
+    stars_3 = models.PositiveIntegerField(default=0, verbose_name="3 étoiles")
+    stars_4 = models.PositiveIntegerField(default=0, verbose_name="4 étoiles")
+    stars_5 = models.PositiveIntegerField(default=0, verbose_name="5 étoiles")
+    last_review_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernier avis")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Résumé des avis"
+        verbose_name_plural = "Résumés des avis"
+
+    def __str__(self):
+        return f"{self.training_id}: {self.average}★ ({self.review_count})"
+
+    @property
+    def average(self):
+        if not self.review_count:
+            return 0
+        return round(self.rating_sum / self.review_count, 1)
+
+    @property
+    def histogram(self):
+        """{stars: count}, 5 stars first"""
+        return {stars: getattr(self, f'stars_{stars}') for stars in range(5, 0, -1)}
+
+
+class TrainingSearchDocument(models.Model):
+    """Weighted tsvector of one training, queried by search.PostgresSearchBackend"""
+    training = models.OneToOneField(Training, on_delete=models.CASCADE, primary_key=True, related_name='search_document', verbose_name="Formation")
+    vector = SearchVectorField(null=True, verbose_name="Vecteur de recherche")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Mis à jour le")
+
+    class Meta:
+        verbose_name = "Document de recherche"
+        verbose_name_plural = "Documents de recherche"
+        # The GIN index on vector is PostgreSQL-only: migration 0009 creates it there
+
+    def __str__(self):
+        return f"{self.training_id}"
+
 
 
 
@@ -0,0 +1,196 @@
+# outbox.py - durable delivery of submissions to the Site Management API
+"""
+Contact requests and pre-inscriptions are written to ``OutboxMessage`` and
+acknowledged right away; delivery to the API happens off-request.
+
+* ``enqueue`` stores the message and, after commit, hands its id to an
+  in-process batcher so it is usually delivered within a second.
+* ``dispatch`` claims due messages (row locks with SKIP LOCKED where the
+  database supports it), posts them concurrently with their idempotency key
+  in an ``Idempotency-Key`` header and records the outcome in bulk.
+* Failures (timeouts, 5xx, 429, open circuit) are retried with exponential
+  backoff and jitter; after OUTBOX_MAX_ATTEMPTS, or on a 4xx the API will
+  never accept, the message is dead-lettered (status ``dead``) and kept.
+* The ``deliver_outbox`` job of the worker process (scheduler.py) sweeps
+  whatever the in-process path missed (restarts, full queue, retries);
+  the ``deliver_outbox`` command does the same on demand.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .api_client import management_api
+from .utils import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+# kind -> (api_client endpoint, path)
+KINDS = {
+    'contact_request': ('contact_request', '/public/contact-requests'),
+    'pre_inscription': ('pre_inscription', '/public/pre-inscriptions'),
+}
+
+RETRY_STATUSES = {408, 425, 429}
+# A lease longer than any read timeout: 'sending' rows older than this were
+# abandoned by a crashed dispatcher and are claimed again
+LEASE = timedelta(minutes=5)
+
+
+def enqueue(kind, payload):
+    """Store a submission for delivery; returns the OutboxMessage"""
+    from .models import OutboxMessage
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown outbox kind: {kind}")
+    message = OutboxMessage.objects.create(kind=kind, payload=payload)
+    transaction.on_commit(lambda: _nudges.put(message.id))
+    return message
+
+
+def backoff(attempts):
+    """Delay before the next attempt: base * 2^(attempts - 1), capped, with jitter"""
+    base = getattr(settings, 'OUTBOX_RETRY_BASE', 30)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX', 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _claim(ids=None, limit=50):
+    """Mark up to ``limit`` due messages as sending; returns them"""
+    from .models import OutboxMessage
+
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(
+        Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', next_attempt_at__lte=now - LEASE)
+    )
+    if ids is not None:
+        due = due.filter(id__in=ids)
+    with transaction.atomic():
+        claimed = list(
+            due.select_for_update(skip_locked=True).order_by('next_attempt_at')[:limit]
+        )
+        if claimed:
+            OutboxMessage.objects.filter(id__in=[m.id for m in claimed]).update(
+                status='sending', next_attempt_at=now
+            )
+    return claimed
+
+
+def _deliver(message):
+    """POST one message; returns (status, remote_id, error)"""
+    endpoint, path = KINDS[message.kind]
+    try:
+        response = management_api.post(
+            endpoint,
+            path,
+            json=message.payload,
+            headers={'Idempotency-Key': str(message.idempotency_key)},
+        )
+    except Exception as exc:
+        return 'retry', '', f"{type(exc).__name__}: {exc}"
+
+    try:
+        body = response.json() if response.content else {}
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+    if response.status_code in (200, 201, 202) or response.status_code == 409:
+        # 409: already received under this idempotency key
+        return 'delivered', str(body.get('id') or ''), ''
+    error = f"HTTP {response.status_code}: {body.get('error') or body.get('message') or ''}".strip()
+    if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+        return 'retry', '', error
+    return 'dead', '', error
+
+
+def dispatch(ids=None, limit=None):
+    """Deliver due messages (only ``ids`` if given); returns counts per outcome"""
+    from .models import OutboxMessage
+
+    limit = limit or getattr(settings, 'OUTBOX_BATCH_SIZE', 50)
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+    messages = _claim(ids, limit)
+    if not messages:
+        return {}
+
+    workers = min(len(messages), getattr(settings, 'OUTBOX_CONCURRENCY', 4))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_deliver, messages))
+
+    now = timezone.now()
+    counts = {}
+    for message, (outcome, remote_id, error) in zip(messages, results):
+        message.attempts += 1
+        message.last_error = error[:2000]
+        if outcome == 'retry' and message.attempts >= max_attempts:
+            outcome = 'dead'
+        if outcome == 'delivered':
+            message.status = 'delivered'
+            message.remote_id = remote_id
+            message.delivered_at = now
+        elif outcome == 'retry':
+            message.status = 'pending'
+            message.next_attempt_at = now + backoff(message.attempts)
+        else:
+            message.status = 'dead'
+            logger.error(f"Outbox {message.kind} {message.idempotency_key} dead-lettered: {error}")
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    OutboxMessage.objects.bulk_update(
+        messages,
+        ['status', 'attempts', 'last_error', 'remote_id', 'delivered_at', 'next_attempt_at'],
+    )
+    return counts
+
+
+def dispatch_all(limit=None):
+    """Deliver every due message, batch after batch"""
+    totals = {}
+    while True:
+        counts = dispatch(limit=limit)
+        if not counts:
+            return totals
+        for outcome, count in counts.items():
+            totals[outcome] = totals.get(outcome, 0) + count
+
+
+def retry_dead(ids=None):
+    """Put dead-lettered messages back in the queue"""
+    from .models import OutboxMessage
+
+    dead = OutboxMessage.objects.filter(status='dead')
+    if ids is not None:
+        dead = dead.filter(id__in=ids)
+    return dead.update(status='pending', attempts=0, next_attempt_at=timezone.now())
+
+
+def stats():
+    from .models import OutboxMessage
+
+    counts = dict(OutboxMessage.objects.order_by().values_list('status').annotate(n=Count('id')))
+    oldest = OutboxMessage.objects.filter(status__in=['pending', 'sending']).aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'by_status': counts,
+        'oldest_undelivered_age': round((timezone.now() - oldest).total_seconds(), 1) if oldest else None,
+        'in_process_queue': _nudges.stats(),
+    }
+
+
+def _dispatch_ids(ids):
+    dispatch(ids=ids, limit=len(ids))
+
+
+_nudges = BackgroundBatcher(
+    'outbox',
+    _dispatch_ids,
+    max_size=getattr(settings, 'OUTBOX_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'OUTBOX_BATCH_SIZE', 50),
+    interval=getattr(settings, 'OUTBOX_FLUSH_INTERVAL', 0.2),
+)
@@ -0,0 +1,155 @@
+# page_cache.py - rendered-page cache for anonymous visitors
+"""
+The public pages (home, catalog, training detail, migration, contact
+centres) render the same HTML for every anonymous visitor who shares a
+preferred currency and language. ``render`` stores that HTML in the cache,
+keyed on path, currency, language, the content version and the query
+parameters the view reads (its ``params``; others such as utm_* or fbclid
+do not split the cache), and only builds the context and renders the
+template on a miss.
+
+What differs per visitor is left out of the cached copy: views still run
+their rate limits and analytics before calling ``render``, and templates
+mark per-visitor values with ``{% visitor 'name' %}`` (templatetags/
+visitor_tags.py). While a page is rendered for the cache those tags emit a
+placeholder, and the ``user_location`` context processor gives the default
+location; placeholders are filled from ``VISITOR_VALUES`` on every response.
+
+Cached pages are an invalidation.py artifact: their keys carry the
+generations of the models the pages are built from, so any edit of a
+Training, review, rating summary, City, CurrencyRate, bank account or
+Promotion takes effect as soon as the invalidation bus delivers it. Logged-in users, non-GET
+requests and requests with pending flash messages bypass the cache.
+"""
+import hashlib
+import logging
+import re
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render as render_template
+from django.utils.html import escape, escapejs
+from django.utils.translation import get_language
+
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER = re.compile(r'<!--visitor:([a-z_]+)-->')
+
+
+def _location(request):
+    from .middleware import get_request_cache
+    return get_request_cache(request).location or {}
+
+
+# name -> function(request) returning the already-escaped value
+VISITOR_VALUES = {
+    'csrf_token': lambda request: get_token(request),
+    'location_city': lambda request: escape(_location(request).get('city') or 'Casablanca'),
+    'location_city_js': lambda request: escapejs(_location(request).get('city') or ''),
+    'location_country': lambda request: escape(_location(request).get('country') or 'Maroc'),
+}
+
+PAGES = invalidation.artifact('page', depends_on=[
+    'Prolean.Training', 'Prolean.TrainingReview', 'Prolean.TrainingRatingSummary',
+    'Prolean.City', 'Prolean.CurrencyRate', 'Prolean.CompanyBankAccount', 'Prolean.Promotion',
+])
+
+_stats = {'hits': 0, 'misses': 0, 'bypassed': 0}
+
+
+def placeholder(name):
+    return f'<!--visitor:{name}-->'
+
+
+def is_filling(request):
+    """True while the page is being rendered for the cache"""
+    return getattr(request, '_page_cache_filling', False)
+
+
+def is_cacheable(request):
+    if not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+        return False
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return False
+    # Flash messages belong to one visitor and are consumed by the render
+    return not len(get_messages(request))
+
+
+def cache_key(request, params=()):
+    from .middleware import get_request_cache
+
+    query = '&'.join(f'{name}={value}' for name in sorted(params) for value in request.GET.getlist(name))
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    currency_code = get_request_cache(request).preferred_currency
+    return PAGES.key(get_language(), currency_code, digest)
+
+
+def fill(request, content):
+    """Replace the placeholders of a cached page with this visitor's values"""
+    values = {}
+
+    def replace(match):
+        name = match.group(1)
+        if name not in values:
+            resolver = VISITOR_VALUES.get(name)
+            values[name] = resolver(request) if resolver else ''
+        return values[name]
+
+    return PLACEHOLDER.sub(replace, content)
+
+
+def get_cached(request, params=()):
+    """The cached page for this request, filled for this visitor, or None"""
+    if not is_cacheable(request):
+        return None
+    entry = cache.get(cache_key(request, params))
+    if entry is None:
+        return None
+    _stats['hits'] += 1
+    content, content_type = entry
+    response = HttpResponse(fill(request, content), content_type=content_type)
+    response['X-Page-Cache'] = 'hit'
+    return response
+
+
+def render(request, template_name, get_context, params=()):
+    """
+    ``render(request, template_name, get_context())`` through the page
+    cache: ``get_context`` is only called on a miss. ``params`` names the
+    query parameters the view reads; the others are left out of the key.
+    """
+    if not is_cacheable(request):
+        _stats['bypassed'] += 1
+        return render_template(request, template_name, get_context())
+
+    response = get_cached(request, params)
+    if response is not None:
+        return response
+
+    key = cache_key(request, params)
+    _stats['misses'] += 1
+    request._page_cache_filling = True
+    try:
+        response = render_template(request, template_name, get_context())
+    finally:
+        request._page_cache_filling = False
+
+    content = response.content.decode(response.charset)
+    if response.status_code == 200:
+        cache.set(key, (content, response['Content-Type']), getattr(settings, 'PAGE_CACHE_TTL', 3600))
+    response.content = fill(request, content)
+    response['X-Page-Cache'] = 'miss'
+    return response
+
+
+def stats():
+    total = _stats['hits'] + _stats['misses']
+    return dict(_stats, hit_rate=round(_stats['hits'] / total, 3) if total else None)
@@ -0,0 +1,277 @@
+# ratelimit.py - pluggable rate limiting engine
+"""
+Rate limiting without touching the database on the request path.
+
+The default backend keeps sliding-window counters in the Django cache
+(locmem in development, Redis in production) using atomic ``incr``.
+Violations are pushed onto an in-process queue and written to
+``RateLimitLog`` / ``ThreatIP`` in batches by a background thread, so the
+audit trail is kept without adding round-trips to the page view.
+Violations whose client IP is not a valid address (the forwarded hop is
+client-controlled) are not written, and a batch the database rejects is
+retried one violation at a time.
+
+The backend is chosen with ``PROLEAN_RATELIMIT_BACKEND``. The sliding
+window needs a cache every worker shares (Redis): on a per-process cache
+each worker counts on its own and every limit is multiplied by the number
+of workers, so without REDIS_URL the settings fall back to the legacy
+COUNT + INSERT ``DatabaseRateLimitBackend``, and the ``ratelimit.W001``
+system check flags a sliding window configured on a per-process cache.
+"""
+import ipaddress
+import logging
+import math
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .utils import BackgroundBatcher
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_IP = '0.0.0.0'
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+rejected_violations = Counter()  # reason -> violations not written
+
+
+class RateLimitBackend:
+    """Interface for rate limit backends"""
+
+    def hit(self, ip_address, endpoint, limit, period_seconds):
+        """
+        Register one request from ``ip_address`` to ``endpoint``.
+        Returns (is_allowed, retry_after_seconds, observed_count).
+        """
+        raise NotImplementedError
+
+
+class CacheSlidingWindowBackend(RateLimitBackend):
+    """
+    Sliding-window counter: two fixed-window counters in the cache, the
+    previous one weighted by how much of it still overlaps the window.
+    Costs one ``incr`` and one ``get`` per request, whatever the limit.
+    """
+
+    key_prefix = 'rl'
+
+    def __init__(self, cache_alias=None):
+        self.cache = caches[cache_alias or getattr(settings, 'PROLEAN_RATELIMIT_CACHE', 'default')]
+
+    def _incr(self, key, timeout):
+        # add() is a no-op when the key exists, so only one request creates it
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+            return 1
+
+    def hit(self, ip_address, endpoint, limit, period_seconds):
+        key = f'{ip_address}:{endpoint}'
+        now = time.time()
+        window = int(now // period_seconds)
+        elapsed = (now % period_seconds) / period_seconds
+
+        current_key = f'{self.key_prefix}:{key}:{window}'
+        previous_key = f'{self.key_prefix}:{key}:{window - 1}'
+
+        current = self._incr(current_key, period_seconds * 2)
+        previous = self.cache.get(previous_key, 0)
+        estimated = previous * (1 - elapsed) + current
+
+        if estimated > limit:
+            return False, max(1, math.ceil(period_seconds * (1 - elapsed))), math.ceil(estimated)
+        return True, 0, math.ceil(estimated)
+
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Legacy backend: COUNT over RateLimitLog, then INSERT one row per request"""
+
+    def hit(self, ip_address, endpoint, limit, period_seconds):
+        from .models import RateLimitLog
+
+        # Stored in a GenericIPAddressField: group malformed addresses together
+        ip_address = _clean_ip(ip_address) or UNKNOWN_IP
+        period_minutes = max(1, period_seconds // 60)
+        since = timezone.now() - timedelta(seconds=period_seconds)
+
+        request_count = RateLimitLog.objects.filter(
+            ip_address=ip_address,
+            endpoint=endpoint,
+            last_request__gte=since
+        ).count()
+
+        RateLimitLog.objects.create(
+            ip_address=ip_address,
+            endpoint=endpoint,
+            period_minutes=period_minutes
+        )
+
+        if request_count >= limit:
+            return False, period_seconds, request_count + 1
+        return True, 0, request_count + 1
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend_path = getattr(
+            settings,
+            'PROLEAN_RATELIMIT_BACKEND',
+            'Prolean.ratelimit.CacheSlidingWindowBackend'
+        )
+        _backend = import_string(backend_path)()
+    return _backend
+
+
+def reset_backend():
+    """Forget the configured backend (used after changing settings)"""
+    global _backend
+    _backend = None
+
+
+@checks.register(checks.Tags.caches)
+def check_backend(app_configs, **kwargs):
+    backend = import_string(getattr(
+        settings, 'PROLEAN_RATELIMIT_BACKEND', 'Prolean.ratelimit.CacheSlidingWindowBackend'
+    ))
+    if not issubclass(backend, CacheSlidingWindowBackend):
+        return []
+    alias = getattr(settings, 'PROLEAN_RATELIMIT_CACHE', 'default')
+    if settings.CACHES.get(alias, {}).get('BACKEND') not in PER_PROCESS_CACHES:
+        return []
+    return [checks.Warning(
+        f"Rate limit windows are counted in the per-process {alias!r} cache: "
+        f"every limit is multiplied by the number of workers.",
+        hint="Set REDIS_URL, or PROLEAN_RATELIMIT_BACKEND="
+             "'Prolean.ratelimit.DatabaseRateLimitBackend'.",
+        id='ratelimit.W001',
+    )]
+
+
+# ========== VIOLATION AUDIT TRAIL ==========
+
+def _clean_ip(value):
+    """Normalized IP address, or None: the forwarded hop is client-controlled"""
+    try:
+        return str(ipaddress.ip_address((value or '').strip()))
+    except ValueError:
+        return None
+
+
+def _write_violations(violations):
+    """
+    Persist a batch of (ip, endpoint, period_minutes, observed) tuples.
+    Violations without a valid IP are dropped; if the database still
+    rejects the batch, its violations are written one by one.
+    """
+    cleaned = []
+    for ip, endpoint, period, observed in violations:
+        ip = _clean_ip(ip)
+        if ip is None:
+            rejected_violations['invalid_ip'] += 1
+            continue
+        cleaned.append((ip, endpoint[:200], period, observed))
+    if not cleaned:
+        return
+
+    try:
+        with transaction.atomic():
+            _write_violation_batch(cleaned)
+        return
+    except (DataError, IntegrityError) as exc:
+        logger.warning(f"Rate limit batch of {len(cleaned)} violations rejected ({exc}), writing them one by one")
+
+    for violation in cleaned:
+        try:
+            with transaction.atomic():
+                _write_violation_batch([violation])
+        except (DataError, IntegrityError) as exc:
+            rejected_violations['database'] += 1
+            logger.error(f"Dropped invalid rate limit violation {violation}: {exc}")
+
+
+def _write_violation_batch(violations):
+    from .models import RateLimitLog, ThreatIP
+
+    counts = Counter((ip, endpoint, period) for ip, endpoint, period, _ in violations)
+    RateLimitLog.objects.bulk_create([
+        RateLimitLog(
+            ip_address=ip,
+            endpoint=endpoint,
+            period_minutes=period,
+            request_count=count,
+            is_threat=True,
+        )
+        for (ip, endpoint, period), count in counts.items()
+    ])
+
+    per_ip = Counter()
+    last_endpoint = {}
+    peak = {}
+    for ip, endpoint, period, observed in violations:
+        per_ip[ip] += 1
+        last_endpoint[ip] = (endpoint, period)
+        peak[ip] = max(peak.get(ip, 0), observed)
+
+    existing = set(
+        ThreatIP.objects.filter(ip_address__in=list(per_ip)).values_list('ip_address', flat=True)
+    )
+    for ip in existing:
+        endpoint, _ = last_endpoint[ip]
+        ThreatIP.objects.filter(ip_address=ip).update(
+            request_count=F('request_count') + per_ip[ip],
+            reason=f'Rate limit exceeded on {endpoint}'[:200],
+            last_detected=timezone.now(),
+        )
+
+    ThreatIP.objects.bulk_create([
+        ThreatIP(
+            ip_address=ip,
+            reason=f'Rate limit exceeded on {last_endpoint[ip][0]}: {peak[ip]} requests in {last_endpoint[ip][1]} minute(s)'[:200],
+            threat_level='high',
+            request_count=per_ip[ip],
+        )
+        for ip in per_ip if ip not in existing
+    ], ignore_conflicts=True)
+
+
+violation_queue = BackgroundBatcher(
+    'ratelimit-violations',
+    _write_violations,
+    max_size=getattr(settings, 'PROLEAN_RATELIMIT_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'PROLEAN_RATELIMIT_BATCH_SIZE', 200),
+    interval=getattr(settings, 'PROLEAN_RATELIMIT_FLUSH_INTERVAL', 2.0),
+)
+
+
+def check(ip_address, endpoint, limit=5, period_seconds=60):
+    """
+    Check and count a request from ``ip_address`` to ``endpoint``.
+    Returns (is_allowed, retry_after_seconds). Fails open if the backend errors.
+    """
+    try:
+        allowed, retry_after, observed = get_backend().hit(ip_address, endpoint, limit, period_seconds)
+    except Exception as exc:
+        logger.warning(f"Rate limiter backend unavailable, allowing request: {exc}")
+        return True, 0
+
+    if not allowed:
+        violation_queue.put((ip_address, endpoint, max(1, period_seconds // 60), observed))
+    return allowed, retry_after
@@ -0,0 +1,163 @@
+# ratings.py - per-training rating summaries
+"""
+``TrainingRatingSummary`` holds, for each training, the number of approved
+reviews, the sum of their ratings, a star histogram and the date of the
+newest one, so pages and serializers read a rating without aggregating
+``TrainingReview``.
+
+The summary is adjusted in place whenever a review is approved, edited,
+unapproved or deleted (signals.py): the review's previous contribution is
+taken out and its new one added with a single ``F()`` UPDATE. ``rebuild``
+recomputes summaries from scratch with one grouped query; run it with the
+``rebuild_rating_summaries`` command if the summaries ever drift (bulk
+queryset updates bypass the signals).
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import catalog, invalidation
+
+logger = logging.getLogger(__name__)
+
+STARS = range(1, 6)
+SUMMARY_FIELDS = ['review_count', 'rating_sum', 'last_review_at'] + [f'stars_{n}' for n in STARS]
+
+
+def get_summary(training):
+    """The training's summary; an empty unsaved one if it has none (or is not a model)"""
+    from .models import TrainingRatingSummary
+
+    try:
+        return training.rating_summary
+    except (TrainingRatingSummary.DoesNotExist, AttributeError):
+        return TrainingRatingSummary(training_id=getattr(training, 'pk', None))
+
+
+def get_summary_for_id(training_id):
+    from .models import TrainingRatingSummary
+
+    summary = TrainingRatingSummary.objects.filter(training_id=training_id).first()
+    return summary or TrainingRatingSummary(training_id=training_id)
+
+
+def contribution(review):
+    """(training_id, rating, created_at) the review counts for, or None"""
+    if not review.is_approved or review.training_id is None:
+        return None
+    try:
+        rating = int(review.rating)
+    except (TypeError, ValueError):
+        return None
+    if rating not in STARS:
+        return None
+    return review.training_id, rating, review.created_at
+
+
+def remember(review, update_fields=None):
+    """Before a save: note what the stored review currently counts for"""
+    from .models import TrainingReview
+
+    if review.pk is None:
+        review._rating_contribution = None
+        return
+    if update_fields is not None and not {'training', 'rating', 'is_approved'} & set(update_fields):
+        # e.g. vote counters: the contribution cannot change
+        review._rating_contribution = contribution(review)
+        return
+    stored = TrainingReview.objects.filter(pk=review.pk).only('training_id', 'rating', 'is_approved', 'created_at').first()
+    review._rating_contribution = contribution(stored) if stored is not None else None
+
+
+def review_saved(review):
+    before = getattr(review, '_rating_contribution', None)
+    after = contribution(review)
+    review._rating_contribution = after
+    if before == after:
+        return
+    if before is not None:
+        _adjust(*before, sign=-1)
+    if after is not None:
+        _adjust(*after, sign=1)
+    catalog.bump_version()
+
+
+def review_deleted(review):
+    removed = contribution(review)
+    if removed is not None:
+        _adjust(*removed, sign=-1)
+        catalog.bump_version()
+
+
+def _adjust(training_id, rating, created_at, sign):
+    from .models import TrainingRatingSummary, TrainingReview
+
+    summaries = TrainingRatingSummary.objects.filter(training_id=training_id)
+    if sign > 0 and not summaries.exists():
+        # No summary yet: compute it in full (it already reflects this review)
+        rebuild([training_id], bump=False)
+        return
+
+    values = {
+        'review_count': F('review_count') + sign,
+        'rating_sum': F('rating_sum') + sign * rating,
+        f'stars_{rating}': F(f'stars_{rating}') + sign,
+    }
+    if sign > 0 and created_at is not None:
+        values['last_review_at'] = Greatest(Coalesce('last_review_at', Value(created_at)), Value(created_at))
+    elif sign < 0:
+        # The removed review may have been the newest one
+        values['last_review_at'] = Subquery(
+            TrainingReview.objects.filter(
+                training_id=training_id, is_approved=True, rating__gte=1, rating__lte=5
+            ).order_by().values('training_id').annotate(newest=Max('created_at')).values('newest')
+        )
+    # Never creates a row on removal: the training itself may be being deleted
+    summaries.update(**values)
+
+
+def _grouped(training_ids=None):
+    """{training_id: summary values} for every training with approved reviews, in one query"""
+    from .models import TrainingReview
+
+    reviews = TrainingReview.objects.filter(is_approved=True, rating__gte=1, rating__lte=5)
+    if training_ids is not None:
+        reviews = reviews.filter(training_id__in=training_ids)
+    rows = reviews.order_by().values('training_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        last_review_at=Max('created_at'),
+        **{f'stars_{n}': Count('id', filter=Q(rating=n)) for n in STARS},
+    )
+    return {row.pop('training_id'): row for row in rows}
+
+
+def rebuild(training_ids=None, bump=True):
+    """Recompute the summaries of ``training_ids`` (all trainings if None); returns how many"""
+    from .models import Training, TrainingRatingSummary
+
+    trainings = Training.objects.all()
+    if training_ids is not None:
+        trainings = trainings.filter(id__in=training_ids)
+    grouped = _grouped(training_ids)
+    empty = dict.fromkeys(SUMMARY_FIELDS, 0)
+    empty['last_review_at'] = None
+
+    summaries = [
+        TrainingRatingSummary(training_id=training_id, **grouped.get(training_id, empty))
+        for training_id in trainings.values_list('id', flat=True)
+    ]
+    with transaction.atomic():
+        TrainingRatingSummary.objects.bulk_create(
+            summaries,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['training'],
+            update_fields=SUMMARY_FIELDS + ['updated_at'],
+        )
+    if bump:
+        catalog.bump_version()
+        invalidation.bump('Prolean.TrainingRatingSummary')
+    return len(summaries)
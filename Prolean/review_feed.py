@@ -0,0 +1,97 @@
+# review_feed.py - keyset-paginated feed of approved reviews
+"""
+Approved reviews of a training, newest first, one page at a time.
+
+Pages are cut on ``(created_at, id)`` rather than with OFFSET: the cursor
+of the next page is the position of the last review returned, so every
+page is one index range scan (``review_feed_idx``) however deep it is, and
+reviews approved while someone scrolls do not shift the pages.
+
+The first page of each training is an invalidation.py artifact: its key
+carries the TrainingReview generation, so saving or deleting any review
+(moving one to another training included) reaches every worker through
+the invalidation bus once the transaction commits. Vote counts are
+written by counters.py without signals, so on a cached page they may lag
+by up to REVIEW_FEED_CACHE_TTL seconds.
+"""
+import base64
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+FIELDS = [
+    'id', 'full_name', 'avatar', 'rating', 'title', 'comment', 'is_verified',
+    'created_at', 'helpful_count', 'not_helpful_count',
+]
+MAX_PAGE_SIZE = 50
+
+FIRST_PAGES = invalidation.artifact(
+    'review_feed',
+    depends_on=['Prolean.TrainingReview'],
+    ttl=getattr(settings, 'REVIEW_FEED_CACHE_TTL', 300),
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def page_size():
+    return getattr(settings, 'REVIEW_FEED_PAGE_SIZE', 10)
+
+
+def encode_cursor(created_at, review_id):
+    raw = f"{created_at.isoformat()}|{review_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor; raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, review_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(review_id)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from exc
+
+
+def _query(training_id, after=None, limit=None):
+    from .models import TrainingReview
+
+    limit = limit or page_size()
+    reviews = TrainingReview.objects.filter(training_id=training_id, is_approved=True)
+    if after is not None:
+        created_at, review_id = after
+        reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=review_id))
+    # One extra row tells whether there is a next page
+    rows = list(reviews.order_by('-created_at', '-id').values(*FIELDS)[:limit + 1])
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last['created_at'], last['id'])
+    return {'reviews': items, 'next_cursor': next_cursor}
+
+
+def get_page(training_id, cursor=None, limit=None):
+    """
+    {'reviews': [dict], 'next_cursor': str or None}. Review dicts hold model
+    values (``created_at`` is a datetime). Raises InvalidCursor.
+    """
+    limit = min(max(1, limit or page_size()), MAX_PAGE_SIZE)
+    if cursor:
+        return _query(training_id, decode_cursor(cursor), limit)
+    if limit != page_size():
+        return _query(training_id, None, limit)
+    return FIRST_PAGES.get_or_set(lambda: _query(training_id, None, limit), training_id)
+
+
+def to_json(review):
+    """Review dict as sent by the feed API"""
+    return dict(review, created_at=review['created_at'].strftime('%d/%m/%Y'))
@@ -0,0 +1,252 @@
+# rollups.py - incremental analytics rollups
+"""
+Hourly and daily analytics counters (``AnalyticsRollup``), overall and per
+city / per training, computed with GROUP BY queries so no event row is ever
+loaded into Python.
+
+``update_rollups`` is incremental: each source table has a watermark (last
+id folded in); only the days that received new rows since then are
+recomputed. The worker process runs it every few minutes (scheduler.py). ``rebuild`` recomputes any date range in one pass per source
+table (used for backfills). ``DailyStat`` rows are derived from the daily
+rollups.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncHour
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+
+from .models import (
+    AnalyticsRollup, DailyStat, FormSubmission, PageView, PhoneCall,
+    RollupWatermark, Training, VisitorSession, WhatsAppClick
+)
+
+logger = logging.getLogger(__name__)
+
+# source name -> (model, event time field)
+SOURCES = {
+    'pageview': (PageView, 'timestamp'),
+    'visitorsession': (VisitorSession, 'start_time'),
+    'formsubmission': (FormSubmission, 'timestamp'),
+    'phonecall': (PhoneCall, 'timestamp'),
+    'whatsappclick': (WhatsAppClick, 'timestamp'),
+}
+
+TRUNCATE = {
+    'hour': TruncHour,
+    'day': TruncDay,
+}
+
+
+@lru_cache(maxsize=4096)
+def training_slug_from_path(path):
+    """Slug of the training whose detail page is ``path``, or None"""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if match.url_name != 'training_detail':
+        return None
+    return match.kwargs.get('slug')
+
+
+def training_view_counts(start_date, end_date):
+    """
+    {training_id: page views} for [start_date, end_date]: one GROUP BY url
+    query, then paths are mapped to trainings through a slug index.
+    """
+    start, end = _day_bounds(start_date, end_date)
+    slug_index = dict(Training.objects.values_list('slug', 'id'))
+    prefix = reverse('Prolean:training_catalog')
+
+    counts = defaultdict(int)
+    per_url = (
+        PageView.objects
+        .filter(timestamp__gte=start, timestamp__lt=end, url__startswith=prefix)
+        .values('url')
+        .order_by()
+        .annotate(views=Count('id'))
+    )
+    for row in per_url:
+        training_id = slug_index.get(training_slug_from_path(row['url']))
+        if training_id:
+            counts[training_id] += row['views']
+    return counts
+
+
+def _day_bounds(start_date, end_date):
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    return start, end
+
+
+def _grouped(model, time_field, granularity, start, end, *fields):
+    return (
+        model.objects
+        .filter(**{f'{time_field}__gte': start, f'{time_field}__lt': end})
+        .annotate(bucket=TRUNCATE[granularity](time_field))
+        .values('bucket', *fields)
+        .order_by()
+    )
+
+
+def _compute(granularity, start, end):
+    """Return {(bucket, dimension, key): {metric: value}} for [start, end)"""
+    rows = defaultdict(dict)
+
+    for row in _grouped(PageView, 'timestamp', granularity, start, end).annotate(
+        pageviews=Count('id'), visitors=Count('session_id', distinct=True)
+    ):
+        rows[(row['bucket'], 'total', '')].update(pageviews=row['pageviews'], visitors=row['visitors'])
+
+    for row in _grouped(PageView, 'timestamp', granularity, start, end, 'city').exclude(city='').annotate(
+        pageviews=Count('id'), visitors=Count('session_id', distinct=True)
+    ):
+        rows[(row['bucket'], 'city', row['city'][:200])].update(
+            pageviews=row['pageviews'], visitors=row['visitors']
+        )
+
+    # One row per distinct URL; several URLs may resolve to the same training
+    per_training = defaultdict(int)
+    for row in _grouped(PageView, 'timestamp', granularity, start, end, 'url').annotate(
+        pageviews=Count('id')
+    ):
+        slug = training_slug_from_path(row['url'])
+        if slug:
+            per_training[(row['bucket'], slug)] += row['pageviews']
+    for (bucket, slug), pageviews in per_training.items():
+        rows[(bucket, 'training', slug)]['pageviews'] = pageviews
+
+    for row in _grouped(VisitorSession, 'start_time', granularity, start, end).annotate(
+        sessions=Count('id'), session_duration_total=Sum('session_duration')
+    ):
+        rows[(row['bucket'], 'total', '')].update(
+            sessions=row['sessions'], session_duration_total=row['session_duration_total'] or 0
+        )
+
+    for model, metric in (
+        (FormSubmission, 'form_submissions'),
+        (PhoneCall, 'phone_calls'),
+        (WhatsAppClick, 'whatsapp_clicks'),
+    ):
+        for row in _grouped(model, 'timestamp', granularity, start, end).annotate(total=Count('id')):
+            rows[(row['bucket'], 'total', '')][metric] = row['total']
+
+    return rows
+
+
+def rebuild(start_date, end_date):
+    """Recompute hourly/daily rollups and DailyStat for every day in [start_date, end_date]"""
+    start, end = _day_bounds(start_date, end_date)
+    written = 0
+
+    for granularity in TRUNCATE:
+        rows = _compute(granularity, start, end)
+        with transaction.atomic():
+            AnalyticsRollup.objects.filter(
+                granularity=granularity, period_start__gte=start, period_start__lt=end
+            ).delete()
+            AnalyticsRollup.objects.bulk_create([
+                AnalyticsRollup(
+                    granularity=granularity,
+                    period_start=bucket,
+                    dimension=dimension,
+                    key=key,
+                    **metrics
+                )
+                for (bucket, dimension, key), metrics in rows.items()
+            ], batch_size=1000)
+        written += len(rows)
+
+    write_daily_stats(start_date, end_date)
+    return written
+
+
+def write_daily_stats(start_date, end_date):
+    """Derive DailyStat rows from the daily rollups"""
+    start, end = _day_bounds(start_date, end_date)
+    rollups = AnalyticsRollup.objects.filter(
+        granularity='day', period_start__gte=start, period_start__lt=end
+    )
+
+    totals = {}
+    top = {}
+    for rollup in rollups:
+        day = timezone.localtime(rollup.period_start).date()
+        if rollup.dimension == 'total':
+            totals[day] = rollup
+        else:
+            best = top.get((day, rollup.dimension))
+            if best is None or rollup.pageviews > best.pageviews:
+                top[(day, rollup.dimension)] = rollup
+
+    titles = dict(Training.objects.filter(
+        slug__in=[rollup.key for (_, dimension), rollup in top.items() if dimension == 'training']
+    ).values_list('slug', 'title'))
+
+    day = start_date
+    while day <= end_date:
+        total = totals.get(day) or AnalyticsRollup()
+        top_city = top.get((day, 'city'))
+        top_training = top.get((day, 'training'))
+        DailyStat.objects.update_or_create(
+            date=day,
+            defaults={
+                'total_visitors': total.sessions,
+                'total_pageviews': total.pageviews,
+                'total_form_submissions': total.form_submissions,
+                'total_phone_calls': total.phone_calls,
+                'total_whatsapp_clicks': total.whatsapp_clicks,
+                'avg_session_duration': total.session_duration_total // total.sessions if total.sessions else 0,
+                'top_city': top_city.key[:100] if top_city else '',
+                'top_training': titles.get(top_training.key, top_training.key)[:200] if top_training else '',
+            }
+        )
+        day += timedelta(days=1)
+
+
+def _contiguous_ranges(days):
+    ranges = []
+    for day in sorted(days):
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return ranges
+
+
+def update_rollups():
+    """Fold events added since the last run into the rollups; returns the days recomputed"""
+    watermarks = {w.source: w.last_id for w in RollupWatermark.objects.all()}
+    touched_days = set()
+    new_watermarks = {}
+
+    for source, (model, time_field) in SOURCES.items():
+        last_id = watermarks.get(source, 0)
+        # Rows inserted after this point are picked up by the next run
+        max_id = model.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        if max_id <= last_id:
+            continue
+        touched_days.update(
+            model.objects.filter(id__gt=last_id, id__lte=max_id)
+            .annotate(day=TruncDate(time_field))
+            .order_by()
+            .values_list('day', flat=True)
+            .distinct()
+        )
+        new_watermarks[source] = max_id
+
+    for start_date, end_date in _contiguous_ranges(touched_days):
+        rebuild(start_date, end_date)
+
+    for source, last_id in new_watermarks.items():
+        RollupWatermark.objects.update_or_create(source=source, defaults={'last_id': last_id})
+
+    if touched_days:
+        logger.info(f"Rollups updated for {len(touched_days)} day(s)")
+    return sorted(touched_days)
@@ -0,0 +1,101 @@
+# scheduler.py - periodic jobs of the worker process
+"""
+The deploy has no Celery broker, so the periodic work described by
+tasks.py runs in one long-lived process instead (Procfile ``worker:``)::
+
+    python manage.py run_scheduler
+
+Every job runs each ``SCHEDULER_INTERVALS[name]`` seconds (or its default
+interval), first right after start unless it is registered with
+``at_start=False``. A failing job is logged and retried at its next run.
+Run a single scheduler per deploy: jobs take no lock of their own.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+JOBS = {}  # name -> Job
+
+
+class Job:
+    def __init__(self, name, func, interval, at_start):
+        self.name = name
+        self.func = func
+        self.default_interval = interval
+        self.at_start = at_start
+
+    @property
+    def interval(self):
+        return getattr(settings, 'SCHEDULER_INTERVALS', {}).get(self.name, self.default_interval)
+
+
+def job(name, interval, at_start=True):
+    """Register ``func`` as a periodic job running every ``interval`` seconds"""
+    def register(func):
+        JOBS[name] = Job(name, func, interval, at_start)
+        return func
+    return register
+
+
+def run_job(name):
+    """Run one job now; returns (ok, result or error message)"""
+    started = time.perf_counter()
+    try:
+        result = JOBS[name].func()
+        ok = True
+    except Exception as exc:
+        result, ok = str(exc), False
+        logger.error(f"Scheduled job {name} failed: {exc}")
+    finally:
+        # Long-lived process: recycle the DB connection like a request would
+        close_old_connections()
+    logger.info(f"Scheduled job {name} {'done' if ok else 'failed'} in {time.perf_counter() - started:.2f}s: {result}")
+    return ok, result
+
+
+def run_forever(names=None):
+    """Run the jobs (all by default) on their intervals until interrupted"""
+    now = time.monotonic()
+    due = {
+        name: now if JOBS[name].at_start else now + JOBS[name].interval
+        for name in (names or JOBS)
+    }
+    while True:
+        name = min(due, key=due.get)
+        time.sleep(max(0.0, due[name] - time.monotonic()))
+        run_job(name)
+        due[name] = time.monotonic() + JOBS[name].interval
+
+
+# ========== JOBS ==========
+
+@job('sync_management_api', interval=300)
+def sync_management_api():
+    from . import sync
+
+    return sync.describe(sync.sync_all())
+
+
+@job('sync_management_api_full', interval=24 * 3600, at_start=False)
+def sync_management_api_full():
+    from . import sync
+
+    return sync.describe(sync.sync_all(full=True))
+
+
+@job('update_analytics_rollups', interval=300)
+def update_analytics_rollups():
+    from . import rollups
+
+    return f"{len(rollups.update_rollups())} day(s) recomputed"
+
+
+@job('deliver_outbox', interval=30)
+def deliver_outbox():
+    from . import outbox
+
+    return outbox.dispatch_all() or 'nothing due'
@@ -0,0 +1,382 @@
+# search.py - full-text search over the training catalog
+"""
+In-memory inverted index over active trainings (titles, descriptions,
+objectives and programmes in FR/AR/EN), ranked with BM25.
+
+Text is folded before indexing and querying (lower case, accents and Arabic
+diacritics removed), so "securite" matches "Sécurité". Query terms that are
+not in the vocabulary are matched against terms one or two edits away
+(typo tolerance) and the last query term also matches as a prefix.
+
+The index is updated incrementally: the saving process re-indexes the
+training from the post_save signal, other processes hear the catalog
+channel of the invalidation bus (see catalog.py and bus.py) and re-index only the trainings whose
+``updated_at`` moved. ``PostgresSearchBackend`` is an alternative for
+PostgreSQL deployments (SEARCH_BACKEND setting) that stores a GIN-indexed
+tsvector per training instead of keeping an index in every process.
+"""
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from . import bus, catalog
+
+logger = logging.getLogger(__name__)
+
+# (field, weight): a term in a title counts as much as three in a programme
+FIELD_WEIGHTS = [
+    ('title', 3.0), ('title_ar', 3.0), ('title_en', 3.0),
+    ('short_description', 2.0), ('short_description_ar', 2.0), ('short_description_en', 2.0),
+    ('objectives', 1.0), ('objectives_ar', 1.0), ('objectives_en', 1.0),
+    ('detailed_description', 1.0), ('detailed_description_ar', 1.0), ('detailed_description_en', 1.0),
+    ('programme_theorique', 1.0), ('programme_theorique_ar', 1.0), ('programme_theorique_en', 1.0),
+    ('programme_pratique', 1.0), ('programme_pratique_ar', 1.0), ('programme_pratique_en', 1.0),
+    ('programme_structure', 1.0),
+]
+INDEXED_FIELDS = ['id', 'updated_at'] + [field for field, _ in FIELD_WEIGHTS]
+
+STOPWORDS = frozenset("""
+    a au aux avec ce ces dans de des du elle en et il la le les leur lui ma
+    mais me meme mes mon ne nos notre nous on ou par pas pour qu que qui sa
+    se ses son sur ta te tes ton tu un une vos votre vous y
+    an and are as at be by for from in is it of on or the to with
+""".split())
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FUZZY_WEIGHT = 0.6
+PREFIX_WEIGHT = 0.8
+POSTGRES_WEIGHTS = {3.0: 'A', 2.0: 'B', 1.0: 'C'}
+
+
+def fold(text):
+    """Lower-case and strip accents / diacritics (é -> e, Arabic harakat removed)"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return [
+        token for token in TOKEN_RE.findall(fold(text))
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+def _flatten(value):
+    """All strings inside a JSON value"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class MemoryIndex:
+    """Inverted index with BM25 scoring; documents are {field: text} dicts"""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = defaultdict(dict)     # term -> {doc_id: weighted tf}
+        self.doc_terms = {}                   # doc_id -> set of terms
+        self.doc_length = {}                  # doc_id -> weighted length
+        self.total_length = 0.0
+        self._deletes = defaultdict(set)      # term with one char deleted -> terms
+        self._vocabulary = None               # sorted terms, rebuilt lazily
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, doc_id, fields):
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS:
+            value = fields.get(field)
+            if not value:
+                continue
+            text = ' '.join(_flatten(value)) if not isinstance(value, str) else value
+            for token in tokenize(text):
+                frequencies[token] += weight
+
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in frequencies.items():
+                if term not in self.postings:
+                    self._vocabulary = None
+                    for variant in _deletes(term):
+                        self._deletes[variant].add(term)
+                self.postings[term][doc_id] = frequency
+            self.doc_terms[doc_id] = set(frequencies)
+            self.doc_length[doc_id] = sum(frequencies.values())
+            self.total_length += self.doc_length[doc_id]
+
+    def remove(self, doc_id):
+        with self._lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self.total_length -= self.doc_length.pop(doc_id, 0.0)
+            for term in terms:
+                postings = self.postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    # Stale entries in _deletes are skipped at query time
+                    del self.postings[term]
+                    self._vocabulary = None
+
+    def _fuzzy(self, term):
+        """Vocabulary terms within one edit (two for long terms) of ``term``"""
+        if len(term) < 4:
+            return set()
+        candidates = set(self._deletes.get(term, ()))   # insertion
+        variants = _deletes(term)
+        for variant in variants:
+            candidates.add(variant)                         # deletion
+            candidates.update(self._deletes.get(variant, ()))  # substitution / transposition
+        if len(term) >= 8:
+            for variant in variants:
+                for second in _deletes(variant):
+                    candidates.update(self._deletes.get(second, ()))
+        return {candidate for candidate in candidates if candidate in self.postings and candidate != term}
+
+    def _prefixed(self, term, limit=20):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        matches = []
+        i = bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term) and len(matches) < limit:
+            if vocabulary[i] != term:
+                matches.append(vocabulary[i])
+            i += 1
+        return matches
+
+    def _expand(self, term, is_last):
+        expansions = []
+        if term in self.postings:
+            expansions.append((term, 1.0))
+        else:
+            expansions.extend((candidate, FUZZY_WEIGHT) for candidate in self._fuzzy(term))
+        if is_last and len(term) >= 3:
+            expansions.extend((candidate, PREFIX_WEIGHT) for candidate in self._prefixed(term))
+        return expansions
+
+    def search(self, query, limit=None):
+        """[(doc_id, score)] best first; documents matching every term rank first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self.doc_terms)
+            if not n_docs:
+                return []
+            avg_length = self.total_length / n_docs or 1.0
+
+            scores = defaultdict(float)
+            matched_terms = defaultdict(int)
+            for position, term in enumerate(terms):
+                term_docs = set()
+                for candidate, weight in self._expand(term, position == len(terms) - 1):
+                    postings = self.postings[candidate]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, frequency in postings.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_length[doc_id] / avg_length)
+                        scores[doc_id] += weight * idf * frequency * (self.k1 + 1) / (frequency + norm)
+                        term_docs.add(doc_id)
+                for doc_id in term_docs:
+                    matched_terms[doc_id] += 1
+
+        results = sorted(scores.items(), key=lambda item: (-matched_terms[item[0]], -item[1]))
+        complete = [item for item in results if matched_terms[item[0]] == len(terms)]
+        results = complete or results
+        return results[:limit] if limit else results
+
+
+def _document(training):
+    return {field: getattr(training, field, None) for field, _ in FIELD_WEIGHTS}
+
+
+class MemorySearchBackend:
+    """Process-local index of active trainings, kept in sync incrementally"""
+
+    def __init__(self):
+        self.index = MemoryIndex()
+        self._lock = threading.Lock()
+        self._synced_version = None
+        self._synced_until = None
+        self._checked_at = None
+        bus.subscribe(catalog.CHANNEL, self.expire)
+
+    def expire(self):
+        """Sync with the database at the next search"""
+        self._checked_at = None
+
+    def _sync(self):
+        from .models import Training
+
+        now = time.monotonic()
+        interval = getattr(settings, 'CATALOG_CHECK_INTERVAL', 5)
+        if self._checked_at is not None and now - self._checked_at < interval:
+            return
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < interval:
+                return
+            self._checked_at = now
+            version = bus.version(catalog.CHANNEL)
+            if version == self._synced_version:
+                return
+            try:
+                active_ids = set(Training.objects.filter(is_active=True).values_list('id', flat=True))
+                changed = Training.objects.filter(is_active=True).only(*INDEXED_FIELDS)
+                if self._synced_until is not None:
+                    # Same-timestamp rows are re-indexed, which is harmless
+                    changed = changed.filter(updated_at__gte=self._synced_until)
+                for training in changed:
+                    self.index.add(training.id, _document(training))
+                    if self._synced_until is None or training.updated_at > self._synced_until:
+                        self._synced_until = training.updated_at
+                for doc_id in set(self.index.doc_terms) - active_ids:
+                    self.index.remove(doc_id)
+                self._synced_version = version
+            except Exception as exc:
+                logger.warning(f"Search index sync failed, serving previous index: {exc}")
+
+    def index_training(self, training):
+        if training.is_active:
+            self.index.add(training.id, _document(training))
+        else:
+            self.index.remove(training.id)
+
+    def remove_training(self, training_id):
+        self.index.remove(training_id)
+
+    def reindex(self, trainings=None):
+        """Bulk writes: sync with the database at the next search"""
+        self.expire()
+
+    def search(self, query, limit=None):
+        self._sync()
+        return self.index.search(query, limit)
+
+
+class PostgresSearchBackend:
+    """
+    PostgreSQL full-text search over ``TrainingSearchDocument``: one stored,
+    GIN-indexed tsvector per training (migration 0009), weighted like
+    FIELD_WEIGHTS. Text is folded in Python on both sides, so plain
+    SEARCH_POSTGRES_CONFIG ('french') stems "securite" and "Sécurité" alike
+    without the unaccent extension.
+
+    The saving process re-indexes a training from post_save; bulk writes
+    (the API sync) call ``reindex`` once they are done.
+    """
+
+    def _config(self):
+        return getattr(settings, 'SEARCH_POSTGRES_CONFIG', 'french')
+
+    def search(self, query, limit=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from django.db.models import F
+        from .models import TrainingSearchDocument
+
+        search_query = SearchQuery(fold(query), search_type='websearch', config=self._config())
+        queryset = (
+            TrainingSearchDocument.objects.filter(training__is_active=True, vector=search_query)
+            .annotate(rank=SearchRank(F('vector'), search_query))
+            .order_by('-rank')
+            .values_list('training_id', 'rank')
+        )
+        if limit:
+            queryset = queryset[:limit]
+        return list(queryset)
+
+    def index_training(self, training):
+        self.reindex([training])
+
+    def remove_training(self, training_id):
+        # The document is deleted with its training (CASCADE)
+        pass
+
+    def reindex(self, trainings=None):
+        """Store the vectors of ``trainings`` (every active training if None); returns how many"""
+        from .models import Training, TrainingSearchDocument
+
+        if trainings is None:
+            trainings = Training.objects.filter(is_active=True).only(*INDEXED_FIELDS).iterator(chunk_size=200)
+        config = self._config()
+        documents = [
+            TrainingSearchDocument(training_id=training.id, vector=document_vector(training, config))
+            for training in trainings
+        ]
+        TrainingSearchDocument.objects.bulk_create(
+            documents,
+            batch_size=100,
+            update_conflicts=True,
+            unique_fields=['training'],
+            update_fields=['vector', 'updated_at'],
+        )
+        return len(documents)
+
+
+def document_vector(training, config):
+    """SearchVector of a training's folded text, weighted A/B/C after FIELD_WEIGHTS"""
+    from django.contrib.postgres.search import SearchVector
+    from django.db.models import Value
+
+    vector = None
+    for field, weight in FIELD_WEIGHTS:
+        text = ' '.join(_flatten(getattr(training, field, None)))
+        if not text:
+            continue
+        part = SearchVector(Value(fold(text)), weight=POSTGRES_WEIGHTS[weight], config=config)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'SEARCH_BACKEND', 'Prolean.search.MemorySearchBackend')
+        _backend = import_string(backend_path)()
+    return _backend
+
+
+def search(query, limit=None):
+    return get_backend().search(query, limit)
+
+
+def rank(objects, query):
+    """Objects (catalog entries, trainings) matching ``query``, best first"""
+    scores = dict(search(query))
+    matching = [obj for obj in objects if obj.id in scores]
+    matching.sort(key=lambda obj: -scores[obj.id])
+    return matching
+
+
+def rank_objects(objects, query):
+    """Rank objects that are not in the index (API fallback) with a throwaway index"""
+    objects = list(objects)
+    index = MemoryIndex()
+    for position, obj in enumerate(objects):
+        index.add(position, _document(obj))
+    return [objects[position] for position, _ in index.search(query)]
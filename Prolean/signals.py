@@ -1,7 +1,17 @@
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile, StudentProfile
+from .models import (
+    Profile, StudentProfile, ThreatIP, CurrencyRate, Training, TrainingReview, TrainingRatingSummary,
+    City, CompanyBankAccount, Promotion,
+)
+from . import blocklist, catalog, cities, currency, invalidation, ratings, search
+
+# Generation counters of the models cached artifacts are built from
+# (invalidation.py), kept in every process whatever it imports
+invalidation.watch(
+    Training, TrainingReview, TrainingRatingSummary, City, CurrencyRate, CompanyBankAccount, Promotion,
+)
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -24,3 +34,67 @@ def update_student_total_amount(sender, instance, action, **kwargs):
     """
     if action in ["post_add", "post_remove", "post_clear"]:
         instance.calculate_total_amount_due()
+
+@receiver(post_save, sender=ThreatIP)
+@receiver(post_delete, sender=ThreatIP)
+def refresh_blocklist(sender, instance, **kwargs):
+    """
+    Bump the blocklist version so every worker reloads blocked IPs.
+    """
+    blocklist.bump_version()
+
+@receiver(post_save, sender=CurrencyRate)
+@receiver(post_delete, sender=CurrencyRate)
+def refresh_currency_rates(sender, instance, **kwargs):
+    """
+    Bump the rate table version so every process reloads exchange rates.
+    """
+    currency.bump_version()
+
+@receiver(post_save, sender=City)
+@receiver(post_delete, sender=City)
+def refresh_city_choices(sender, instance, **kwargs):
+    """
+    Bump the city choices version so every process refreshes its list.
+    """
+    cities.bump_version()
+
+@receiver(post_save, sender=Training)
+@receiver(post_delete, sender=Training)
+def refresh_catalog(sender, instance, update_fields=None, **kwargs):
+    """
+    Bump the catalog version so every process rebuilds its snapshot.
+    View counter updates do not change the catalog and are ignored.
+    """
+    if update_fields and set(update_fields) <= {'view_count'}:
+        return
+    catalog.bump_version()
+
+@receiver(post_save, sender=Training)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """
+    Re-index the saved training in this process (others sync on the catalog version).
+    """
+    if update_fields and set(update_fields) <= {'view_count'}:
+        return
+    search.get_backend().index_training(instance)
+
+@receiver(post_delete, sender=Training)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.get_backend().remove_training(instance.pk)
+
+@receiver(pre_save, sender=TrainingReview)
+def remember_review_rating(sender, instance, update_fields=None, **kwargs):
+    ratings.remember(instance, update_fields)
+
+@receiver(post_save, sender=TrainingReview)
+def update_rating_summary(sender, instance, **kwargs):
+    """
+    Move the review's contribution in its training's rating summary
+    (approval, unapproval, new rating or training).
+    """
+    ratings.review_saved(instance)
+
+@receiver(post_delete, sender=TrainingReview)
+def remove_from_rating_summary(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
@@ -0,0 +1,335 @@
+# sync.py - delta sync of formations and cities from the Site Management API
+"""
+Pulls formations and cities from the Site Management API into ``Training``
+and ``City`` so request handling never has to call the API.
+
+Each resource keeps a ``SyncCursor``: the newest ``updated_at`` seen (sent
+as ``updated_since``) and the last ETag (sent as ``If-None-Match``). A run
+fetches only what changed, diffs it against the local rows and writes the
+differences with one bulk_create and one bulk_update. ``full=True`` ignores
+the cursor, re-reads everything and deactivates rows that disappeared
+upstream.
+
+Lag metrics are kept on the cursor: time since the last successful run and,
+for the last run, the largest delay between an item changing upstream and
+being applied locally.
+"""
+import logging
+import time
+from datetime import timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils.text import slugify
+
+from . import catalog, cities, invalidation, search
+from .api_client import public_api
+from .models import BADGE_CHOICES, City, Training
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 600
+BADGES = {value for value, _ in BADGE_CHOICES}
+
+_synced = set()  # resources this process has seen synced successfully
+
+CATEGORY_KEYWORDS = {
+    'category_caces': ('caces',),
+    'category_electricite': ('electri', 'électri'),
+    'category_soudage': ('soudage',),
+    'category_securite': ('securite', 'sécurit'),
+    'category_management': ('management',),
+}
+
+
+def guess_categories(title):
+    """Category flags from a title, for payloads that carry none"""
+    lower_title = (title or '').lower()
+    flags = {
+        field: any(keyword in lower_title for keyword in keywords)
+        for field, keywords in CATEGORY_KEYWORDS.items()
+    }
+    flags['category_autre'] = not any(flags.values())
+    return flags
+
+
+def _parse_updated(item):
+    value = item.get('updated_at')
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed.astimezone(dt_timezone.utc) if parsed is not None else None
+
+
+def _decimal(value, default='0'):
+    try:
+        return Decimal(str(value if value is not None else default)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return Decimal(default)
+
+
+def training_fields(item):
+    """Training field values for one formation payload"""
+    title = (item.get('title') or '').strip()
+    description = item.get('detailed_description') or item.get('description') or ''
+    if item.get('duration_days'):
+        duration_days = int(item['duration_days'])
+    else:
+        duration_days = max(1, int((item.get('duration_hours') or 8) / 8))
+
+    fields = {
+        'title': title[:200],
+        'slug': (item.get('slug') or slugify(title))[:200],
+        'short_description': (item.get('short_description') or description[:300])[:300],
+        'detailed_description': description,
+        'price_mad': _decimal(item.get('price_mad')),
+        'duration_days': duration_days,
+        'max_students': int(item.get('max_students') or 20),
+        'success_rate': int(item.get('success_rate') or 95),
+        'badge': item.get('badge') if item.get('badge') in BADGES else 'none',
+        'is_featured': bool(item.get('is_featured')),
+        'is_active': bool(item.get('is_active', True)),
+        'thumbnail': item.get('thumbnail') or item.get('image') or item.get('image_url') or None,
+        'next_session': parse_date(item['next_session']) if isinstance(item.get('next_session'), str) else None,
+    }
+    if any(key in item for key in CATEGORY_KEYWORDS):
+        fields.update({key: bool(item.get(key)) for key in list(CATEGORY_KEYWORDS) + ['category_autre']})
+    else:
+        fields.update(guess_categories(title))
+    return fields
+
+
+def city_fields(item):
+    fields = {'name': (item.get('name') or '').strip()[:100], 'is_active': bool(item.get('is_active', True))}
+    for key in ('region', 'phone', 'address'):
+        if item.get(key):
+            fields[key] = item[key]
+    return fields
+
+
+class Resource:
+    """How one API resource maps onto a local model"""
+
+    def __init__(self, name, endpoint, path, model, to_fields, natural_key, on_change):
+        self.name = name
+        self.endpoint = endpoint
+        self.path = path
+        self.model = model
+        self.to_fields = to_fields
+        self.natural_key = natural_key
+        self.on_change = on_change
+
+
+def _formations_changed():
+    catalog.bump_version()
+    invalidation.bump(Training)
+    # Bulk writes send no post_save: refresh the search index in one pass
+    search.get_backend().reindex()
+
+
+def _cities_changed():
+    cities.bump_version()
+    invalidation.bump(City)
+
+
+# Bulk writes send no signals: each resource bumps what depends on it
+RESOURCES = {
+    'formations': Resource('formations', 'formations', '/formations', Training,
+                           training_fields, 'slug', _formations_changed),
+    'cities': Resource('cities', 'cities', '/cities', City,
+                       city_fields, 'name', _cities_changed),
+}
+
+
+def _fetch(resource, cursor, full):
+    """(items, etag); items is None when the upstream answered 304"""
+    params, headers = {}, {}
+    if not full:
+        if cursor.cursor:
+            params['updated_since'] = cursor.cursor
+        if cursor.etag:
+            headers['If-None-Match'] = cursor.etag
+    response = public_api.get(resource.endpoint, resource.path, params=params, headers=headers)
+    if response.status_code == 304:
+        return None, cursor.etag
+    response.raise_for_status()
+    payload = response.json()
+    if isinstance(payload, dict):
+        payload = payload.get('results', [])
+    return [item for item in payload if isinstance(item, dict)], response.headers.get('ETag', '')
+
+
+def _apply(resource, items, full, now):
+    """Upsert ``items``; returns (created, updated, deactivated, newest remote updated_at, max lag)"""
+    model = resource.model
+    key_field = resource.natural_key
+    incoming = {}
+    newest, max_lag = None, None
+    for item in items:
+        remote_id = str(item.get('id') or '')
+        fields = resource.to_fields(item)
+        if not fields.get(key_field):
+            continue
+        updated = _parse_updated(item)
+        if updated is not None:
+            newest = updated if newest is None or updated > newest else newest
+        incoming[remote_id or fields[key_field]] = (remote_id, fields, updated)
+
+    remote_ids = [remote_id for remote_id, _, _ in incoming.values() if remote_id]
+    keys = [fields[key_field] for _, fields, _ in incoming.values()]
+    existing = list(model.objects.filter(remote_id__in=remote_ids)) + list(
+        model.objects.filter(**{f'{key_field}__in': keys}).exclude(remote_id__in=remote_ids)
+    )
+    by_remote = {obj.remote_id: obj for obj in existing if obj.remote_id}
+    by_key = {getattr(obj, key_field): obj for obj in existing}
+
+    to_create, to_update, update_fields = [], [], {'remote_id'}
+    for remote_id, fields, updated in incoming.values():
+        obj = by_remote.get(remote_id) if remote_id else None
+        if obj is None:
+            obj = by_key.get(fields[key_field])
+        if obj is None:
+            obj = model(remote_id=remote_id, **fields)
+            to_create.append(obj)
+        else:
+            changed = [name for name, value in fields.items() if getattr(obj, name) != value]
+            if not changed and (obj.remote_id == remote_id or not remote_id):
+                continue
+            for name in changed:
+                setattr(obj, name, fields[name])
+            if remote_id:
+                obj.remote_id = remote_id
+            update_fields.update(changed)
+            to_update.append(obj)
+        if updated is not None:
+            lag = (now - updated).total_seconds()
+            max_lag = lag if max_lag is None else max(max_lag, lag)
+
+    has_updated_at = any(field.name == 'updated_at' for field in model._meta.fields)
+    if has_updated_at:
+        # bulk writes skip auto_now; the search index syncs on updated_at
+        for obj in to_create + to_update:
+            obj.updated_at = now
+        update_fields.add('updated_at')
+
+    deactivated = 0
+    with transaction.atomic():
+        if to_create:
+            model.objects.bulk_create(to_create, batch_size=200)
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(update_fields), batch_size=200)
+        if full and incoming:
+            # Rows that came from the API but are no longer listed
+            stale = model.objects.exclude(remote_id='').exclude(remote_id__in=remote_ids).filter(is_active=True)
+            values = {'is_active': False, 'updated_at': now} if has_updated_at else {'is_active': False}
+            deactivated = stale.update(**values)
+
+    return len(to_create), len(to_update), deactivated, newest, max_lag
+
+
+def sync_resource(name, full=False):
+    """Pull one resource; returns a summary dict (also stored on its SyncCursor)"""
+    from .models import SyncCursor
+
+    resource = RESOURCES[name]
+    lock_key = f'sync:{name}:lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        logger.info(f"Sync of {name} already running, skipped")
+        return {'resource': name, 'skipped': True}
+
+    started = time.perf_counter()
+    cursor, _ = SyncCursor.objects.get_or_create(resource=name)
+    cursor.last_attempt_at = timezone.now()
+    summary = {'resource': name, 'full': full, 'fetched': 0, 'created': 0, 'updated': 0, 'deactivated': 0}
+    try:
+        items, etag = _fetch(resource, cursor, full)
+        now = timezone.now()
+        if items is not None:
+            created, updated, deactivated, newest, max_lag = _apply(resource, items, full, now)
+            summary.update(fetched=len(items), created=created, updated=updated, deactivated=deactivated)
+            previous = parse_datetime(cursor.cursor) if cursor.cursor else None
+            if newest is not None and (full or previous is None or newest > previous):
+                cursor.cursor = newest.isoformat()
+            cursor.etag = etag or ''
+            cursor.max_item_lag_seconds = max_lag
+            if created or updated or deactivated:
+                resource.on_change()
+        cursor.last_fetched = summary['fetched']
+        cursor.last_changed = summary['created'] + summary['updated'] + summary['deactivated']
+        cursor.last_success_at = now
+        if full:
+            cursor.last_full_sync_at = now
+        cursor.last_error = ''
+    except Exception as exc:
+        logger.warning(f"Sync of {name} failed: {exc}")
+        cursor.last_error = str(exc)[:1000]
+        summary['error'] = str(exc)
+    finally:
+        cursor.last_duration_ms = int((time.perf_counter() - started) * 1000)
+        cursor.save()
+        cache.delete(lock_key)
+
+    summary['duration_ms'] = cursor.last_duration_ms
+    return summary
+
+
+def sync_all(full=False, resources=None):
+    return [sync_resource(name, full=full) for name in (resources or RESOURCES)]
+
+
+def describe(summaries):
+    """One line for the summaries returned by ``sync_all``"""
+    results = []
+    for summary in summaries:
+        if summary.get('skipped'):
+            results.append(f"{summary['resource']}: skipped")
+        elif summary.get('error'):
+            results.append(f"{summary['resource']}: error {summary['error']}")
+        else:
+            changed = summary['created'] + summary['updated'] + summary['deactivated']
+            results.append(f"{summary['resource']}: {changed} changed")
+    return ", ".join(results)
+
+
+def has_synced(name):
+    """True once a sync of ``name`` has succeeded (remembered by this process)"""
+    from .models import SyncCursor
+
+    if name in _synced:
+        return True
+    if SyncCursor.objects.filter(resource=name, last_success_at__isnull=False).exists():
+        _synced.add(name)
+        return True
+    return False
+
+
+def status():
+    """Per-resource cursor and lag metrics"""
+    from .models import SyncCursor
+
+    now = timezone.now()
+    cursors = {cursor.resource: cursor for cursor in SyncCursor.objects.filter(resource__in=list(RESOURCES))}
+    report = {}
+    for name in RESOURCES:
+        cursor = cursors.get(name)
+        if cursor is None:
+            report[name] = {'synced': False}
+            continue
+        report[name] = {
+            'synced': cursor.last_success_at is not None,
+            'cursor': cursor.cursor,
+            'lag_seconds': (
+                round((now - cursor.last_success_at).total_seconds(), 1)
+                if cursor.last_success_at else None
+            ),
+            'max_item_lag_seconds': cursor.max_item_lag_seconds,
+            'last_fetched': cursor.last_fetched,
+            'last_changed': cursor.last_changed,
+            'last_duration_ms': cursor.last_duration_ms,
+            'last_full_sync_at': cursor.last_full_sync_at.isoformat() if cursor.last_full_sync_at else None,
+            'last_error': cursor.last_error,
+        }
+    return report
@@ -3,6 +3,7 @@ from celery import shared_task
 from django.utils import timezone
 from datetime import timedelta, date
 from decimal import Decimal
+import time
 import requests
 import urllib3
 from .models import (
@@ -11,6 +12,7 @@ from .models import (
     TrainingWaitlist, ThreatIP, RateLimitLog
 )
 from django.db import models
+from . import outbox, rollups, sync
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -73,81 +75,34 @@ def update_currency_rates():
     except Exception as e:
         return f"Error updating currency rates: {str(e)}"
 
+@shared_task
+def update_analytics_rollups():
+    """Fold new analytics events into the hourly/daily rollups"""
+    try:
+        days = rollups.update_rollups()
+        return f"Rollups updated for {len(days)} day(s)"
+    except Exception as e:
+        return f"Error updating rollups: {str(e)}"
+
+@shared_task
+def sync_management_api(full=False):
+    """Pull formations and cities changed upstream (every few minutes, full=True nightly)"""
+    return sync.describe(sync.sync_all(full=full))
+
+@shared_task
+def deliver_outbox():
+    """Deliver queued contact requests / pre-inscriptions that are due (retries, missed nudges)"""
+    counts = outbox.dispatch_all()
+    return f"Outbox: {counts or 'nothing due'}"
+
 @shared_task
 def aggregate_daily_stats():
-    """Aggregate daily statistics"""
+    """Aggregate daily statistics (read from the precomputed rollups)"""
     yesterday = timezone.now().date() - timedelta(days=1)
     
     try:
-        # Get unique visitors
-        unique_visitors = VisitorSession.objects.filter(
-            start_time__date=yesterday
-        ).values('session_id').distinct().count()
-        
-        # Get total pageviews
-        total_pageviews = PageView.objects.filter(
-            timestamp__date=yesterday
-        ).count()
-        
-        # Get form submissions
-        form_submissions = FormSubmission.objects.filter(
-            timestamp__date=yesterday
-        ).count()
-        
-        # Get phone calls
-        phone_calls = PhoneCall.objects.filter(
-            timestamp__date=yesterday
-        ).count()
-        
-        # Get WhatsApp clicks
-        whatsapp_clicks = WhatsAppClick.objects.filter(
-            timestamp__date=yesterday
-        ).count()
-        
-        # Calculate average session duration
-        sessions = VisitorSession.objects.filter(start_time__date=yesterday)
-        avg_duration = 0
-        if sessions.exists():
-            total_duration = sum(s.session_duration for s in sessions)
-            avg_duration = total_duration // sessions.count()
-        
-        # Find top city
-        top_city = ''
-        city_counts = PageView.objects.filter(
-            timestamp__date=yesterday
-        ).exclude(city='').values('city').annotate(
-            count=models.Count('id')
-        ).order_by('-count').first()
-        
-        if city_counts:
-            top_city = city_counts['city']
-        
-        # Find top training
-        top_training = ''
-        training_counts = PageView.objects.filter(
-            timestamp__date=yesterday,
-            page_title__icontains='Formation'
-        ).values('page_title').annotate(
-            count=models.Count('id')
-        ).order_by('-count').first()
-        
-        if training_counts:
-            top_training = training_counts['page_title'][:200]
-        
-        # Create or update daily stat
-        DailyStat.objects.update_or_create(
-            date=yesterday,
-            defaults={
-                'total_visitors': unique_visitors,
-                'total_pageviews': total_pageviews,
-                'total_form_submissions': form_submissions,
-                'total_phone_calls': phone_calls,
-                'total_whatsapp_clicks': whatsapp_clicks,
-                'avg_session_duration': avg_duration,
-                'top_city': top_city,
-                'top_training': top_training,
-            }
-        )
+        rollups.update_rollups()
+        rollups.write_daily_stats(yesterday, yesterday)
         
         return f"Daily stats aggregated for {yesterday}"
         
@@ -178,16 +133,18 @@ def cleanup_old_sessions():
 @shared_task
 def check_rate_limit_violations():
     """Check for rate limit violations and mark threats"""
-    from django.db.models import Count
+    from django.db.models import Sum
     
     try:
-        # Find IPs with more than 5 requests per minute
+        # Find IPs with more than 5 rejected requests per minute.
+        # RateLimitLog rows are written in batches by Prolean.ratelimit, one row
+        # per (ip, endpoint) and flush, with the number of hits in request_count.
         one_minute_ago = timezone.now() - timedelta(minutes=1)
         
         violations = RateLimitLog.objects.filter(
             last_request__gte=one_minute_ago
         ).values('ip_address').annotate(
-            total_requests=Count('id')
+            total_requests=Sum('request_count')
         ).filter(total_requests__gt=5)
         
         threat_count = 0
@@ -222,22 +179,29 @@ def update_training_analytics():
     try:
         # Get yesterday's date
         yesterday = timezone.now().date() - timedelta(days=1)
+        started = time.perf_counter()
+        
+        view_counts = rollups.training_view_counts(yesterday, yesterday)
+        counted = time.perf_counter()
+        
+        # One UPDATE ... CASE per chunk of trainings
+        training_ids = list(view_counts)
+        for i in range(0, len(training_ids), 500):
+            chunk = training_ids[i:i + 500]
+            Training.objects.filter(id__in=chunk).update(
+                view_count=models.F('view_count') + models.Case(
+                    *[models.When(id=training_id, then=models.Value(view_counts[training_id])) for training_id in chunk],
+                    default=models.Value(0),
+                    output_field=models.PositiveIntegerField(),
+                )
+            )
+        finished = time.perf_counter()
         
-        # Get all trainings
-        trainings = Training.objects.all()
-        
-        for training in trainings:
-            # Count page views for this training
-            view_count = PageView.objects.filter(
-                timestamp__date=yesterday,
-                url__contains=f"/formations/{training.slug}/"
-            ).count()
-            
-            if view_count > 0:
-                training.view_count = models.F('view_count') + view_count
-                training.save(update_fields=['view_count'])
-        
-        return "Training analytics updated"
+        return (
+            f"Training analytics updated: {sum(view_counts.values())} views on "
+            f"{len(view_counts)} trainings (count {counted - started:.3f}s, "
+            f"update {finished - counted:.3f}s)"
+        )
         
     except Exception as e:
         return f"Error updating training analytics: {str(e)}"
@@ -1,6 +1,7 @@
 # templatetags/price_filters.py
 from django import template
 from decimal import Decimal
+from Prolean import currency
 
 register = template.Library()
 
@@ -9,16 +10,7 @@ def price_eur(price_mad):
     """Convert MAD to EUR for templates"""
     try:
         if isinstance(price_mad, (Decimal, float, int)):
-            # Use default rate or get from database
-            from Prolean.models import CurrencyRate
-            try:
-                currency_rate = CurrencyRate.objects.first()
-                eur_rate = currency_rate.eur_rate if currency_rate else Decimal('0.093')
-            except:
-                eur_rate = Decimal('0.093')
-            
-            converted = float(price_mad) * float(eur_rate)
-            return round(converted, 2)
+            return float(currency.convert(price_mad, 'EUR'))
     except:
         pass
     return 0
@@ -28,16 +20,7 @@ def price_usd(price_mad):
     """Convert MAD to USD for templates"""
     try:
         if isinstance(price_mad, (Decimal, float, int)):
-            # Use default rate or get from database
-            from Prolean.models import CurrencyRate
-            try:
-                currency_rate = CurrencyRate.objects.first()
-                usd_rate = currency_rate.usd_rate if currency_rate else Decimal('0.100')
-            except:
-                usd_rate = Decimal('0.100')
-            
-            converted = float(price_mad) * float(usd_rate)
-            return round(converted, 2)
+            return float(currency.convert(price_mad, 'USD'))
     except:
         pass
     return 0
@@ -52,26 +35,13 @@ def convert_price(value, request):
         if value is None:
             return 0
             
-        from Prolean.models import CurrencyRate
-        preferred_currency = request.session.get('preferred_currency', 'MAD')
+        from Prolean.middleware import get_request_cache
+        preferred_currency = get_request_cache(request).preferred_currency
         
         if preferred_currency == 'MAD':
             return float(value)
-            
-        rate_obj = CurrencyRate.objects.filter(currency_code=preferred_currency).first()
-        if rate_obj:
-            rate = float(rate_obj.rate_to_mad)
-            return float(value) * rate
         
-        # Fallback to hardcoded rates if not in DB
-        fallbacks = {
-            'EUR': 0.093,
-            'USD': 0.100,
-            'GBP': 0.079,
-            'CAD': 0.136,
-            'AED': 0.367
-        }
-        return float(value) * fallbacks.get(preferred_currency, 1.0)
+        return float(currency.convert(value, preferred_currency))
     except:
         return value
 
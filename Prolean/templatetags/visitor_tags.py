@@ -0,0 +1,20 @@
+# templatetags/visitor_tags.py
+from django import template
+from django.utils.safestring import mark_safe
+from Prolean import page_cache
+
+register = template.Library()
+
+@register.simple_tag(takes_context=True)
+def visitor(context, name):
+    """
+    A per-visitor value (see page_cache.VISITOR_VALUES), kept out of cached pages.
+    Usage: {% visitor 'location_city' %}
+    """
+    request = context.get('request')
+    if request is None:
+        return ''
+    if page_cache.is_filling(request):
+        return mark_safe(page_cache.placeholder(name))
+    resolver = page_cache.VISITOR_VALUES.get(name)
+    return mark_safe(resolver(request)) if resolver else ''
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.test import override_settings
+
+# Rendering pages in tests must not depend on collectstatic's manifest
+plain_static_files = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def make_training(slug='excel', **fields):
+    from Prolean.models import Training
+
+    defaults = {
+        'title': slug.title(),
+        'short_description': slug,
+        'detailed_description': slug,
+        'price_mad': 100,
+        'duration_days': 2,
+    }
+    return Training.objects.create(slug=slug, **{**defaults, **fields})
@@ -0,0 +1,59 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from Prolean import analytics
+from Prolean.models import ClickEvent, PageView, VisitorSession
+
+
+def page_view(session_id, ip_address='10.0.0.1', timestamp=None):
+    return ('page_view', {
+        'url': '/formations/',
+        'page_title': 'Catalogue',
+        'referrer': '',
+        'session_id': session_id,
+        'ip_address': ip_address,
+        'user_agent': 'test',
+        'city': '',
+        'country': '',
+        'device_type': 'desktop',
+        'timestamp': timestamp or timezone.now(),
+    })
+
+
+class EnqueueTests(TestCase):
+    @mock.patch.object(analytics.event_queue, 'put', return_value=True)
+    def test_missing_ip_is_replaced_and_time_captured(self, put):
+        analytics._enqueue('click', {'session_id': 'a', 'ip_address': ''})
+        analytics._enqueue('click', {'session_id': 'b', 'ip_address': ' 10.0.0.1 '})
+        first, second = [call.args[0][1] for call in put.call_args_list]
+        self.assertEqual(first['ip_address'], analytics.UNKNOWN_IP)
+        self.assertEqual(second['ip_address'], '10.0.0.1')
+        self.assertIsNotNone(first['timestamp'])
+
+
+class WriteEventsTests(TestCase):
+    def setUp(self):
+        analytics.rejected_by_kind.clear()
+
+    def test_recorded_time_is_kept(self):
+        recorded = timezone.now() - timedelta(hours=1)
+        analytics._write_events([page_view('s1', timestamp=recorded)])
+        self.assertEqual(PageView.objects.get().timestamp, recorded)
+
+    def test_one_bad_event_does_not_drop_the_batch(self):
+        events = [page_view('s1'), page_view('s2', ip_address=None), page_view('s1')]
+        events.append(('click', {
+            'element_type': 'button', 'url': '/', 'session_id': 's1',
+            'ip_address': '10.0.0.1', 'timestamp': timezone.now(),
+        }))
+        analytics._write_events(events)
+
+        self.assertEqual(PageView.objects.filter(session_id='s1').count(), 2)
+        self.assertFalse(PageView.objects.filter(session_id='s2').exists())
+        self.assertEqual(ClickEvent.objects.count(), 1)
+        self.assertEqual(VisitorSession.objects.get(session_id='s1').page_views, 2)
+        self.assertFalse(VisitorSession.objects.filter(session_id='s2').exists())
+        self.assertEqual(analytics.rejected_by_kind['page_view'], 1)
@@ -0,0 +1,62 @@
+import asyncio
+import time
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from Prolean import api_client
+from Prolean.api_client import CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker('api', failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker('api', failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+@override_settings(MANAGEMENT_API_BREAKER_FAILURES=1, MANAGEMENT_API_BREAKER_RESET=60)
+class TrialReleaseTests(SimpleTestCase):
+    def setUp(self):
+        api_client.reset()
+        self.breaker = api_client._breaker_for(api_client.public_api.base_url)
+        self.breaker.record_failure()
+        # Pretend the reset timeout elapsed: the next call is the trial
+        self.breaker.opened_at = time.monotonic() - 61
+
+    def tearDown(self):
+        api_client.reset()
+
+    def test_unexpected_error_releases_the_trial(self):
+        with mock.patch.object(requests.Session, 'request', side_effect=KeyError('boom')):
+            with self.assertRaises(KeyError):
+                api_client.public_api.get('formations', '/formations')
+        self.assertTrue(self.breaker.allow())
+
+    def test_cancelled_async_call_releases_the_trial(self):
+        async def call():
+            with mock.patch('httpx.AsyncClient.request', side_effect=asyncio.CancelledError):
+                await api_client.public_api_async.get('formations', '/formations')
+
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(call())
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_trial_reopens_the_circuit(self):
+        with mock.patch.object(requests.Session, 'request', side_effect=requests.ConnectionError):
+            with self.assertRaises(requests.ConnectionError):
+                api_client.public_api.get('formations', '/formations')
+        with self.assertRaises(CircuitOpenError):
+            api_client.public_api.get('formations', '/formations')
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from Prolean import bus
+from Prolean.models import CacheChannel
+
+CHANNEL = 'tests'
+
+
+@mock.patch.object(bus, 'close_old_connections')
+@mock.patch.object(bus, '_ensure_listening')
+class BusTests(TestCase):
+    def setUp(self):
+        self.callback = mock.Mock()
+        patcher = mock.patch.dict(bus._subscribers, {CHANNEL: [self.callback]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        versions = mock.patch.dict(bus._versions, clear=True)
+        versions.start()
+        self.addCleanup(versions.stop)
+
+    def test_publish_waits_for_commit(self, *mocks):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            bus.publish(CHANNEL)
+        self.callback.assert_not_called()
+        self.assertFalse(CacheChannel.objects.filter(name=CHANNEL).exists())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_publish_bumps_the_shared_version(self, *mocks):
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.publish(CHANNEL)
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.publish(CHANNEL)
+        self.assertEqual(CacheChannel.objects.get(name=CHANNEL).version, 2)
+        self.assertEqual(bus.version(CHANNEL), 2)
+        self.assertEqual(self.callback.call_count, 2)
+
+    def test_poll_applies_versions_published_elsewhere(self, *mocks):
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.publish(CHANNEL)
+        self.callback.reset_mock()
+        # Another process published twice
+        CacheChannel.objects.filter(name=CHANNEL).update(version=3)
+        bus._poll()
+        self.assertEqual(bus.version(CHANNEL), 3)
+        self.callback.assert_called_once()
+        # Nothing moved: the subscribers are left alone
+        bus._poll()
+        self.callback.assert_called_once()
+
+    def test_failing_subscriber_does_not_stop_the_others(self, *mocks):
+        other = mock.Mock()
+        bus._subscribers[CHANNEL] = [mock.Mock(side_effect=RuntimeError('boom')), other]
+        with self.assertLogs('Prolean.bus', 'ERROR'):
+            bus._apply({CHANNEL: 1})
+        other.assert_called_once()
+
+    def test_malformed_push_is_ignored(self, *mocks):
+        with self.assertLogs('Prolean.bus', 'WARNING'):
+            bus._receive(b'not-a-number tests')
+        bus._receive(b'4 tests')
+        self.assertEqual(bus.version(CHANNEL), 4)
+        self.callback.assert_called_once()
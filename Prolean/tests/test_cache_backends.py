@@ -0,0 +1,50 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+TIERED_CACHES = {
+    'default': {
+        'BACKEND': 'Prolean.cache_backends.TieredCache',
+        'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 2, 'LOCK_WAIT': 5},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+}
+
+
+@override_settings(CACHES=TIERED_CACHES)
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+
+    def test_counters_live_in_l2(self):
+        self.cache.add('hits', 0)
+        self.cache.incr('hits')
+        self.cache.incr('hits')
+        self.assertEqual(caches['shared'].get('hits'), 2)
+        self.assertEqual(self.cache.get('hits'), 2)
+
+    def test_get_or_set_computes_once_for_concurrent_callers(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('slow', compute, 60)))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 6)
+        self.assertEqual(len(calls), 1)
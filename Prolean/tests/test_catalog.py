@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from Prolean import catalog
+
+
+class FallbackCategoryTests(SimpleTestCase):
+    def test_api_trainings_are_counted_on_the_spot(self):
+        trainings = [
+            SimpleNamespace(category_caces=True, category_securite=True),
+            SimpleNamespace(category_caces=True),
+            SimpleNamespace(category_autre=False),
+        ]
+        categories = catalog.categories_of(trainings)
+        self.assertEqual(
+            [(category['id'], category['active_count']) for category in categories],
+            [('caces', 2), ('securite', 1)],
+        )
+        self.assertEqual(categories[0]['name'], 'CACES Engins')
+
+    def test_no_trainings_no_categories(self):
+        self.assertEqual(catalog.categories_of([]), [])
@@ -0,0 +1,32 @@
+from unittest import mock
+
+import requests
+from django.test import TestCase
+
+from Prolean import cities
+from Prolean.models import City
+
+
+class CityChoicesTests(TestCase):
+    def setUp(self):
+        self.tearDown()
+        City.objects.create(name='Casablanca', remote_id='7')
+        City.objects.create(name='Agadir')
+
+    def tearDown(self):
+        cities._choices = None
+        cities._source = None
+
+    @mock.patch.object(cities, '_remote_choices', return_value=[(7, 'Casablanca'), (9, 'Rabat')])
+    def test_api_answer_offers_api_ids_only(self, remote):
+        self.assertEqual(cities.refresh(), [(7, 'Casablanca'), (9, 'Rabat')])
+
+    @mock.patch.object(cities, '_remote_choices', side_effect=requests.ConnectionError)
+    def test_api_down_uses_remote_ids_of_local_rows(self, remote):
+        self.assertEqual(cities.refresh(), [('fallback-agadir', 'Agadir'), ('7', 'Casablanca')])
+
+    def test_api_down_after_an_answer_keeps_the_api_ids(self):
+        with mock.patch.object(cities, '_remote_choices', return_value=[(9, 'Rabat')]):
+            cities.refresh()
+        with mock.patch.object(cities, '_remote_choices', side_effect=requests.ConnectionError):
+            self.assertEqual(cities.refresh(), [(9, 'Rabat')])
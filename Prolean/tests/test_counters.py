@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase
+
+from Prolean.counters import CounterBuffer
+from Prolean.models import Training
+
+from . import make_training
+
+
+class CounterBufferTests(TestCase):
+    def setUp(self):
+        self.training = make_training()
+        self.buffer = CounterBuffer(interval=60, max_retries=2)
+        # Keep the flush synchronous: no background thread in tests
+        self.buffer._ensure_thread = lambda: None
+
+    def view_count(self):
+        return Training.objects.values_list('view_count', flat=True).get(pk=self.training.pk)
+
+    def test_flush_coalesces_increments(self):
+        for _ in range(3):
+            self.buffer.increment(Training, self.training.pk, 'view_count')
+        self.assertEqual(self.buffer.pending(Training, self.training.pk, 'view_count'), 3)
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.view_count(), 3)
+        self.assertEqual(self.buffer.stats()['updates'], 1)
+
+    def test_unavailable_database_is_retried_then_dropped(self):
+        self.buffer.increment(Training, self.training.pk, 'view_count')
+        with mock.patch.object(self.buffer, '_write', side_effect=OperationalError('gone away')):
+            self.buffer.flush()
+            self.buffer.flush()
+            self.assertEqual(self.buffer.pending(Training, self.training.pk, 'view_count'), 1)
+            with self.assertLogs('Prolean.counters', 'ERROR'):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending(Training, self.training.pk, 'view_count'), 0)
+        self.assertEqual(self.buffer.stats()['dropped_rows'], 1)
+
+    def test_recovery_resets_the_retry_count(self):
+        self.buffer.increment(Training, self.training.pk, 'view_count')
+        with mock.patch.object(self.buffer, '_write', side_effect=OperationalError('gone away')):
+            self.buffer.flush()
+            self.buffer.flush()
+        self.buffer.flush()
+        self.assertEqual(self.view_count(), 1)
+        self.buffer.increment(Training, self.training.pk, 'view_count')
+        with mock.patch.object(self.buffer, '_write', side_effect=OperationalError('gone away')):
+            self.buffer.flush()
+        self.assertEqual(self.buffer.pending(Training, self.training.pk, 'view_count'), 1)
+
+    def test_permanent_error_is_not_retried(self):
+        self.buffer.increment(Training, self.training.pk, 'no_such_field')
+        self.buffer.increment(Training, self.training.pk, 'view_count')
+        with self.assertLogs('Prolean.counters', 'ERROR'):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.buffer.stats()['pending_rows'], 0)
+        self.assertEqual(self.buffer.stats()['dropped_rows'], 1)
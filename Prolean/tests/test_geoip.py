@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+
+from Prolean import geoip
+
+
+class GeoIPTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ip_ranges.bin')
+        self.reset()
+
+    def tearDown(self):
+        self.reset()
+        self.tmp.cleanup()
+
+    def reset(self):
+        geoip._db = None
+        geoip._db_checked_at = None
+        geoip._cache.clear()
+
+    def test_lookup_reads_the_range_database(self):
+        geoip.write_database(self.path, [(16777216, 16777471, 'Brisbane', 'Australia', 'AU')])
+        with override_settings(GEOIP_DATABASE_PATH=self.path):
+            self.assertEqual(geoip.lookup('1.0.0.9')['city'], 'Brisbane')
+            self.assertEqual(geoip.lookup('8.8.8.8'), geoip.DEFAULT_LOCATION)
+
+    def test_unsorted_ranges_are_sorted_on_disk(self):
+        rows = [(start, start + 9, f'City {start}', 'Maroc', 'MA') for start in range(1000, 0, -10)]
+        record_count, location_count = geoip.write_database(self.path, iter(rows), sort_chunk=7)
+        self.assertEqual((record_count, location_count), (100, 100))
+        database = geoip.IPRangeDatabase(self.path)
+        try:
+            starts = [geoip.RECORD.unpack_from(database._mm, geoip.HEADER.size + i * geoip.RECORD.size)[0]
+                      for i in range(database.record_count)]
+            self.assertEqual(starts, sorted(starts))
+            self.assertEqual(database.lookup(505)['city'], 'City 500')
+        finally:
+            database.close()
+
+    def test_empty_input_keeps_the_current_database(self):
+        geoip.write_database(self.path, [(1, 2, 'A', 'B', 'C')])
+        with self.assertRaises(ValueError):
+            geoip.write_database(self.path, iter([]))
+        self.assertFalse(os.path.exists(f'{self.path}.tmp'))
+        database = geoip.IPRangeDatabase(self.path)
+        self.assertEqual(database.record_count, 1)
+        database.close()
+
+    def test_command_streams_the_csv(self):
+        csv_path = os.path.join(self.tmp.name, 'db3.csv')
+        with open(csv_path, 'w') as fh:
+            fh.write('"ip_from","ip_to","country_code","country_name","region","city"\n')
+            fh.write('"16777472","16777727","FR","France","Ile-de-France","Paris"\n')
+            fh.write('"16777216","16777471","MA","Morocco","Casablanca-Settat","Casablanca"\n')
+        call_command('build_geoip_db', csv_path, output=self.path, stdout=io.StringIO())
+        with override_settings(GEOIP_DATABASE_PATH=self.path):
+            self.assertEqual(geoip.lookup('1.0.0.9'), {'city': 'Casablanca', 'country': 'Maroc', 'countryCode': 'MA'})
+            self.assertEqual(geoip.lookup('1.0.1.9')['city'], 'Paris')
+
+        with open(csv_path, 'w') as fh:
+            fh.write('"ip_from","ip_to","country_code","country_name","region","city"\n')
+        with self.assertRaises(CommandError):
+            call_command('build_geoip_db', csv_path, output=self.path, stdout=io.StringIO())
+
+    def test_missing_database_is_a_system_check_warning(self):
+        with override_settings(GEOIP_DATABASE_PATH=self.path, GEOIP_REMOTE_FALLBACK=False):
+            self.assertEqual([w.id for w in geoip.check_database(None)], ['geoip.W001'])
+            geoip.write_database(self.path, [(1, 2, 'A', 'B', 'C')])
+            self.assertEqual(geoip.check_database(None), [])
+
+    @override_settings(GEOIP_REMOTE_FALLBACK=True, GEOIP_FAILURE_TTL=60)
+    def test_failed_remote_lookup_is_cached_briefly(self):
+        with override_settings(GEOIP_DATABASE_PATH=self.path), \
+                mock.patch.object(geoip, '_remote_lookup', return_value=None), \
+                mock.patch.object(geoip._cache, 'set') as cache_set:
+            self.assertEqual(geoip.lookup('8.8.8.8'), geoip.DEFAULT_LOCATION)
+        cache_set.assert_called_once_with('8.8.8.8', geoip.DEFAULT_LOCATION, 60)
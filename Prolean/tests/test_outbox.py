@@ -0,0 +1,89 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from Prolean import outbox
+from Prolean.models import OutboxMessage
+
+
+def response(status_code, body=b'{}'):
+    return mock.Mock(status_code=status_code, content=body, json=lambda: json.loads(body))
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.message = OutboxMessage.objects.create(kind='contact_request', payload={'name': 'A'})
+
+    def post(self, *args, **kwargs):
+        return mock.patch.object(outbox.management_api, 'post', *args, **kwargs)
+
+    def make_due(self):
+        OutboxMessage.objects.filter(pk=self.message.pk).update(next_attempt_at=timezone.now())
+
+    def test_claim_marks_due_messages_as_sending(self):
+        claimed = outbox._claim()
+        self.assertEqual([m.pk for m in claimed], [self.message.pk])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, 'sending')
+        # Leased: a second dispatcher does not get it
+        self.assertEqual(outbox._claim(), [])
+
+    def test_abandoned_lease_is_claimed_again(self):
+        OutboxMessage.objects.filter(pk=self.message.pk).update(
+            status='sending', next_attempt_at=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual(outbox._claim(), [])
+        OutboxMessage.objects.filter(pk=self.message.pk).update(
+            next_attempt_at=timezone.now() - outbox.LEASE - timedelta(seconds=1)
+        )
+        self.assertEqual([m.pk for m in outbox._claim()], [self.message.pk])
+
+    def test_idempotency_key_is_sent(self):
+        with self.post(return_value=response(201, b'{"id": 7}')) as post:
+            self.assertEqual(outbox.dispatch(), {'delivered': 1})
+        headers = post.call_args.kwargs['headers']
+        self.assertEqual(headers['Idempotency-Key'], str(self.message.idempotency_key))
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.remote_id), ('delivered', '7'))
+
+    def test_failures_back_off_then_dead_letter(self):
+        with self.settings(OUTBOX_MAX_ATTEMPTS=2), self.post(return_value=response(503)):
+            self.assertEqual(outbox.dispatch(), {'retry': 1})
+            self.message.refresh_from_db()
+            self.assertEqual((self.message.status, self.message.attempts), ('pending', 1))
+            self.assertGreater(self.message.next_attempt_at, timezone.now())
+            self.assertIn('HTTP 503', self.message.last_error)
+            # Not due before its backoff has elapsed
+            self.assertEqual(outbox.dispatch(), {})
+
+            self.make_due()
+            with self.assertLogs('Prolean.outbox', 'ERROR'):
+                self.assertEqual(outbox.dispatch(), {'dead': 1})
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ('dead', 2))
+
+    def test_network_error_is_retried(self):
+        with self.post(side_effect=TimeoutError('read timed out')):
+            self.assertEqual(outbox.dispatch(), {'retry': 1})
+        self.message.refresh_from_db()
+        self.assertIn('TimeoutError', self.message.last_error)
+
+    def test_rejected_message_is_dead_lettered_at_once(self):
+        with self.post(return_value=response(422, b'{"error": "invalid phone"}')), self.assertLogs('Prolean.outbox', 'ERROR'):
+            self.assertEqual(outbox.dispatch(), {'dead': 1})
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ('dead', 1))
+        self.assertEqual(self.message.last_error, 'HTTP 422: invalid phone')
+
+        self.assertEqual(outbox.retry_dead(), 1)
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), ('pending', 0))
+
+    def test_backoff_grows_and_is_capped(self):
+        with self.settings(OUTBOX_RETRY_BASE=30, OUTBOX_RETRY_MAX=3600):
+            self.assertLessEqual(outbox.backoff(1), timedelta(seconds=36))
+            self.assertGreaterEqual(outbox.backoff(3), timedelta(seconds=96))
+            self.assertLessEqual(outbox.backoff(20), timedelta(seconds=4320))
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from Prolean import analytics, page_cache, views
+
+from . import plain_static_files
+
+
+class CacheKeyTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def key(self, query, params=views.CATALOG_QUERY_PARAMS):
+        return page_cache.cache_key(self.factory.get(f'/formations/{query}'), params)
+
+    def test_unread_parameters_share_the_page(self):
+        plain = self.key('')
+        self.assertEqual(self.key('?utm_source=x&fbclid=1&foo=bar'), plain)
+        self.assertEqual(self.key('?q=caces', params=()), plain)
+
+    def test_read_parameters_split_the_page(self):
+        self.assertNotEqual(self.key('?q=caces'), self.key(''))
+        self.assertNotEqual(self.key('?q=caces&page=2'), self.key('?q=caces'))
+        self.assertEqual(self.key('?page=2&q=caces&gclid=z'), self.key('?q=caces&page=2'))
+
+
+class CacheableTests(TestCase):
+    def request(self, method='get', user=None):
+        request = getattr(RequestFactory(), method)('/migration/')
+        request.user = user or AnonymousUser()
+        request.session = SessionStore()
+        request._messages = FallbackStorage(request)
+        return request
+
+    def test_anonymous_get_is_cacheable(self):
+        self.assertTrue(page_cache.is_cacheable(self.request()))
+
+    def test_authenticated_user_bypasses_the_cache(self):
+        user = User.objects.create_user('amina', password='x')
+        self.assertFalse(page_cache.is_cacheable(self.request(user=user)))
+
+    def test_pending_flash_message_bypasses_the_cache(self):
+        request = self.request()
+        messages.success(request, 'Demande envoyée')
+        self.assertFalse(page_cache.is_cacheable(request))
+
+    def test_post_bypasses_the_cache(self):
+        self.assertFalse(page_cache.is_cacheable(self.request('post')))
+
+
+@plain_static_files
+@mock.patch.object(views.public_api, 'get_json', return_value=[])
+@mock.patch.object(analytics.event_queue, 'put', return_value=True)
+class CachedPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_tracking_parameters_hit_the_cached_page(self, *mocks):
+        self.assertEqual(self.client.get('/migration/')['X-Page-Cache'], 'miss')
+        response = self.client.get('/migration/?utm_campaign=spring&fbclid=abc')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_logged_in_user_gets_a_fresh_page(self, *mocks):
+        self.assertEqual(self.client.get('/migration/')['X-Page-Cache'], 'miss')
+        self.client.force_login(User.objects.create_user('amina', password='x'))
+        response = self.client.get('/migration/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Page-Cache', response)
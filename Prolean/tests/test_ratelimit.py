@@ -0,0 +1,155 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import DataError
+from django.test import RequestFactory, TestCase
+
+from Prolean import analytics, ratelimit, views, warmup
+from Prolean.models import RateLimitLog, ThreatIP
+from Prolean.context_processors import get_client_ip
+
+from . import plain_static_files
+
+
+@mock.patch.object(ratelimit.time, 'time')
+class SlidingWindowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.backend = ratelimit.CacheSlidingWindowBackend()
+
+    def hits(self, count):
+        return [self.backend.hit('10.0.0.1', 'catalog', 5, 60) for _ in range(count)]
+
+    def test_limit_within_one_window(self, now):
+        now.return_value = 600.0
+        results = self.hits(6)
+        self.assertEqual([allowed for allowed, _, _ in results], [True] * 5 + [False])
+        self.assertEqual(results[-1][1:], (60, 6))
+
+    def test_previous_window_is_weighted_by_its_overlap(self, now):
+        now.return_value = 600.0
+        self.hits(6)
+        # Half-way through the next window: 6 * 0.5 + current requests
+        now.return_value = 690.0
+        results = self.hits(3)
+        self.assertEqual([allowed for allowed, _, _ in results], [True, True, False])
+        self.assertEqual(results[-1][1:], (30, 6))
+        # Two windows later the old requests no longer count
+        now.return_value = 840.0
+        self.assertEqual([allowed for allowed, _, _ in self.hits(5)], [True] * 5)
+
+    def test_clients_and_endpoints_are_counted_apart(self, now):
+        now.return_value = 600.0
+        self.hits(6)
+        self.assertTrue(self.backend.hit('10.0.0.2', 'catalog', 5, 60)[0])
+        self.assertTrue(self.backend.hit('10.0.0.1', 'detail', 5, 60)[0])
+
+
+class DatabaseBackendTests(TestCase):
+    def test_limit_is_counted_in_the_database(self):
+        backend = ratelimit.DatabaseRateLimitBackend()
+        results = [backend.hit('10.0.0.1', 'catalog', 5, 60)[0] for _ in range(6)]
+        self.assertEqual(results, [True] * 5 + [False])
+        self.assertEqual(RateLimitLog.objects.filter(ip_address='10.0.0.1').count(), 6)
+
+    def test_malformed_addresses_share_one_counter(self):
+        backend = ratelimit.DatabaseRateLimitBackend()
+        for ip in ('x', '', 'not an ip', '0.0.0.0', 'y'):
+            backend.hit(ip, 'catalog', 5, 60)
+        self.assertFalse(backend.hit('z', 'catalog', 5, 60)[0])
+        self.assertEqual(set(RateLimitLog.objects.values_list('ip_address', flat=True)), {ratelimit.UNKNOWN_IP})
+
+
+class BackendCheckTests(TestCase):
+    SLIDING_WINDOW = 'Prolean.ratelimit.CacheSlidingWindowBackend'
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://r'}}
+
+    def ids(self, **overrides):
+        with self.settings(**overrides):
+            return [warning.id for warning in ratelimit.check_backend(None)]
+
+    def test_sliding_window_on_a_per_process_cache_is_flagged(self):
+        self.assertEqual(self.ids(PROLEAN_RATELIMIT_BACKEND=self.SLIDING_WINDOW, CACHES=self.LOCMEM), ['ratelimit.W001'])
+
+    def test_shared_cache_or_database_backend_pass(self):
+        self.assertEqual(self.ids(PROLEAN_RATELIMIT_BACKEND=self.SLIDING_WINDOW, CACHES=self.REDIS), [])
+        self.assertEqual(self.ids(
+            PROLEAN_RATELIMIT_BACKEND='Prolean.ratelimit.DatabaseRateLimitBackend', CACHES=self.LOCMEM,
+        ), [])
+
+
+class ViolationWriterTests(TestCase):
+    def setUp(self):
+        ratelimit.rejected_violations.clear()
+
+    def test_invalid_ips_are_dropped_and_valid_ones_normalized(self):
+        ratelimit._write_violations([
+            ('x', 'catalog', 1, 6),
+            ('', 'catalog', 1, 6),
+            (' 2001:DB8::1 ', 'catalog', 1, 6),
+        ])
+        self.assertEqual(list(RateLimitLog.objects.values_list('ip_address', flat=True)), ['2001:db8::1'])
+        self.assertEqual(list(ThreatIP.objects.values_list('ip_address', flat=True)), ['2001:db8::1'])
+        self.assertEqual(ratelimit.rejected_violations['invalid_ip'], 2)
+
+    def test_rejected_batch_is_written_one_by_one(self):
+        write = ratelimit._write_violation_batch
+
+        def reject_one(violations):
+            if any(ip == '10.0.0.9' for ip, _, _, _ in violations):
+                raise DataError('value too long')
+            write(violations)
+
+        with mock.patch.object(ratelimit, '_write_violation_batch', side_effect=reject_one), \
+                self.assertLogs('Prolean.ratelimit', 'WARNING'):
+            ratelimit._write_violations([
+                ('10.0.0.1', 'catalog', 1, 6),
+                ('10.0.0.9', 'catalog', 1, 6),
+                ('10.0.0.2', 'detail', 1, 7),
+            ])
+        self.assertEqual(
+            sorted(RateLimitLog.objects.values_list('ip_address', flat=True)), ['10.0.0.1', '10.0.0.2']
+        )
+        self.assertEqual(ratelimit.rejected_violations['database'], 1)
+
+
+class ClientIPTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_first_forwarded_hop_is_stripped(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR=' 1.2.3.4 , 10.0.0.1', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(get_client_ip(request), '1.2.3.4')
+
+    def test_empty_first_hop_falls_back_to_remote_addr(self):
+        request = self.factory.get('/', HTTP_X_FORWARDED_FOR=',1.2.3.4', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(get_client_ip(request), '10.0.0.2')
+
+
+@plain_static_files
+@mock.patch.object(views.public_api, 'get_json', return_value=[])
+@mock.patch.object(analytics.event_queue, 'put', return_value=True)
+@mock.patch.object(ratelimit.violation_queue, 'put', return_value=True)
+class RateLimitedViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def statuses(self, count, **extra):
+        return [self.client.get('/formations/', **extra).status_code for _ in range(count)]
+
+    def test_empty_forwarded_hop_is_limited(self, *mocks):
+        statuses = self.statuses(8, HTTP_X_FORWARDED_FOR=',1.2.3.4')
+        self.assertEqual(statuses.count(200), 5)
+        self.assertEqual(statuses.count(429), 3)
+
+    def test_missing_client_address_is_limited(self, *mocks):
+        statuses = self.statuses(8, REMOTE_ADDR='')
+        self.assertIn(429, statuses)
+
+    def test_warmup_requests_are_not_counted(self, violations, events, get_json):
+        statuses = self.statuses(8, **{warmup.WARMUP_ENVIRON_KEY: True})
+        self.assertEqual(statuses, [200] * 8)
+        events.assert_not_called()
+        # The warm-up requests left the limit of real visitors untouched
+        self.assertEqual(self.statuses(5), [200] * 5)
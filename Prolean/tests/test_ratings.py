@@ -0,0 +1,73 @@
+from django.test import TestCase
+
+from Prolean import ratings
+from Prolean.models import TrainingRatingSummary, TrainingReview
+
+from . import make_training
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        self.training = make_training()
+
+    def review(self, rating, is_approved=True):
+        return TrainingReview.objects.create(
+            training=self.training, full_name='A', email='a@example.com',
+            rating=rating, title='Avis', comment='Bien', is_approved=is_approved,
+        )
+
+    def summary(self):
+        return TrainingRatingSummary.objects.get(training=self.training)
+
+    def test_approved_reviews_are_added(self):
+        self.review(4)
+        self.review(2)
+        self.review(5, is_approved=False)
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum), (2, 6))
+        self.assertEqual((summary.stars_2, summary.stars_4, summary.stars_5), (1, 1, 0))
+        self.assertEqual(summary.average, 3.0)
+
+    def test_edits_move_the_contribution(self):
+        first = self.review(4)
+        second = self.review(5, is_approved=False)
+        second.is_approved = True
+        second.save()
+        first.rating = 1
+        first.save()
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum), (2, 6))
+        self.assertEqual((summary.stars_1, summary.stars_4, summary.stars_5), (1, 0, 1))
+
+        second.is_approved = False
+        second.save()
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.stars_5), (1, 1, 0))
+
+    def test_deleting_the_newest_review_moves_last_review_at(self):
+        first = self.review(4)
+        second = self.review(2)
+        self.assertEqual(self.summary().last_review_at, second.created_at)
+        second.delete()
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum), (1, 4))
+        self.assertEqual(summary.last_review_at, first.created_at)
+
+    def test_rebuild_repairs_drift(self):
+        self.review(4)
+        self.review(2)
+        # Queryset updates bypass the signals
+        TrainingReview.objects.filter(training=self.training).update(rating=5)
+        self.assertEqual(self.summary().rating_sum, 6)
+
+        self.assertEqual(ratings.rebuild([self.training.pk]), 1)
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.stars_5), (2, 10, 2))
+        self.assertEqual((summary.stars_2, summary.stars_4), (0, 0))
+
+    def test_rebuild_empties_trainings_without_reviews(self):
+        review = self.review(3)
+        TrainingReview.objects.filter(pk=review.pk).update(is_approved=False)
+        ratings.rebuild()
+        summary = self.summary()
+        self.assertEqual((summary.review_count, summary.rating_sum, summary.last_review_at), (0, 0, None))
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from Prolean import bus, review_feed
+from Prolean.models import TrainingReview
+
+from . import make_training
+
+
+@mock.patch.object(bus, '_ensure_listening')
+class FirstPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Channel versions of earlier tests were rolled back with their rows
+        versions = mock.patch.dict(bus._versions, clear=True)
+        versions.start()
+        self.addCleanup(versions.stop)
+        self.excel = make_training('excel')
+        self.word = make_training('word')
+
+    def review(self, training, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TrainingReview.objects.create(
+                training=training, full_name='A', email='a@example.com',
+                rating=5, title=title, comment='Bien', is_approved=True,
+            )
+
+    def titles(self, training):
+        return [review['title'] for review in review_feed.get_page(training.id)['reviews']]
+
+    def test_first_page_is_cached(self, listening):
+        self.review(self.excel, 'Premier')
+        self.assertEqual(self.titles(self.excel), ['Premier'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.excel), ['Premier'])
+
+    def test_saved_review_reaches_the_cached_page_after_commit(self, listening):
+        self.review(self.excel, 'Premier')
+        self.titles(self.excel)
+        self.review(self.excel, 'Second')
+        self.assertEqual(self.titles(self.excel), ['Second', 'Premier'])
+
+    def test_moved_review_leaves_the_old_training(self, listening):
+        moved = self.review(self.excel, 'Premier')
+        self.assertEqual(self.titles(self.excel), ['Premier'])
+        self.assertEqual(self.titles(self.word), [])
+        moved.training = self.word
+        with self.captureOnCommitCallbacks(execute=True):
+            moved.save()
+        self.assertEqual(self.titles(self.excel), [])
+        self.assertEqual(self.titles(self.word), ['Premier'])
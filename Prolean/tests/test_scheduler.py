@@ -0,0 +1,43 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from Prolean import outbox, scheduler
+from Prolean.models import AnalyticsRollup, OutboxMessage, PageView, RollupWatermark
+
+
+@mock.patch.object(scheduler, 'close_old_connections')
+class SchedulerTests(TestCase):
+    def test_failing_job_is_reported(self, close):
+        with mock.patch.dict(scheduler.JOBS, {'boom': scheduler.Job('boom', lambda: 1 / 0, 60, True)}):
+            ok, result = scheduler.run_job('boom')
+        self.assertFalse(ok)
+        self.assertIn('division', result)
+        close.assert_called_once()
+
+    def test_outbox_job_delivers_due_messages(self, close):
+        message = OutboxMessage.objects.create(kind='contact_request', payload={'name': 'A'})
+        response = mock.Mock(status_code=201, content=b'{"id": 12}', json=lambda: {'id': 12})
+        with mock.patch.object(outbox.management_api, 'post', return_value=response):
+            ok, result = scheduler.run_job('deliver_outbox')
+        self.assertTrue(ok)
+        self.assertEqual(result, {'delivered': 1})
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.remote_id), ('delivered', '12'))
+
+    def test_rollup_job_advances_the_watermark(self, close):
+        view = PageView.objects.create(url='/formations/', session_id='s', ip_address='10.0.0.1', user_agent='')
+        ok, result = scheduler.run_job('update_analytics_rollups')
+        self.assertTrue(ok)
+        self.assertEqual(result, '1 day(s) recomputed')
+        self.assertEqual(RollupWatermark.objects.get(source='pageview').last_id, view.id)
+        self.assertTrue(AnalyticsRollup.objects.exists())
+        self.assertEqual(scheduler.run_job('update_analytics_rollups')[1], '0 day(s) recomputed')
+
+
+class IntervalTests(SimpleTestCase):
+    def test_settings_override_the_default_interval(self):
+        with self.settings(SCHEDULER_INTERVALS={'deliver_outbox': 5}):
+            self.assertEqual(scheduler.JOBS['deliver_outbox'].interval, 5)
+        with self.settings(SCHEDULER_INTERVALS={}):
+            self.assertEqual(scheduler.JOBS['deliver_outbox'].interval, 30)
@@ -0,0 +1,33 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from Prolean import search
+from Prolean.models import TrainingSearchDocument
+
+from . import make_training
+
+
+@skipUnless(connection.vendor == 'postgresql', 'tsvector search needs PostgreSQL')
+class PostgresSearchTests(TestCase):
+    def setUp(self):
+        self.backend = search.PostgresSearchBackend()
+        self.security = make_training('securite', title='Sécurité électrique', short_description='Habilitation')
+        self.welding = make_training('soudage', title='Soudage TIG', short_description='Sécurité au poste')
+
+    def test_saved_trainings_get_a_stored_vector(self):
+        self.assertEqual(TrainingSearchDocument.objects.count(), 0)
+        self.assertEqual(self.backend.reindex(), 2)
+        self.assertFalse(TrainingSearchDocument.objects.filter(vector__isnull=True).exists())
+
+    def test_unaccented_query_matches_and_title_ranks_first(self):
+        self.backend.reindex()
+        ids = [training_id for training_id, _ in self.backend.search('securite')]
+        self.assertEqual(ids, [self.security.id, self.welding.id])
+
+    def test_inactive_trainings_are_not_returned(self):
+        self.backend.reindex()
+        self.welding.is_active = False
+        self.welding.save()
+        self.assertEqual([training_id for training_id, _ in self.backend.search('soudage')], [])
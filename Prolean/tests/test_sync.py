@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from Prolean import sync, views
+from Prolean.models import SyncCursor
+
+
+@mock.patch.object(views.public_api, 'get_json', return_value=[])
+class RequestFallbackTests(TestCase):
+    def setUp(self):
+        sync._synced.clear()
+
+    def test_api_is_called_until_a_first_sync(self, get_json):
+        views.fetch_public_formations()
+        self.assertEqual(get_json.call_count, 1)
+
+    def test_failed_sync_keeps_the_fallback(self, get_json):
+        SyncCursor.objects.create(resource='formations', last_error='timeout')
+        views.fetch_public_formations()
+        self.assertEqual(get_json.call_count, 1)
+
+    def test_no_api_call_once_synced(self, get_json):
+        SyncCursor.objects.create(resource='formations', last_success_at=timezone.now())
+        views.fetch_public_formations()
+        get_json.assert_not_called()
+        # Cities were never synced: still served from the API
+        views.fetch_public_cities()
+        self.assertEqual(get_json.call_count, 1)
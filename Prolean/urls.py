@@ -1,9 +1,13 @@
 # urls.py - FIXED
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = "Prolean"
 
+# Site Management API proxy views: async variants when served over ASGI
+proxy_views = async_views if getattr(settings, 'ASYNC_PROXY_VIEWS', False) else views
+
 urlpatterns = [
     # Main pages
     path("", views.home, name="home"),
@@ -13,7 +17,7 @@ urlpatterns = [
     path("centres-contact/", views.contact_centers, name="contact_centers"),
     
     # API endpoints
-    path("api/contact/", views.submit_contact_request, name="submit_contact_request"),
+    path("api/contact/", proxy_views.submit_contact_request, name="submit_contact_request"),
     path("api/review/", views.submit_review, name="submit_review"),
     path("api/waitlist/", views.join_waitlist, name="join_waitlist"),
     path("api/update-currency/", views.update_currency, name="update_currency"),
@@ -26,17 +30,17 @@ urlpatterns = [
     path("api/dashboard/updates/", views.check_updates_ajax, name="check_updates_ajax"),
     
     # New endpoints - FIXED: removed slug parameter
-    path('api/pre-subscribe/', views.create_pre_subscription, name='create_pre_subscription'),
+    path('api/pre-subscribe/', proxy_views.create_pre_subscription, name='create_pre_subscription'),
     path('api/subscribe-promotion/', views.subscribe_promotion, name='subscribe_promotion'),
     
     # Auth
-    path('register/', views.register, name='register'),
-    path('login/', views.login_view, name='login'),
-    path('login/', views.login_view, name='login'),
+    path('register/', proxy_views.register, name='register'),
+    path('login/', proxy_views.login_view, name='login'),
+    path('login/', proxy_views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     
     # Dashboard
-    path('mon-espace/', views.dashboard, name='dashboard'),
+    path('mon-espace/', proxy_views.dashboard, name='dashboard'),
     path('mon-emploi-du-temps/', views.student_schedule, name='student_schedule'),
     path('mon-profil/', views.student_profile, name='student_profile'),
     path('api/profile/upload-picture/', views.upload_profile_picture, name='upload_profile_picture'),
@@ -70,6 +74,7 @@ urlpatterns = [
     path('api/assistant/assign-session/', views.assistant_assign_session, name='assistant_assign_session'),
     path('api/assistant/create-session/', views.assistant_create_session, name='assistant_create_session'),
     path('director/', views.director_dashboard, name='director_dashboard'),
+    path('director/cache-stats/', views.cache_stats, name='cache_stats'),
     
     # Notifications
     path('notifications/read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
@@ -0,0 +1,181 @@
+# utils.py - small shared helpers
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe, bounded LRU cache with a per-entry time-to-live"""
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class BackgroundFlusher:
+    """
+    Lifecycle shared by the write-behind buffers: a daemon thread per process
+    calls ``flush`` every ``interval`` seconds (or as soon as ``_wakeup`` is
+    set), and once more at interpreter exit. Subclasses implement ``flush``
+    and call ``_ensure_thread`` whenever they buffer something.
+    """
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        atexit.register(self.flush)
+
+    def flush(self):
+        raise NotImplementedError
+
+    def _ensure_thread(self):
+        # Threads do not survive fork(): start one per worker process
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+            # This thread owns its own DB connection; recycle it like a request would
+            close_old_connections()
+
+
+class BackgroundBatcher(BackgroundFlusher):
+    """
+    Bounded in-process queue drained in batches by a daemon thread.
+
+    ``put`` never blocks: when the queue is full the item is dropped and
+    counted, so producers on the request path are never slowed down by the
+    consumer. ``handler`` receives a list of items and runs off-request.
+    """
+
+    def __init__(self, name, handler, max_size=10000, batch_size=500, interval=1.0):
+        super().__init__(name, interval)
+        self.handler = handler
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self._items = deque()
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self.batches = 0
+
+    def put(self, item):
+        """Queue an item; returns False if it was dropped because the queue is full"""
+        self._ensure_thread()
+        with self._lock:
+            if len(self._items) >= self.max_size:
+                self.dropped += 1
+                return False
+            self._items.append(item)
+            self.enqueued += 1
+            pending = len(self._items)
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _take(self):
+        with self._lock:
+            count = min(len(self._items), self.batch_size)
+            return [self._items.popleft() for _ in range(count)]
+
+    def flush(self):
+        """Synchronously drain everything currently queued"""
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            self.handler(batch)
+            self.flushed += len(batch)
+            self.batches += 1
+        except Exception as exc:
+            self.failed += len(batch)
+            logger.error(f"{self.name}: failed to flush {len(batch)} items: {exc}")
+
+    def stats(self):
+        return {
+            'pending': len(self._items),
+            'max_size': self.max_size,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'flushed': self.flushed,
+            'failed': self.failed,
+            'batches': self.batches,
+        }
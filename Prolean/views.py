@@ -7,9 +7,11 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.core.exceptions import ValidationError
 from django.db import transaction
+import hashlib
+import os
 import json
 import requests
 from datetime import datetime, timedelta
@@ -29,6 +31,8 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from .context_processors import get_client_ip, get_location_from_ip
+from . import analytics, blocklist, bus, catalog, counters, currency, invalidation, outbox, page_cache, ratelimit, ratings, review_feed, search, sync, warmup
+from .api_client import APIError, management_api, public_api
 import uuid
 
 from Prolean import models
@@ -90,53 +94,16 @@ class RateLimiter:
         """
         Check if IP has exceeded rate limit
         Returns: (is_allowed, remaining_seconds)
-        """
-        try:
-            one_minute_ago = timezone.now() - timedelta(minutes=period_minutes)
-
-            request_count = RateLimitLog.objects.filter(
-                ip_address=ip_address,
-                endpoint=endpoint,
-                last_request__gte=one_minute_ago
-            ).count()
-
-            RateLimitLog.objects.create(
-                ip_address=ip_address,
-                endpoint=endpoint,
-                period_minutes=period_minutes
-            )
-
-            if request_count >= limit:
-                threat_ip, created = ThreatIP.objects.get_or_create(
-                    ip_address=ip_address,
-                    defaults={
-                        'reason': f'Rate limit exceeded on {endpoint}: {request_count+1} requests in {period_minutes} minute(s)',
-                        'threat_level': 'high',
-                    }
-                )
-
-                if not created:
-                    threat_ip.increment_request_count()
-                    threat_ip.reason = f'Rate limit exceeded on {endpoint}: {threat_ip.request_count} total violations'
-                    threat_ip.save()
 
-                return False, 60
-        except Exception as exc:
-            logger.warning(f"Rate limiter DB unavailable, allowing request: {exc}")
-
-        return True, 0
+        Counting happens in the cache (see Prolean.ratelimit); violations are
+        written to RateLimitLog/ThreatIP in the background.
+        """
+        return ratelimit.check(ip_address, endpoint, limit=limit, period_seconds=period_minutes * 60)
     
     @staticmethod
     def is_ip_blocked(ip_address):
-        """Check if IP is blocked"""
-        try:
-            return ThreatIP.objects.filter(
-                ip_address=ip_address,
-                is_blocked=True
-            ).exists()
-        except Exception as exc:
-            logger.warning(f"ThreatIP DB unavailable, skipping block check: {exc}")
-            return False
+        """Check if IP is blocked (process-local set, no query per request)"""
+        return blocklist.is_blocked(ip_address)
 
 
 
@@ -249,7 +216,7 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.core.cache import cache
+from django.core.cache import cache, caches
 from django.core.exceptions import ValidationError
 from django.db import transaction
 import json
@@ -267,7 +234,10 @@ from .models import (
     CompanyBankAccount, TrainingPreSubscription
 )
 from .forms import ContactRequestForm, TrainingReviewForm, WaitlistForm, TrainingInquiryForm, MigrationInquiryForm
-from .context_processors import get_client_ip, get_location_from_ip
+from .context_processors import get_client_ip, get_location_from_ip, load_currency_rates
+from .middleware import get_request_cache
+from . import analytics, blocklist, bus, catalog, counters, currency, invalidation, outbox, page_cache, ratelimit, ratings, review_feed, search, sync, warmup
+from .api_client import APIError, management_api, public_api
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -282,65 +252,27 @@ class RateLimiter:
         """
         Check if IP has exceeded rate limit
         Returns: (is_allowed, remaining_seconds)
-        """
-        try:
-            one_minute_ago = timezone.now() - timedelta(minutes=period_minutes)
-
-            request_count = RateLimitLog.objects.filter(
-                ip_address=ip_address,
-                endpoint=endpoint,
-                last_request__gte=one_minute_ago
-            ).count()
-
-            RateLimitLog.objects.create(
-                ip_address=ip_address,
-                endpoint=endpoint,
-                period_minutes=period_minutes
-            )
-
-            if request_count >= limit:
-                threat_ip, created = ThreatIP.objects.get_or_create(
-                    ip_address=ip_address,
-                    defaults={
-                        'reason': f'Rate limit exceeded on {endpoint}: {request_count+1} requests in {period_minutes} minute(s)',
-                        'threat_level': 'high',
-                    }
-                )
-
-                if not created:
-                    threat_ip.increment_request_count()
-                    threat_ip.reason = f'Rate limit exceeded on {endpoint}: {threat_ip.request_count} total violations'
-                    threat_ip.save()
 
-                return False, 60
-        except Exception as exc:
-            logger.warning(f"Rate limiter DB unavailable, allowing request: {exc}")
-
-        return True, 0
+        Counting happens in the cache (see Prolean.ratelimit); violations are
+        written to RateLimitLog/ThreatIP in the background.
+        """
+        return ratelimit.check(ip_address, endpoint, limit=limit, period_seconds=period_minutes * 60)
+    
+    @staticmethod
+    def check_request(request, endpoint, limit=5, period_minutes=1):
+        """check_rate_limit for the client of ``request``; cache warm-up requests are not counted"""
+        if warmup.is_warmup(request):
+            return True, 0
+        ip_address = get_request_cache(request).client_ip
+        return RateLimiter.check_rate_limit(ip_address, endpoint, limit=limit, period_minutes=period_minutes)
     
     @staticmethod
     def is_ip_blocked(ip_address):
-        """Check if IP is blocked"""
-        try:
-            return ThreatIP.objects.filter(
-                ip_address=ip_address,
-                is_blocked=True
-            ).exists()
-        except Exception as exc:
-            logger.warning(f"ThreatIP DB unavailable, skipping block check: {exc}")
-            return False
+        """Check if IP is blocked (process-local set, no query per request)"""
+        return blocklist.is_blocked(ip_address)
 
 # ========== CACHING FUNCTIONS ==========
 
-def _public_api_base_url():
-    base = getattr(
-        settings,
-        'SITE_MANAGEMENT_PUBLIC_API_BASE',
-        'https://sitemanagement-production.up.railway.app/api/public'
-    )
-    return base.rstrip('/')
-
-
 class APITrainingAdapter:
     """Adapter to expose API training payload with template-compatible attributes."""
 
@@ -360,19 +292,8 @@ class APITrainingAdapter:
         self.next_session = payload.get('next_session')
         self.is_featured = bool(payload.get('is_featured'))
 
-        lower_title = title.lower()
-        self.category_caces = 'caces' in lower_title
-        self.category_electricite = ('electri' in lower_title) or ('électri' in lower_title)
-        self.category_soudage = 'soudage' in lower_title
-        self.category_securite = ('securite' in lower_title) or ('sécurit' in lower_title)
-        self.category_management = 'management' in lower_title
-        self.category_autre = not any([
-            self.category_caces,
-            self.category_electricite,
-            self.category_soudage,
-            self.category_securite,
-            self.category_management
-        ])
+        for flag, value in sync.guess_categories(title).items():
+            setattr(self, flag, value)
 
         self.available_casablanca = True
         self.available_rabat = True
@@ -390,15 +311,7 @@ class APITrainingAdapter:
         return None
 
     def get_price_in_currency(self, currency_code):
-        rates = {
-            'MAD': 1.0,
-            'EUR': 0.093,
-            'USD': 0.100,
-            'GBP': 0.079,
-            'CAD': 0.136,
-            'AED': 0.367,
-        }
-        return float(self.price_mad or 0) * float(rates.get(currency_code, 1.0))
+        return float(currency.convert(self.price_mad or 0, currency_code))
 
     def get_gallery_images(self):
         return []
@@ -432,11 +345,24 @@ class APITrainingAdapter:
         return values
 
 
+def _request_fallback_enabled(resource):
+    # Formations and cities are synced locally (sync_management_api): pages
+    # call the API live only until a first sync of the resource succeeded,
+    # or always with MANAGEMENT_API_REQUEST_FALLBACK
+    if getattr(settings, 'MANAGEMENT_API_REQUEST_FALLBACK', False):
+        return True
+    try:
+        return not sync.has_synced(resource)
+    except Exception:
+        # Database unavailable: the API is all there is
+        return True
+
+
 def fetch_public_formations():
+    if not _request_fallback_enabled('formations'):
+        return []
     try:
-        response = requests.get(f"{_public_api_base_url()}/formations", timeout=8)
-        response.raise_for_status()
-        data = response.json()
+        data = public_api.get_json('formations', '/formations')
         if isinstance(data, list):
             return [APITrainingAdapter(item) for item in data]
     except Exception as exc:
@@ -445,41 +371,41 @@ def fetch_public_formations():
 
 
 def fetch_public_formation_by_slug(slug):
+    if not _request_fallback_enabled('formations'):
+        return None
     try:
-        response = requests.get(f"{_public_api_base_url()}/formations/{slug}", timeout=8)
-        if response.status_code == 404:
-            return None
-        response.raise_for_status()
-        payload = response.json()
+        payload = public_api.get_json('formation_detail', f'/formations/{slug}')
         if isinstance(payload, dict):
-            payload['slug'] = slug
+            payload = dict(payload, slug=slug)
             return APITrainingAdapter(payload)
+    except APIError as exc:
+        if exc.status_code == 404:
+            return None
+        logger.warning(f"Public formation detail API fallback failed: {exc}")
     except Exception as exc:
         logger.warning(f"Public formation detail API fallback failed: {exc}")
-    for formation in fetch_public_formations():
-        if formation.slug == slug:
-            return formation
     return None
 
 
 def fetch_public_cities():
+    if not _request_fallback_enabled('cities'):
+        return []
     try:
-        response = requests.get(f"{_public_api_base_url()}/cities", timeout=8)
-        response.raise_for_status()
-        data = response.json()
+        data = public_api.get_json('cities', '/cities')
         if isinstance(data, list):
             return [SimpleNamespace(**item) for item in data]
     except Exception as exc:
         logger.warning(f"Public cities API unavailable: {exc}")
     return []
 
+# Cached query results, invalidated by edits of the models they are built from
+FEATURED_TRAININGS = invalidation.artifact('featured_trainings', depends_on=['Prolean.Training'])
+HOME_TRAININGS = invalidation.artifact('home_trainings', depends_on=['Prolean.Training'])
+
 def get_cached_featured_trainings():
     """Get featured trainings from cache or database"""
-    cache_key = 'featured_trainings'
-    featured_trainings = cache.get(cache_key)
-    
-    if featured_trainings is None:
-        featured_trainings = Training.objects.filter(
+    def build():
+        return list(Training.objects.filter(
             is_active=True,
             is_featured=True
         ).select_related(None).only(
@@ -487,120 +413,29 @@ def get_cached_featured_trainings():
             'duration_days', 'success_rate', 'max_students', 'badge',
             'thumbnail', 'category_caces', 'category_electricite',
             'category_soudage', 'category_securite', 'category_management'
-        ).order_by('-created_at')[:4]
-        
-        # Convert to list to cache properly
-        featured_trainings = list(featured_trainings)
-        cache.set(cache_key, featured_trainings, 1800)  # 30 minutes
-    
-    return featured_trainings
+        ).order_by('-created_at')[:4])
+
+    return FEATURED_TRAININGS.get_or_set(build)
 
 def get_cached_currency_rates():
     """Get currency rates from cache or database"""
-    cache_key = 'currency_rates'
-    rates = cache.get(cache_key)
-    
-    if rates is None:
-        rates = {}
-        db_rates = CurrencyRate.objects.all()
-        for rate in db_rates:
-            rates[rate.currency_code] = float(rate.rate_to_mad)
-        
-        if not rates:
-            rates = {
-                'MAD': 1.0,
-                'EUR': 0.093,
-                'USD': 0.100,
-                'GBP': 0.079,
-                'CAD': 0.136,
-                'AED': 0.367,
-            }
-        
-        cache.set(cache_key, rates, 3600)  # 1 hour
-    
-    return rates
-
-def get_cached_categories(trainings):
-    """Get categories from cache or calculate"""
-    cache_key = f'categories_{hash(str([t.id for t in trainings]))}'
-    categories = cache.get(cache_key)
-    
-    if categories is None:
-        categories = []
-        category_data = {
-            'caces': {'id': 'caces', 'name': 'CACES Engins', 'icon': 'construction', 'active_count': 0},
-            'electricite': {'id': 'electricite', 'name': 'Électricité', 'icon': 'bolt', 'active_count': 0},
-            'soudage': {'id': 'soudage', 'name': 'Soudage', 'icon': 'whatshot', 'active_count': 0},
-            'securite': {'id': 'securite', 'name': 'Sécurité', 'icon': 'security', 'active_count': 0},
-            'management': {'id': 'management', 'name': 'Management', 'icon': 'groups', 'active_count': 0},
-            'autre': {'id': 'autre', 'name': 'Autre', 'icon': 'category', 'active_count': 0},
-        }
-        
-        for training in trainings:
-            if training.category_caces: category_data['caces']['active_count'] += 1
-            if training.category_electricite: category_data['electricite']['active_count'] += 1
-            if training.category_soudage: category_data['soudage']['active_count'] += 1
-            if training.category_securite: category_data['securite']['active_count'] += 1
-            if training.category_management: category_data['management']['active_count'] += 1
-            if training.category_autre: category_data['autre']['active_count'] += 1
-        
-        for cat_id, cat_data in category_data.items():
-            if cat_data['active_count'] > 0:
-                categories.append(cat_data)
-        
-        cache.set(cache_key, categories, 900)  # 15 minutes
-    
-    return categories
+    return load_currency_rates()
 
 # ========== ANALYTICS TRACKING ==========
 
 def track_page_view(request, page_title=''):
-    """Track page view for analytics"""
+    """Queue a page view for analytics (written in the background)"""
+    if warmup.is_warmup(request):
+        return
     try:
-        session_id = request.session.session_key
-        if not session_id:
-            request.session.create()
-            session_id = request.session.session_key
-        
-        ip_address = get_client_ip(request)
-        user_location = get_location_from_ip(ip_address)
+        ip_address = get_request_cache(request).client_ip
         
         # Check if IP is blocked
         if RateLimiter.is_ip_blocked(ip_address):
             logger.warning(f"Blocked IP tried to access page: {ip_address}")
             return
         
-        # Track visitor session
-        visitor_session, created = VisitorSession.objects.get_or_create(
-            session_id=session_id,
-            defaults={
-                'ip_address': ip_address,
-                'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                'city': user_location.get('city', ''),
-                'country': user_location.get('country', ''),
-                'device_type': 'desktop',
-                'landing_page': request.path,
-                'referrer': request.META.get('HTTP_REFERER', '')
-            }
-        )
-        
-        if not created:
-            visitor_session.page_views += 1
-            visitor_session.last_activity = timezone.now()
-            visitor_session.save()
-        
-        # Track page view
-        PageView.objects.create(
-            url=request.path,
-            page_title=page_title,
-            referrer=request.META.get('HTTP_REFERER', ''),
-            session_id=session_id,
-            ip_address=ip_address,
-            user_agent=request.META.get('HTTP_USER_AGENT', ''),
-            city=user_location.get('city', ''),
-            country=user_location.get('country', ''),
-            device_type='desktop'
-        )
+        analytics.record_page_view(request, page_title)
         
     except Exception as e:
         logger.error(f"Error tracking page view: {e}")
@@ -609,12 +444,10 @@ def home(request):
     """Home page view with optimized queries"""
     track_page_view(request, "Accueil - Prolean Centre")
     
-    # Get featured trainings from cache or database
-    featured_trainings = cache.get('featured_trainings')
-    
-    if featured_trainings is None:
-        try:
-            featured_trainings = list(Training.objects.filter(
+    def build_context():
+        # Get featured trainings from cache or database
+        def build_featured():
+            featured = list(Training.objects.filter(
                 is_active=True,
                 is_featured=True
             ).only(
@@ -623,61 +456,53 @@ def home(request):
                 'thumbnail'
             ).order_by('-created_at')[:4])
 
-            if not featured_trainings:
-                featured_trainings = list(Training.objects.filter(
+            if not featured:
+                featured = list(Training.objects.filter(
                     is_active=True
                 ).only(
                     'id', 'title', 'slug', 'short_description', 'price_mad',
                     'duration_days', 'success_rate', 'max_students', 'badge',
                     'thumbnail'
                 ).order_by('-created_at')[:4])
-            if not featured_trainings:
-                featured_trainings = fetch_public_formations()[:4]
-            cache.set('featured_trainings', featured_trainings, 1800)  # 30 minutes
+            return featured
+
+        try:
+            featured_trainings = HOME_TRAININGS.get_or_set(build_featured)
         except Exception as exc:
             logger.warning(f"Home DB trainings unavailable, using API fallback: {exc}")
+            featured_trainings = []
+        if not featured_trainings:
+            # Not cached: the fallback holds until the next sync writes trainings
             featured_trainings = fetch_public_formations()[:4]
     
-    # Get user location
-    ip_address = get_client_ip(request)
-    user_location = get_location_from_ip(ip_address)
+        # Currency rates and preferred currency are shared with the context
+        # processors through the request cache
+        request_cache = get_request_cache(request)
+        currency_rates = request_cache.currency_rates
+        preferred_currency = request_cache.preferred_currency
     
-    # Get currency rates from cache
-    currency_rates = cache.get('currency_rates')
-    if currency_rates is None:
-        currency_rates = {}
-        try:
-            db_rates = CurrencyRate.objects.all()
-            for rate in db_rates:
-                currency_rates[rate.currency_code] = float(rate.rate_to_mad)
-        except:
-            currency_rates = {'MAD': 1.0, 'EUR': 0.093, 'USD': 0.100, 'GBP': 0.079}
-        cache.set('currency_rates', currency_rates, 3600)
-    
-    # Get preferred currency
-    preferred_currency = request.session.get('preferred_currency', 'MAD')
-    
-    # Prepare training data
-    for training in featured_trainings:
-        training.price_mad_float = float(training.price_mad)
-        training.price_in_preferred = float(training.get_price_in_currency(preferred_currency))
+        # Prepare training data
+        currency.apply_prices(featured_trainings, preferred_currency)
     
-    context = {
-        'featured_trainings': featured_trainings,
-        'user_location': user_location,
-        'currency_rates': currency_rates,
-        'preferred_currency': preferred_currency,
-    }
+        context = {
+            'featured_trainings': featured_trainings,
+            'currency_rates': currency_rates,
+            'preferred_currency': preferred_currency,
+        }
+    
+        return context
     
-    return render(request, "Prolean/home.html", context)
+    return page_cache.render(request, "Prolean/home.html", build_context)
+
+# Query parameters the catalog reads: the only ones that vary its cached page
+CATALOG_QUERY_PARAMS = ('q', 'category', 'page')
 
 def training_catalog(request):
     """Training catalog view with optimized queries"""
     track_page_view(request, "Catalogue des formations")
     
     # Check rate limit
-    ip_address = get_client_ip(request)
-    allowed, wait_time = RateLimiter.check_rate_limit(ip_address, 'training_catalog')
+    allowed, wait_time = RateLimiter.check_request(request, 'training_catalog')
     
     if not allowed:
         return JsonResponse({
@@ -685,122 +510,100 @@ def training_catalog(request):
             'wait_time': wait_time
         }, status=429)
     
-    using_api_fallback = False
-    try:
-        trainings = list(Training.objects.filter(is_active=True).only(
-            'id', 'title', 'slug', 'short_description', 'price_mad',
-            'duration_days', 'success_rate', 'max_students', 'badge',
-            'thumbnail', 'next_session', 'is_featured',
-            'category_caces', 'category_electricite', 'category_soudage',
-            'category_securite', 'category_management', 'category_autre'
-        ).order_by('-created_at'))
-        if not trainings:
-            using_api_fallback = True
-            trainings = fetch_public_formations()
-    except Exception as exc:
-        logger.warning(f"Catalog DB trainings unavailable, using API fallback: {exc}")
-        using_api_fallback = True
-        trainings = fetch_public_formations()
-    
-    # Get search query
-    search_query = request.GET.get('q', '')
-    if search_query:
-        if using_api_fallback:
-            needle = search_query.lower()
-            trainings = [
-                t for t in trainings
-                if needle in (t.title or '').lower() or needle in (t.short_description or '').lower()
-            ]
-        else:
-            trainings = trainings.filter(
-                Q(title__icontains=search_query) |
-                Q(short_description__icontains=search_query)
-            )
+    def build_context():
+        search_query = request.GET.get('q', '')
+        category_filter = request.GET.get('category', 'all')
+        preferred_currency = get_request_cache(request).preferred_currency
     
-    # Get category filter
-    category_filter = request.GET.get('category', 'all')
-    if category_filter != 'all':
-        category_map = {
-            'caces': 'category_caces',
-            'electricite': 'category_electricite',
-            'soudage': 'category_soudage',
-            'securite': 'category_securite',
-            'management': 'category_management',
-            'autre': 'category_autre',
-        }
-        if category_filter in category_map:
-            if using_api_fallback:
-                flag = category_map[category_filter]
+        snapshot = catalog.get_snapshot()
+        if snapshot:
+            # Served from the in-memory catalog snapshot: no query on this path
+            trainings = snapshot.filter(
+                category=category_filter if category_filter in catalog.CATEGORY_BITS else None,
+            )
+            if search_query:
+                trainings = search.rank(trainings, search_query)
+            categories = snapshot.categories(trainings)
+            total_count = len(trainings)
+            trainings_list = trainings
+        else:
+            logger.warning("Catalog snapshot unavailable, using API fallback")
+            trainings = fetch_public_formations()
+            if search_query:
+                trainings = search.rank_objects(trainings, search_query)
+            if category_filter in catalog.CATEGORY_BITS:
+                flag = f'category_{category_filter}'
                 trainings = [t for t in trainings if getattr(t, flag, False)]
-            else:
-                filter_kwargs = {category_map[category_filter]: True}
-                trainings = [t for t in trainings if getattr(t, category_map[category_filter], False)]
+            categories = catalog.categories_of(trainings)
+            total_count = len(trainings)
+            trainings_list = currency.apply_prices(trainings, preferred_currency)
     
-    # Get categories from cache
-    categories = get_cached_categories(trainings)
-    total_count = len(trainings)
+        # Pagination
+        page = request.GET.get('page', 1)
+        paginator = Paginator(trainings_list, 12)
     
-    # Get preferred currency
-    preferred_currency = request.session.get('preferred_currency', 'MAD')
-    
-    # Prepare training data
-    trainings_list = list(trainings)
-    for training in trainings_list:
-        training.price_mad_float = float(training.price_mad)
-        training.price_in_preferred = float(training.get_price_in_currency(preferred_currency))
-    
-    # Pagination
-    page = request.GET.get('page', 1)
-    paginator = Paginator(trainings_list, 12)
+        try:
+            trainings_page = paginator.page(page)
+        except PageNotAnInteger:
+            trainings_page = paginator.page(1)
+        except EmptyPage:
+            trainings_page = paginator.page(paginator.num_pages)
+    
+        if snapshot:
+            trainings_page.object_list = [
+                entry.with_currency(preferred_currency) for entry in trainings_page.object_list
+            ]
     
-    try:
-        trainings_page = paginator.page(page)
-    except PageNotAnInteger:
-        trainings_page = paginator.page(1)
-    except EmptyPage:
-        trainings_page = paginator.page(paginator.num_pages)
+        context = {
+            'trainings': trainings_page,
+            'categories': categories,
+            'selected_category': category_filter,
+            'search_query': search_query,
+            'total_count': total_count,
+            'preferred_currency': preferred_currency,
+        }
     
-    context = {
-        'trainings': trainings_page,
-        'categories': categories,
-        'selected_category': category_filter,
-        'search_query': search_query,
-        'total_count': total_count,
-        'preferred_currency': preferred_currency,
-    }
+        return context
     
-    return render(request, "Prolean/training_catalog.html", context)
+    return page_cache.render(
+        request, "Prolean/training_catalog.html", build_context, params=CATALOG_QUERY_PARAMS
+    )
 
 
 
 # Update the training_detail function in views.py
 def training_detail(request, slug):
     """Training detail view with reviews and optimized queries"""
-    try:
-        training = get_object_or_404(
-            Training.objects.select_related(None),
-            slug=slug,
-            is_active=True
-        )
-    except Exception as exc:
-        logger.warning(f"Training detail DB unavailable, using API fallback: {exc}")
-        training = fetch_public_formation_by_slug(slug)
-        if training is None:
-            return redirect('Prolean:training_catalog')
-    
-    # Increment view count
-    training.increment_view_count()
-    track_page_view(request, f"{training.title} - Prolean Centre")
-    
-    # Get active bank account
-    try:
-        active_bank_account = CompanyBankAccount.get_active_account()
-    except Exception:
-        active_bank_account = None
+    # A cached page only needs the id and title, which the catalog snapshot has
+    snapshot = catalog.get_snapshot()
+    entry = snapshot.by_slug.get(slug) if snapshot is not None else None
+    cached_response = page_cache.get_cached(request) if entry is not None else None
+    
+    if cached_response is not None:
+        training_title = entry.title
+        if not warmup.is_warmup(request):
+            counters.increment_pk(Training, entry.id, 'view_count')
+    else:
+        try:
+            training = get_object_or_404(
+                Training.objects.select_related('rating_summary'),
+                slug=slug,
+                is_active=True
+            )
+        except Exception as exc:
+            logger.warning(f"Training detail DB unavailable, using API fallback: {exc}")
+            training = fetch_public_formation_by_slug(slug)
+            if training is None:
+                return redirect('Prolean:training_catalog')
+        
+        # Increment view count
+        if not warmup.is_warmup(request):
+            training.increment_view_count()
+        training_title = training.title
+    track_page_view(request, f"{training_title} - Prolean Centre")
     
     # Check rate limit
-    ip_address = get_client_ip(request)
-    allowed, wait_time = RateLimiter.check_rate_limit(ip_address, f'training_detail_{slug}')
+    allowed, wait_time = RateLimiter.check_request(request, f'training_detail_{slug}')
     
     if not allowed:
         return JsonResponse({
@@ -808,94 +611,89 @@ def training_detail(request, slug):
             'wait_time': wait_time
         }, status=429)
     
-    # Get preferred currency
-    preferred_currency = request.session.get('preferred_currency', 'MAD')
-    
-    # Prepare training data
-    training.price_mad_float = float(training.price_mad)
-    training.price_in_preferred = float(training.get_price_in_currency(preferred_currency))
-    
-    # Get available cities (only names, no phones)
-    available_cities = []
-    city_fields = [
-        ('available_casablanca', 'Casablanca'),
-        ('available_rabat', 'Rabat'),
-        ('available_tanger', 'Tanger'),
-        ('available_marrakech', 'Marrakech'),
-        ('available_agadir', 'Agadir'),
-        ('available_fes', 'Fès'),
-        ('available_meknes', 'Meknès'),
-        ('available_oujda', 'Oujda'),
-        ('available_laayoune', 'Laâyoune'),
-        ('available_dakhla', 'Dakhla'),
-        ('available_other', 'Autre ville'),
-    ]
-    
-    for field, name in city_fields:
-        if getattr(training, field):
-            available_cities.append({'name': name})
-    
-    # Get reviews
-    try:
-        reviews = TrainingReview.objects.filter(
-            training=training,
-            is_approved=True
-        ).order_by('-created_at')
-    except Exception:
-        reviews = []
-    
-    # Add avatar path to each review (compatible with old and new reviews)
-    for review in reviews:
-        if not review.avatar or review.avatar == '':
-            # Assign a default avatar based on review ID or name
-            avatar_number = (review.id % 4) + 1 if review.id else (hash(review.full_name) % 4) + 1
-            review.avatar = f'images/avatars/avatar{avatar_number}.png'
-        # Ensure the avatar path is complete
-        elif not review.avatar.startswith('images/avatars/'):
-            # If it's just a filename, prepend the path
-            if '.' in review.avatar:
-                review.avatar = f'images/avatars/{review.avatar}'
-            else:
-                review.avatar = f'images/avatars/avatar1.png'
+    if cached_response is not None:
+        return cached_response
     
-    try:
-        avg_rating = get_training_avg_rating(training.id)
-    except Exception:
-        avg_rating = 0
+    def build_context():
+        # Get active bank account
+        try:
+            active_bank_account = CompanyBankAccount.get_active_account()
+        except Exception:
+            active_bank_account = None
     
-    # Get waitlist count
-    try:
-        waitlist_count = TrainingWaitlist.objects.filter(training=training).count()
-    except Exception:
-        waitlist_count = 0
+        # Get preferred currency
+        preferred_currency = get_request_cache(request).preferred_currency
     
-    # Get gallery images, certificates, testimonials, FAQs, and features
-    gallery_images = training.get_gallery_images()
-    certificates = training.get_certificates()
-    testimonials = training.get_testimonials()
-    faqs = training.get_faqs()
-    features = training.get_features()
-    categories = training.get_categories()
+        # Prepare training data
+        training.price_mad_float = float(training.price_mad)
+        training.price_in_preferred = float(training.get_price_in_currency(preferred_currency))
     
-    context = {
-        'training': training,
-        'available_cities': available_cities,
-        'reviews': reviews,
-        'review_count': reviews.count() if hasattr(reviews, 'count') else len(reviews),
-        'waitlist_count': waitlist_count,
-        'preferred_currency': preferred_currency,
-        'gallery_images': gallery_images,
-        'certificates': certificates,
-        'testimonials': testimonials,
-        'faqs': faqs,
-        'features': features,
-        'categories': categories,
-        'avg_rating': avg_rating or 0,
-        'preferred_currency': request.session.get('currency', 'MAD'),
-        'bank_account': active_bank_account,
-    }
+        # Get available cities (only names, no phones)
+        available_cities = []
+        city_fields = [
+            ('available_casablanca', 'Casablanca'),
+            ('available_rabat', 'Rabat'),
+            ('available_tanger', 'Tanger'),
+            ('available_marrakech', 'Marrakech'),
+            ('available_agadir', 'Agadir'),
+            ('available_fes', 'Fès'),
+            ('available_meknes', 'Meknès'),
+            ('available_oujda', 'Oujda'),
+            ('available_laayoune', 'Laâyoune'),
+            ('available_dakhla', 'Dakhla'),
+            ('available_other', 'Autre ville'),
+        ]
+    
+        for field, name in city_fields:
+            if getattr(training, field):
+                available_cities.append({'name': name})
+    
+        # First page of the review feed (cached); the rest is loaded on demand
+        try:
+            review_page = review_feed.get_page(training.id)
+        except Exception:
+            review_page = {'reviews': [], 'next_cursor': None}
     
-    return render(request, "Prolean/training_detail.html", context)
+        # Count and average come from the denormalized summary (ratings.py)
+        rating_summary = ratings.get_summary(training)
+    
+        # Get waitlist count
+        try:
+            waitlist_count = TrainingWaitlist.objects.filter(training=training).count()
+        except Exception:
+            waitlist_count = 0
+    
+        # Get gallery images, certificates, testimonials, FAQs, and features
+        gallery_images = training.get_gallery_images()
+        certificates = training.get_certificates()
+        testimonials = training.get_testimonials()
+        faqs = training.get_faqs()
+        features = training.get_features()
+        categories = training.get_categories()
+    
+        context = {
+            'training': training,
+            'available_cities': available_cities,
+            'reviews': review_page['reviews'],
+            'reviews_next_cursor': review_page['next_cursor'],
+            'review_count': rating_summary.review_count,
+            'waitlist_count': waitlist_count,
+            'preferred_currency': preferred_currency,
+            'gallery_images': gallery_images,
+            'certificates': certificates,
+            'testimonials': testimonials,
+            'faqs': faqs,
+            'features': features,
+            'categories': categories,
+            'avg_rating': rating_summary.average,
+            'rating_summary': rating_summary,
+            'bank_account': active_bank_account,
+        }
+    
+        return context
+    
+    # Anonymous visitors share the rendered page (page_cache.py)
+    return page_cache.render(request, "Prolean/training_detail.html", build_context)
 
 
 
@@ -908,8 +706,7 @@ def migration_services(request):
     track_page_view(request, "Services de migration")
     
     # Check rate limit
-    ip_address = get_client_ip(request)
-    allowed, wait_time = RateLimiter.check_rate_limit(ip_address, 'migration_services')
+    allowed, wait_time = RateLimiter.check_request(request, 'migration_services')
     
     if not allowed:
         return JsonResponse({
@@ -917,30 +714,29 @@ def migration_services(request):
             'wait_time': wait_time
         }, status=429)
     
-    try:
-        cities = list(City.objects.filter(is_active=True).order_by('name'))
-        if not cities:
+    def build_context():
+        try:
+            cities = list(City.objects.filter(is_active=True).order_by('name'))
+            if not cities:
+                cities = fetch_public_cities()
+        except Exception as exc:
+            logger.warning(f"Migration services cities DB unavailable, using API fallback: {exc}")
             cities = fetch_public_cities()
-    except Exception as exc:
-        logger.warning(f"Migration services cities DB unavailable, using API fallback: {exc}")
-        cities = fetch_public_cities()
-    ip_address = get_client_ip(request)
-    user_location = get_location_from_ip(ip_address)
     
-    context = {
-        'all_cities': cities,
-        'user_location': user_location,
-    }
+        context = {
+            'all_cities': cities,
+        }
+    
+        return context
     
-    return render(request, "Prolean/migration_services.html", context)
+    return page_cache.render(request, "Prolean/migration_services.html", build_context)
 
 def contact_centers(request):
     """Contact centers page"""
     track_page_view(request, "Centres de contact")
     
     # Check rate limit
-    ip_address = get_client_ip(request)
-    allowed, wait_time = RateLimiter.check_rate_limit(ip_address, 'contact_centers')
+    allowed, wait_time = RateLimiter.check_request(request, 'contact_centers')
     
     if not allowed:
         return JsonResponse({
@@ -948,22 +744,22 @@ def contact_centers(request):
             'wait_time': wait_time
         }, status=429)
     
-    try:
-        cities = list(City.objects.filter(is_active=True).order_by('name'))
-        if not cities:
+    def build_context():
+        try:
+            cities = list(City.objects.filter(is_active=True).order_by('name'))
+            if not cities:
+                cities = fetch_public_cities()
+        except Exception as exc:
+            logger.warning(f"Contact centers cities DB unavailable, using API fallback: {exc}")
             cities = fetch_public_cities()
-    except Exception as exc:
-        logger.warning(f"Contact centers cities DB unavailable, using API fallback: {exc}")
-        cities = fetch_public_cities()
-    ip_address = get_client_ip(request)
-    user_location = get_location_from_ip(ip_address)
     
-    context = {
-        'all_cities': cities,
-        'user_location': user_location,
-    }
+        context = {
+            'all_cities': cities,
+        }
+    
+        return context
     
-    return render(request, "Prolean/contact_centers.html", context)
+    return page_cache.render(request, "Prolean/contact_centers.html", build_context)
 
 # ========== API VIEWS ==========
 
@@ -971,9 +767,9 @@ def contact_centers(request):
 @require_POST
 @csrf_exempt
 def submit_contact_request(request):
-    """Forward contact request to Site Management API (single source of truth)."""
+    """Queue a contact request for the Site Management API (single source of truth)."""
     try:
-        ip_address = get_client_ip(request)
+        ip_address = get_request_cache(request).client_ip
         allowed, wait_time = RateLimiter.check_rate_limit(ip_address, 'submit_contact', limit=5)
         if not allowed:
             return JsonResponse({
@@ -993,31 +789,16 @@ def submit_contact_request(request):
             'source': 'prolean_public_site',
         }
 
-        api_base = getattr(
-            settings,
-            'SITE_MANAGEMENT_API_BASE',
-            'https://sitemanagement-production.up.railway.app/api'
-        ).rstrip('/')
-        response = requests.post(
-            f"{api_base}/public/contact-requests",
-            json=payload,
-            timeout=15
-        )
-
-        body = response.json() if response.content else {}
-        if response.status_code not in (200, 201):
-            return JsonResponse({
-                'success': False,
-                'message': body.get('error') or body.get('message') or 'Erreur lors de l\'envoi de la demande.'
-            }, status=response.status_code)
+        # Stored locally and delivered in the background (outbox.py)
+        message = outbox.enqueue('contact_request', payload)
 
         return JsonResponse({
             'success': True,
             'message': 'Votre demande a \u00e9t\u00e9 envoy\u00e9e avec succ\u00e8s.',
-            'request_id': body.get('id')
+            'request_id': str(message.idempotency_key)
         })
     except Exception as e:
-        logger.error(f"Error submitting contact request via management API: {e}")
+        logger.error(f"Error queueing contact request: {e}")
         return JsonResponse({
             'success': False,
             'message': 'Service temporairement indisponible.'
@@ -1027,7 +808,7 @@ def submit_contact_request(request):
 @csrf_exempt
 @require_POST
 def create_pre_subscription(request):
-    """Forward pre-inscription to Site Management API."""
+    """Queue a pre-inscription for the Site Management API."""
     try:
         data = json.loads(request.body)
 
@@ -1051,36 +832,20 @@ def create_pre_subscription(request):
             'source': 'prolean_public_site',
         }
 
-        api_base = getattr(
-            settings,
-            'SITE_MANAGEMENT_API_BASE',
-            'https://sitemanagement-production.up.railway.app/api'
-        ).rstrip('/')
-        response = requests.post(
-            f"{api_base}/public/pre-inscriptions",
-            json=payload,
-            timeout=15
-        )
-
-        body = response.json() if response.content else {}
-        if response.status_code not in (200, 201):
-            return JsonResponse({
-                'success': False,
-                'message': body.get('error') or body.get('message') or 'Erreur lors de la pre-inscription.'
-            }, status=response.status_code)
+        message = outbox.enqueue('pre_inscription', payload)
 
         return JsonResponse({
             'success': True,
             'message': 'Pre-inscription enregistree avec succes.',
             'subscription': {
-                'id': body.get('id'),
-                'transaction_id': body.get('id'),
+                'id': str(message.idempotency_key),
+                'transaction_id': str(message.idempotency_key),
                 'payment_method': data.get('payment_method'),
                 'payment_status': 'pending'
             }
         })
     except Exception as e:
-        logger.error(f"Error creating pre-subscription via management API: {str(e)}")
+        logger.error(f"Error queueing pre-subscription: {str(e)}")
         return JsonResponse({
             'success': False,
             'message': 'Service temporairement indisponible.'
@@ -1182,14 +947,8 @@ def join_waitlist(request):
 
 # Helper function to get average rating
 def get_training_avg_rating(training_id):
-    """Calculate average rating for a training"""
-    from django.db.models import Avg
-    result = TrainingReview.objects.filter(
-        training_id=training_id,
-        is_approved=True
-    ).aggregate(Avg('rating'))
-    
-    return result['rating__avg'] or 0
+    """Average rating for a training, from its rating summary"""
+    return ratings.get_summary_for_id(training_id).average
 
 @require_POST
 @csrf_exempt
@@ -1197,7 +956,7 @@ def update_currency(request):
     """Update user's preferred currency"""
     try:
         # Check rate limit
-        ip_address = get_client_ip(request)
+        ip_address = get_request_cache(request).client_ip
         allowed, wait_time = RateLimiter.check_rate_limit(ip_address, 'update_currency', limit=10)
         
         if not allowed:
@@ -1243,22 +1002,11 @@ def track_click_event(request):
     try:
         data = json.loads(request.body)
         
-        session_id = request.session.session_key
+        session_id = analytics.get_visitor_id(request, create=False)
         if not session_id:
             return JsonResponse({'success': False})
         
-        ip_address = get_client_ip(request)
-        user_location = get_location_from_ip(ip_address)
-        
-        ClickEvent.objects.create(
-            element_type=data.get('element_type', 'button'),
-            element_text=data.get('element_text', ''),
-            element_id=data.get('element_id', ''),
-            url=data.get('url', request.path),
-            session_id=session_id,
-            ip_address=ip_address,
-            city=user_location.get('city', '')
-        )
+        analytics.record_click(request, session_id, data)
         
         return JsonResponse({'success': True})
         
@@ -1272,21 +1020,11 @@ def track_phone_call(request):
     try:
         data = json.loads(request.body)
         
-        session_id = request.session.session_key
+        session_id = analytics.get_visitor_id(request, create=False)
         if not session_id:
             return JsonResponse({'success': False})
         
-        ip_address = get_client_ip(request)
-        user_location = get_location_from_ip(ip_address)
-        
-        PhoneCall.objects.create(
-            phone_number=data.get('phone_number', ''),
-            caller_city=user_location.get('city', ''),
-            caller_country=user_location.get('country', ''),
-            url=data.get('url', request.path),
-            session_id=session_id,
-            ip_address=ip_address
-        )
+        analytics.record_phone_call(request, session_id, data)
         
         return JsonResponse({'success': True})
         
@@ -1300,21 +1038,11 @@ def track_whatsapp_click(request):
     try:
         data = json.loads(request.body)
         
-        session_id = request.session.session_key
+        session_id = analytics.get_visitor_id(request, create=False)
         if not session_id:
             return JsonResponse({'success': False})
         
-        ip_address = get_client_ip(request)
-        user_location = get_location_from_ip(ip_address)
-        
-        WhatsAppClick.objects.create(
-            phone_number=data.get('phone_number', '+212779259942'),
-            message_prefill=data.get('message', ''),
-            url=data.get('url', request.path),
-            session_id=session_id,
-            ip_address=ip_address,
-            city=user_location.get('city', '')
-        )
+        analytics.record_whatsapp_click(request, session_id, data)
         
         return JsonResponse({'success': True})
         
@@ -1323,36 +1051,28 @@ def track_whatsapp_click(request):
 
 @csrf_exempt
 def get_training_reviews(request, training_id):
-    """Get reviews for a training"""
+    """Approved reviews of a training, one keyset page at a time (?cursor=&limit=)"""
     try:
-        training = get_object_or_404(Training, id=training_id)
-        reviews = TrainingReview.objects.filter(
-            training=training,
-            is_approved=True
-        ).order_by('-created_at')
-        
-        reviews_data = []
-        for review in reviews:
-            reviews_data.append({
-                'id': review.id,
-                'full_name': review.full_name,
-                'avatar': review.avatar or f'images/avatars/avatar{(review.id % 4) + 1}.png',
-                'rating': review.rating,
-                'title': review.title,
-                'comment': review.comment,
-                'is_verified': review.is_verified,
-                'created_at': review.created_at.strftime('%d/%m/%Y'),
-                'helpful_count': review.helpful_count,
-                'not_helpful_count': review.not_helpful_count,
-            })
+        training = get_object_or_404(Training.objects.select_related('rating_summary'), id=training_id)
+        try:
+            limit = int(request.GET.get('limit') or 0) or None
+            page = review_feed.get_page(training.id, cursor=request.GET.get('cursor'), limit=limit)
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'message': 'Paramètres de pagination invalides'
+            }, status=400)
         
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
+        summary = ratings.get_summary(training)
         
         return JsonResponse({
             'success': True,
-            'reviews': reviews_data,
-            'avg_rating': round(avg_rating, 1),
-            'total_reviews': reviews.count()
+            'reviews': [review_feed.to_json(review) for review in page['reviews']],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['next_cursor'] is not None,
+            'avg_rating': summary.average,
+            'total_reviews': summary.review_count,
+            'rating_histogram': summary.histogram,
         })
         
     except Exception as e:
@@ -1370,19 +1090,17 @@ def mark_review_helpful(request):
         review_id = data.get('review_id')
         is_helpful = data.get('is_helpful', True)
         
-        review = get_object_or_404(TrainingReview, id=review_id)
-        
-        if is_helpful:
-            review.helpful_count = F('helpful_count') + 1
-        else:
-            review.not_helpful_count = F('not_helpful_count') + 1
+        review = get_object_or_404(
+            TrainingReview.objects.only('id', 'helpful_count', 'not_helpful_count'), id=review_id
+        )
         
-        review.save(update_fields=['helpful_count', 'not_helpful_count'])
+        # Buffered and flushed in bulk (counters.py)
+        counters.increment(review, 'helpful_count' if is_helpful else 'not_helpful_count')
         
         return JsonResponse({
             'success': True,
-            'helpful_count': review.helpful_count,
-            'not_helpful_count': review.not_helpful_count
+            'helpful_count': review.helpful_count + (0 if is_helpful else counters.pending(review, 'helpful_count')),
+            'not_helpful_count': review.not_helpful_count + (counters.pending(review, 'not_helpful_count') if is_helpful else 0)
         })
         
     except Exception as e:
@@ -1403,11 +1121,6 @@ def register(request):
         form = StudentRegistrationForm(request.POST)
         if form.is_valid():
             try:
-                api_base = getattr(
-                    settings,
-                    'SITE_MANAGEMENT_API_BASE',
-                    'https://sitemanagement-production.up.railway.app/api'
-                ).rstrip('/')
                 payload = {
                     'full_name': form.cleaned_data.get('full_name'),
                     'email': form.cleaned_data.get('email'),
@@ -1416,10 +1129,10 @@ def register(request):
                     'phone_number': form.cleaned_data.get('phone_number'),
                     'city_id': form.cleaned_data.get('city'),
                 }
-                response = requests.post(
-                    f"{api_base}/public/student-register",
-                    json=payload,
-                    timeout=15
+                response = management_api.post(
+                    'student_register',
+                    '/public/student-register',
+                    json=payload
                 )
                 if response.status_code in (200, 201):
                     messages.success(request, "Compte cree avec succes. Vous pouvez maintenant vous connecter.")
@@ -1439,17 +1152,45 @@ def register(request):
     return render(request, 'registration/signup.html', {'form': form})
 
 
-def _management_api_base():
-    return getattr(
-        settings,
-        'SITE_MANAGEMENT_API_BASE',
-        'https://sitemanagement-production.up.railway.app/api'
-    ).rstrip('/')
-
-
 def _clear_external_student_session(request):
-    request.session.pop('external_student_token', None)
+    token = request.session.pop('external_student_token', None)
     request.session.pop('external_student_profile', None)
+    if token:
+        management_api.invalidate(STUDENT_DASHBOARD_PATH, _token_variant(token))
+
+
+STUDENT_DASHBOARD_PATH = '/public/student/dashboard'
+
+
+def _token_variant(token):
+    # Cache entries are keyed by a hash, never by the bearer token itself
+    return ':' + hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def api_dashboard_context(payload):
+    return {
+        'api_mode': True,
+        'profile': payload.get('profile', {}),
+        'account_status': payload.get('account_status', 'active'),
+        'stats': payload.get('stats', {}),
+        'my_formations': payload.get('formations', []),
+        'sessions': payload.get('sessions', []),
+    }
+
+
+def fetch_student_dashboard(token):
+    """
+    Dashboard payload of an external student, cached per token and
+    revalidated in the background. Raises APIError (401 when expired).
+    """
+    return management_api.get_json(
+        'student_dashboard',
+        STUDENT_DASHBOARD_PATH,
+        ttl=getattr(settings, 'STUDENT_DASHBOARD_CACHE_TTL', 30),
+        stale_ttl=getattr(settings, 'STUDENT_DASHBOARD_STALE_TTL', 300),
+        headers={'Authorization': f'Bearer {token}'},
+        variant=_token_variant(token),
+    )
 
 
 def login_view(request):
@@ -1458,13 +1199,13 @@ def login_view(request):
         form = StudentLoginForm(request.POST)
         if form.is_valid():
             try:
-                response = requests.post(
-                    f"{_management_api_base()}/public/student-login",
+                response = management_api.post(
+                    'student_login',
+                    '/public/student-login',
                     json={
                         'email': form.cleaned_data.get('email'),
                         'password': form.cleaned_data.get('password'),
-                    },
-                    timeout=15
+                    }
                 )
                 payload = response.json() if response.content else {}
                 if response.status_code == 200 and payload.get('token'):
@@ -1496,31 +1237,20 @@ def dashboard(request):
     external_token = request.session.get('external_student_token')
     if external_token:
         try:
-            response = requests.get(
-                f"{_management_api_base()}/public/student/dashboard",
-                headers={'Authorization': f'Bearer {external_token}'},
-                timeout=20
-            )
-            if response.status_code == 401:
+            payload = fetch_student_dashboard(external_token)
+        except APIError as exc:
+            if exc.status_code == 401:
                 _clear_external_student_session(request)
                 messages.error(request, "Session expiree. Veuillez vous reconnecter.")
                 return redirect('Prolean:login')
-            payload = response.json() if response.content else {}
-            if response.status_code == 200:
-                return render(request, 'Prolean/dashboard/api_dashboard.html', {
-                    'api_mode': True,
-                    'profile': payload.get('profile', {}),
-                    'account_status': payload.get('account_status', 'active'),
-                    'stats': payload.get('stats', {}),
-                    'my_formations': payload.get('formations', []),
-                    'sessions': payload.get('sessions', []),
-                })
-            messages.error(request, payload.get('error') or "Impossible de charger votre espace.")
+            logger.error(f"Failed to load external student dashboard: {exc}")
+            messages.error(request, "Impossible de charger votre espace.")
             return redirect('Prolean:login')
         except Exception as exc:
             logger.error(f"Failed to load external student dashboard: {exc}")
             messages.error(request, "Service indisponible. Reessayez plus tard.")
             return redirect('Prolean:login')
+        return render(request, 'Prolean/dashboard/api_dashboard.html', api_dashboard_context(payload))
 
     if not request.user.is_authenticated:
         return render(request, 'Prolean/dashboard/restricted_access.html')
@@ -2640,5 +2370,14 @@ def director_dashboard(request):
     return redirect('/admin/')
 
 
-
-
+@user_passes_test(lambda u: u.is_superuser)
+def cache_stats(request):
+    """Per-tier cache hit ratios of the worker serving this request"""
+    backend = caches['default']
+    return JsonResponse({
+        'pid': os.getpid(),
+        'cache': backend.stats() if hasattr(backend, 'stats') else None,
+        'page_cache': page_cache.stats(),
+        'artifacts': invalidation.stats(),
+        'bus': bus.stats(),
+    })
@@ -0,0 +1,179 @@
+# warmup.py - fill caches before a process takes traffic
+"""
+``warm()`` precomputes what the first visitors after a deploy would
+otherwise pay for, and times each artifact:
+
+- process-local: the currency rate table, the catalog snapshot, the search
+  index, the registration city choices and the blocklist;
+- shared (cache backend): featured trainings and the rendered public pages
+  (home, catalog, migration, contact centres and the WARMUP_TOP_TRAININGS
+  most viewed training details, which also caches their first review
+  page and the category counts).
+
+The ``warm_caches`` command runs it in the release phase, where only the
+shared caches outlive the process, and only with Redis (REDIS_URL): the
+in-memory cache used without it dies with the release process. The gunicorn
+``post_worker_init`` hook (gunicorn.conf.py) runs it in every worker
+before it accepts requests when WARM_CACHES_ON_BOOT is set.
+
+With ``gunicorn --preload``, ``preload`` builds the process-local caches
+once in the master instead: workers inherit them copy-on-write, and each
+worker only builds a private copy of one when its bus channel moves. A
+worker forked later (after a crash or max_requests) starts from the
+master's copy and replaces whatever went stale at its first bus poll.
+
+Pages are requested through the normal middleware and views with
+WARMUP_ENVIRON_KEY in the WSGI environ, which no HTTP client can set:
+views neither count them against a rate limit nor record a page view or
+a view count for them.
+"""
+import gc
+import logging
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENVIRON_KEY = 'prolean.warmup'
+
+
+def is_warmup(request):
+    """True for the in-process requests made by ``warm``"""
+    return bool(request.META.get(WARMUP_ENVIRON_KEY))
+
+
+def has_shared_cache():
+    """True when the default cache outlives this process (an L2 alias every worker reads)"""
+    return 'shared' in settings.CACHES
+
+
+def _host():
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def _page_step(client, path):
+    def run():
+        response = client.get(path, **{WARMUP_ENVIRON_KEY: True, 'HTTP_HOST': _host()})
+        cache_state = response.get('X-Page-Cache', 'not cached')
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return f"{len(response.content) // 1024} KB, {cache_state}"
+    return run
+
+
+def _top_training_slugs(limit):
+    from .models import Training
+
+    return list(
+        Training.objects.filter(is_active=True)
+        .order_by('-view_count', '-created_at')
+        .values_list('slug', flat=True)[:limit]
+    )
+
+
+def _local_steps():
+    from . import blocklist, bus, catalog, cities, currency, search
+
+    def currency_rates():
+        return f"{len(currency.get_table().rates)} currencies"
+
+    def catalog_snapshot():
+        snapshot = catalog.get_snapshot()
+        return f"{len(snapshot) if snapshot is not None else 0} trainings"
+
+    def search_index():
+        search.search('formation', limit=1)
+        return search.get_backend().__class__.__name__
+
+    def city_choices():
+        return f"{len(cities.refresh(bus.version(cities.CHANNEL)))} cities"
+
+    def blocked_ips():
+        blocklist.is_blocked('0.0.0.0')
+        return f"{blocklist.blocklist.stats()['blocked_ips']} blocked IPs"
+
+    return [
+        ('currency rates', currency_rates),
+        ('catalog snapshot', catalog_snapshot),
+        ('search index', search_index),
+        ('city choices', city_choices),
+        ('blocklist', blocked_ips),
+    ]
+
+
+def _shared_steps(top):
+    from django.test import Client
+
+    from . import views
+
+    def featured_trainings():
+        return f"{len(views.get_cached_featured_trainings())} trainings"
+
+    client = Client()
+    steps = [('featured trainings', featured_trainings)]
+    for name in ('home', 'training_catalog', 'migration_services', 'contact_centers'):
+        path = reverse(f'Prolean:{name}')
+        steps.append((f'page {path}', _page_step(client, path)))
+    for slug in _top_training_slugs(top):
+        path = reverse('Prolean:training_detail', args=[slug])
+        steps.append((f'page {path}', _page_step(client, path)))
+    return steps
+
+
+def warm(top=None, local=True, shared=True):
+    """
+    Run every warm-up step; returns [{'artifact', 'ms', 'detail', 'ok'}].
+    A failing step is reported and does not stop the others.
+    """
+    top = getattr(settings, 'WARMUP_TOP_TRAININGS', 10) if top is None else top
+    steps = []
+    if local:
+        steps += _local_steps()
+    if shared:
+        try:
+            steps += _shared_steps(top)
+        except Exception as exc:
+            logger.warning(f"Cache warm-up: could not list the pages to warm: {exc}")
+
+    results = []
+    for artifact, step in steps:
+        started = time.perf_counter()
+        try:
+            detail, ok = step(), True
+        except Exception as exc:
+            detail, ok = f"failed: {exc}", False
+            logger.warning(f"Cache warm-up: {artifact} {detail}")
+        results.append({
+            'artifact': artifact,
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'detail': detail,
+            'ok': ok,
+        })
+    return results
+
+
+def preload():
+    """
+    Build the process-local caches in the gunicorn master before fork, so
+    every worker shares one copy of them (gunicorn.conf.py, --preload).
+    """
+    from django.core.cache import caches
+    from django.db import connections
+
+    from . import bus
+
+    bus.skip_listener()
+    results = warm(shared=False)
+    # Workers must not share the master's sockets
+    connections.close_all()
+    caches.close_all()
+    # Frozen objects are never traversed by the collector, which would
+    # otherwise write to their GC headers and un-share their pages
+    gc.collect()
+    gc.freeze()
+    return results
@@ -0,0 +1,34 @@
+# gunicorn.conf.py - read by gunicorn from the working directory
+"""
+Worker hooks. Server options stay on the command line (Procfile) or in
+GUNICORN_CMD_ARGS.
+"""
+
+
+def _summary(results):
+    failed = [result['artifact'] for result in results if not result['ok']]
+    total_ms = sum(result['ms'] for result in results)
+    return (
+        f"{len(results) - len(failed)}/{len(results)} cache artifacts in {total_ms:.0f} ms"
+        + (f" (failed: {', '.join(failed)})" if failed else "")
+    )
+
+
+def when_ready(server):
+    """With --preload: build the read-only caches once, before the workers are forked"""
+    if not server.cfg.preload_app:
+        return
+    from Prolean import warmup
+
+    server.log.info(f"Preloaded {_summary(warmup.preload())} for copy-on-write sharing")
+
+
+def post_worker_init(worker):
+    """Warm this worker's caches before it accepts requests (WARM_CACHES_ON_BOOT)"""
+    from django.conf import settings
+
+    if not getattr(settings, 'WARM_CACHES_ON_BOOT', False):
+        return
+    from Prolean import warmup
+
+    worker.log.info(f"Warmed {_summary(warmup.warm())}")